@@ -0,0 +1,301 @@
+"""
+Admission Control
+Decides which requests get a worker thread during a surge: per-pool
+concurrency limits, per-client token-bucket rate limits and priority
+classes, with fast 503/429 rejections instead of unbounded queueing.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+# Priority classes (lower is admitted first)
+PRIORITY_EMERGENCY = 0
+PRIORITY_WRITE = 1
+PRIORITY_READ = 2
+PRIORITY_NAMES = {PRIORITY_EMERGENCY: 'emergency', PRIORITY_WRITE: 'write', PRIORITY_READ: 'read'}
+
+
+class Rejected(Exception):
+    """A request that was shed instead of admitted."""
+    
+    def __init__(self, status, reason, retry_after):
+        """
+        Initialize the rejection.
+        
+        Args:
+            status: HTTP status to answer with (503 overloaded, 429 rate limited)
+            reason: Short machine-readable reason
+            retry_after: Seconds the client should wait before retrying
+        """
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token bucket per client key.
+    
+    Each key gets `burst` tokens that refill at `rate` per second; a
+    request takes one token. Buckets are refilled lazily when used, so
+    idle clients cost nothing, and only the `max_clients` most recently
+    seen keys are kept (a forgotten client starts again with a full bucket).
+    """
+    
+    def __init__(self, rate=10.0, burst=50, max_clients=100000, clock=time.monotonic):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+            max_clients: Maximum number of buckets kept
+            clock: Function returning the current time in seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [tokens, last refill time]
+        self._clock = clock
+        self._lock = threading.Lock()
+    
+    def allow(self, key):
+        """
+        Take a token from a client's bucket.
+        
+        Args:
+            key: Client key (e.g. session token)
+        
+        Returns:
+            0 if allowed, otherwise the seconds until a token is available
+        """
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [self.burst, now]
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate
+    
+    def __len__(self):
+        """Get the number of tracked clients."""
+        return len(self._buckets)
+
+
+class AdmissionPool:
+    """
+    Concurrency limit for one group of routes, with a priority wait list.
+    
+    - At most `limit` requests of the pool run at once
+    - Requests beyond that wait in a heap ordered by (priority, arrival);
+      a finishing request hands its slot straight to the best waiter, so
+      emergency intake overtakes queued writes and reads
+    - A request is shed with 503 at once when `max_waiting` are already
+      waiting, or after waiting `max_wait` seconds
+    
+    Wait times are recorded per priority class for stats().
+    """
+    
+    def __init__(self, name, limit, max_waiting=64, max_wait=2.0, clock=time.monotonic):
+        """
+        Initialize the pool.
+        
+        Args:
+            name: Pool name (used in stats)
+            limit: Maximum concurrent requests
+            max_waiting: Maximum requests waiting for a slot
+            max_wait: Maximum seconds a request waits for a slot
+            clock: Function returning the current time in seconds
+        """
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiting = []  # heap of [priority, seq, event, granted]
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.admitted = 0
+        self.shed = {'queue_full': 0, 'timeout': 0}
+        self._waits = {}  # priority -> deque of recent wait times (seconds)
+    
+    def acquire(self, priority):
+        """
+        Take a slot, waiting behind higher-priority requests if the pool is full.
+        
+        Args:
+            priority: Priority class (PRIORITY_*)
+        
+        Returns:
+            Seconds spent waiting
+        
+        Raises:
+            Rejected: 503 if the wait list is full or the wait timed out
+        """
+        start = self._clock()
+        with self._lock:
+            if self.active < self.limit and not self._waiting:
+                self.active += 1
+                self._admitted(priority, 0.0)
+                return 0.0
+            if len(self._waiting) >= self.max_waiting:
+                self.shed['queue_full'] += 1
+                raise Rejected(503, 'overloaded', 1)
+            waiter = [priority, next(self._seq), threading.Event(), False]
+            heapq.heappush(self._waiting, waiter)
+        
+        waiter[2].wait(self.max_wait)
+        with self._lock:
+            if not waiter[3]:
+                # Not handed a slot in time: leave the wait list
+                self._waiting.remove(waiter)
+                heapq.heapify(self._waiting)
+                self.shed['timeout'] += 1
+                raise Rejected(503, 'overloaded', 1)
+            waited = self._clock() - start
+            self._admitted(priority, waited)
+            return waited
+    
+    def _admitted(self, priority, waited):
+        """Record an admission (caller holds the lock)."""
+        self.admitted += 1
+        waits = self._waits.get(priority)
+        if waits is None:
+            waits = self._waits[priority] = deque(maxlen=1000)
+        waits.append(waited)
+    
+    def release(self):
+        """Give the slot to the best waiting request, or free it."""
+        with self._lock:
+            if self._waiting:
+                waiter = heapq.heappop(self._waiting)
+                waiter[3] = True  # the slot passes on; `active` is unchanged
+                waiter[2].set()
+            else:
+                self.active -= 1
+    
+    def stats(self):
+        """
+        Get the pool's counters and queue-wait metrics.
+        
+        Returns:
+            Dictionary with limit, active, waiting, admitted, shed and, per
+            priority class, the count, mean, p95 and max of recent waits (ms)
+        """
+        with self._lock:
+            waits = {PRIORITY_NAMES.get(priority, str(priority)): sorted(values)
+                     for priority, values in self._waits.items()}
+            result = {
+                'limit': self.limit,
+                'active': self.active,
+                'waiting': len(self._waiting),
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+            }
+        result['wait_ms'] = {
+            name: {
+                'count': len(values),
+                'mean': round(sum(values) / len(values) * 1000, 2),
+                'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 2),
+                'max': round(values[-1] * 1000, 2),
+            }
+            for name, values in waits.items() if values
+        }
+        return result
+
+
+class AdmissionController:
+    """
+    Admission layer in front of the API routes.
+    
+    Routes are mapped to a pool; each request is first rate limited per
+    (pool, client) - so dashboard polling cannot use up a client's budget
+    for intake - and then takes a slot in its pool. Unmapped routes pass
+    through untouched.
+    
+    Usage:
+        ticket = controller.admit('add_to_queue', PRIORITY_EMERGENCY, token)
+        try:
+            ...handle the request...
+        finally:
+            controller.release(ticket)
+    """
+    
+    def __init__(self, pools, routes, rate_limiter=None):
+        """
+        Initialize the controller.
+        
+        Args:
+            pools: Iterable of AdmissionPool
+            routes: Dictionary of endpoint name -> pool name
+            rate_limiter: Optional RateLimiter applied before the pools
+        """
+        self.pools = {pool.name: pool for pool in pools}
+        self.routes = routes
+        self.rate_limiter = rate_limiter
+        self.rate_limited = 0
+    
+    def admit(self, endpoint, priority, client):
+        """
+        Admit a request or reject it.
+        
+        Args:
+            endpoint: Route endpoint name
+            priority: Priority class (PRIORITY_*)
+            client: Client key for rate limiting (None to skip it)
+        
+        Returns:
+            The AdmissionPool holding the request's slot (pass to release),
+            or None if the route is not admission controlled
+        
+        Raises:
+            Rejected: 429 when rate limited, 503 when the pool is overloaded
+        """
+        pool_name = self.routes.get(endpoint)
+        if pool_name is None:
+            return None
+        if self.rate_limiter is not None and client is not None:
+            retry_after = self.rate_limiter.allow((pool_name, client))
+            if retry_after:
+                self.rate_limited += 1
+                raise Rejected(429, 'rate_limited', retry_after)
+        pool = self.pools[pool_name]
+        pool.acquire(priority)
+        return pool
+    
+    def release(self, ticket):
+        """
+        Release a slot returned by admit().
+        
+        Args:
+            ticket: Value returned by admit() (None is ignored)
+        """
+        if ticket is not None:
+            ticket.release()
+    
+    def stats(self):
+        """
+        Get admission metrics for every pool.
+        
+        Returns:
+            Dictionary with the rate-limited count, tracked clients and per-pool stats
+        """
+        return {
+            'rate_limited': self.rate_limited,
+            'clients': len(self.rate_limiter) if self.rate_limiter is not None else 0,
+            'pools': {name: pool.stats() for name, pool in self.pools.items()},
+        }
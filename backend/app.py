@@ -3,25 +3,53 @@ Flask Application - Patient Appointment & Queue Management System
 Main backend server with API endpoints.
 """
 
-from flask import Flask, request, jsonify, session, send_from_directory
+from flask import Flask, Response, g, request, jsonify, session, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import atexit
+import csv
+import hashlib
+import json
+import math
 from datetime import datetime
 import uuid
+import time
 from pathlib import Path
 
-from database import db
+from database import db, cached_db
+from sqlite_database import SQLiteDatabase
+from events import EventBroker
+from admission import (AdmissionController, AdmissionPool, RateLimiter, Rejected,
+                       PRIORITY_EMERGENCY, PRIORITY_WRITE, PRIORITY_READ)
+from persistence import WriteBehindWriter, SupabasePersistence
+from bulk import (BulkReport, PRIORITY_LEVELS, read_rows, chunked, parse_priority, patient_from_row,
+                  queue_entry_from_row)
+from shared_state import (SQLiteStateStore, SharedQueueEngine, SharedEventBroker, RegistrySync,
+                          SharedRevocationList, SharedWaitingRows)
 from auth.auth import AuthManager
 from models.patient import Patient
 from models.doctor import Doctor
 from dsa.queue import Queue
 from dsa.priority_queue import PriorityQueue
-from dsa.linked_list import LinkedList
+from dsa.concurrent_queue import QueueEngine
+from dsa.patient_registry import PatientRegistry
+from dsa.search_index import TrigramIndex
+from dsa.prefix_index import PrefixIndex
+from dsa.stats import DashboardStats
+from dsa.analytics import QueueAnalytics
+from dsa.eta import ETAEngine
+from dsa.doctor_directory import DoctorDirectory
 from dsa.scheduler import Scheduler
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dsa-project-secret-key-change-in-production')
 CORS(app, supports_credentials=True, origins=["*"])  # Allow all origins for Railway deployment
+# Railway's proxy puts the client address in X-Forwarded-For: trust that many
+# proxy hops for request.remote_addr (set PROXY_HOPS=0 when serving directly)
+PROXY_HOPS = int(os.getenv('PROXY_HOPS', '1'))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
 
 # Get the project root directory (parent of backend)
 # Handle both local development and Railway deployment
@@ -47,13 +75,61 @@ for path in possible_paths:
 if FRONTEND_DIR is None:
     FRONTEND_DIR = PROJECT_ROOT / 'frontend'
 
-# Initialize managers
-auth_manager = AuthManager(db)
-
 # Initialize DSA structures
-patient_list = LinkedList()  # Dynamic patient records
+patient_list = PatientRegistry()  # Dynamic patient records (indexed by id)
+patient_name_index = TrigramIndex(field='name')  # Substring search over names
+patient_list.attach_index(patient_name_index)
 regular_queue = Queue()  # Regular appointments
 emergency_queue = PriorityQueue()  # Emergency cases
+latest_assignments = {}  # Output of the last /api/scheduler/assign run (see save_assignments)
+
+# Set SHARED_STATE_DB (a SQLite file path) to share queues, patients and queue
+# events between several worker processes; otherwise they live in this process
+SHARED_STATE_DB = os.getenv('SHARED_STATE_DB')
+if SHARED_STATE_DB:
+    shared_store = SQLiteStateStore(SHARED_STATE_DB)
+    queue_engine = SharedQueueEngine(shared_store, priorities=PRIORITY_LEVELS)
+    queue_events = SharedEventBroker(shared_store, history=1000)
+    patient_sync = RegistrySync(shared_store, patient_list)
+    revoked_tokens = SharedRevocationList(shared_store)
+else:
+    shared_store = None
+    queue_engine = QueueEngine(regular_queue, emergency_queue, priorities=PRIORITY_LEVELS)  # Thread-safe access to both queues
+    queue_events = EventBroker(history=1000)  # Queue changes pushed to /api/queue/stream
+    patient_sync = None
+    revoked_tokens = None
+
+# Initialize managers
+# Set STATELESS_TOKENS=1 for tokens signed with SECRET_KEY, which any worker or
+# node with the same key can validate without shared session storage
+# (refuses to start without a private SECRET_KEY: the fallback key is public)
+if os.getenv('STATELESS_TOKENS', '').lower() in ('1', 'true', 'yes'):
+    try:
+        auth_manager = AuthManager(db, token_secret=os.getenv('SECRET_KEY', ''), revoked=revoked_tokens)
+    except ValueError as e:
+        raise RuntimeError(f"STATELESS_TOKENS=1 requires SECRET_KEY: {e}") from None
+else:
+    auth_manager = AuthManager(db)
+
+# Last serialized body per read endpoint, reused while the data version is unchanged
+_response_cache = {}
+# ETag prefix so versions from another process or before a restart never match
+# (shared versions are the same in every worker, so they share the prefix)
+_ETAG_PREFIX = shared_store.instance_id if shared_store else uuid.uuid4().hex[:8]
+
+# Rows validated and applied per step by the /bulk endpoints
+BULK_CHUNK_SIZE = 5000
+
+# Server-Sent Events timing (seconds)
+SSE_KEEPALIVE_INTERVAL = 15
+SSE_MAX_CONNECTION_TIME = 60
+# Each open stream holds one of the worker's threads (gthread, 32 in the Procfile),
+# so only this many stream at once; other displays get a 503 and poll GET
+# /api/queue instead, which answers 304 from its ETag while nothing changes.
+# Raise it (with --threads) to stream to more displays; past a few dozen per
+# worker that calls for an async worker class instead (see events.EventBroker)
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '8'))
+stream_slots = AdmissionPool('streams', limit=SSE_MAX_STREAMS, max_waiting=0)
 
 # Mock data for doctors (will be replaced with database)
 DOCTORS = [
@@ -65,6 +141,9 @@ DOCTORS = [
     {'id': 'ID-8263-16', 'name': 'Leulekal Nahusenay', 'specialization': 'Emergency Medicine', 'available': True}
 ]
 
+# Doctor lookups by id/specialization with cached response bodies
+doctor_directory = DoctorDirectory(DOCTORS)
+
 # Mock patients (will be replaced with database)
 MOCK_PATIENTS = [
     {'id': 'P001', 'name': 'NAOL MULISA', 'age': 35, 'phone': '0912345678', 'email': 'naol@example.com', 'condition': 'Fever', 'is_emergency': False, 'priority': 5},
@@ -75,28 +154,218 @@ MOCK_PATIENTS = [
     {'id': 'P006', 'name': 'Semere Hailu', 'age': 50, 'phone': '0912345683', 'email': 'semere@example.com', 'condition': 'High Blood Pressure', 'is_emergency': False, 'priority': 5}
 ]
 
-# Initialize with mock data
-for patient in MOCK_PATIENTS:
-    patient_list.append(patient)
+# Initialize with mock data (a local SQLite database starts from its stored patients)
+initial_patients = db.iter_rows('patients') if isinstance(db, SQLiteDatabase) else MOCK_PATIENTS
+if patient_sync is not None:
+    patient_sync.add_many(initial_patients)  # Also loads patients other workers added
+else:
+    patient_list.extend(initial_patients)
+
+# Typeahead index over patient and doctor names
+name_autocomplete = PrefixIndex(field='name', kind='patient')
+name_autocomplete.add_many(
+    (doctor['name'], 'doctor', doctor['id'], {'type': 'doctor', 'id': doctor['id'], 'name': doctor['name']})
+    for doctor in DOCTORS
+)
+patient_list.attach_index(name_autocomplete)
+
+# Dashboard counters, kept current by the registry, queue and doctor endpoints
+dashboard_stats = DashboardStats()
+dashboard_stats.set_doctors(DOCTORS)
+patient_list.attach_index(dashboard_stats)
+
+# Enqueue/dequeue/assignment times for /api/analytics (this worker's events)
+queue_analytics = QueueAnalytics()
+
+# Live wait estimates: queue positions as prefix sums plus learned service times
+eta_engine = ETAEngine()
+eta_engine.set_servers(doctor['id'] for doctor in doctor_directory.all() if doctor['available'])
+
+# Write-behind copy of patients and queues in Supabase (only when it is configured)
+if db.get_client() is not None:
+    persistence = SupabasePersistence(WriteBehindWriter(db.get_client(), on_flush=cached_db.invalidate),
+                                      waiting=SharedWaitingRows(shared_store) if shared_store else None)
+    # Patients present at startup are already stored (loaded from, or seeded by, schema.sql)
+    patient_list.attach_index(persistence, load_existing=False)
+    atexit.register(persistence.writer.close)  # Final synchronous flush on shutdown
+else:
+    persistence = None
+
+def publish_queue_change(action, queue_type, patient, priority):
+    """Count a queue change and push it to queue displays (runs under the queue lock)."""
+    if action == 'enqueue':
+        dashboard_stats.on_enqueue(queue_type)
+        queue_analytics.on_enqueue(patient.get('id'), queue_type == 'emergency',
+                                   priority if priority is not None else 5)
+        eta_engine.on_enqueue(patient.get('id'), queue_type, priority if priority is not None else 5)
+        event = {'queue_type': queue_type, 'patient': patient}
+        if queue_type == 'emergency':
+            event['priority'] = priority
+        queue_events.publish('enqueue', event)
+    else:
+        dashboard_stats.on_dequeue(queue_type)
+        queue_analytics.on_dequeue(patient.get('id'), queue_type == 'emergency')
+        eta_engine.on_dequeue(patient.get('id'), queue_type)
+        queue_events.publish('dequeue', {'queue_type': queue_type, 'patient_id': patient.get('id')})
+    if persistence is not None:
+        persistence.queue_changed(action, queue_type, patient, priority)
+
+queue_engine.on_change = publish_queue_change
+
+# Admission control: bounded concurrency per route pool, so a surge of dashboard
+# polling cannot take every worker thread from intake. Emergency intake waits
+# ahead of everything else; requests that cannot get a slot soon get a 503,
+# clients over their rate get a 429. Set ADMISSION_CONTROL=0 to disable.
+if os.getenv('ADMISSION_CONTROL', '1').lower() not in ('0', 'false', 'no'):
+    admission = AdmissionController(
+        pools=[
+            AdmissionPool('intake', limit=16, max_waiting=32, max_wait=5.0),
+            AdmissionPool('scheduler', limit=2, max_waiting=4, max_wait=5.0),
+            AdmissionPool('bulk', limit=2, max_waiting=4, max_wait=5.0),
+            AdmissionPool('reads', limit=8, max_waiting=4, max_wait=1.0),
+        ],
+        routes={
+            'create_patient': 'intake', 'add_to_queue': 'intake', 'get_next_patient': 'intake',
+            'assign_patients': 'scheduler',
+            'create_patients_bulk': 'bulk', 'add_to_queue_bulk': 'bulk',
+            'get_patients': 'reads', 'get_patient': 'reads', 'search_patients': 'reads',
+            'autocomplete_names': 'reads', 'get_doctors': 'reads', 'get_doctor': 'reads',
+            'get_queue': 'reads', 'get_patient_eta': 'reads', 'get_dashboard_stats': 'reads', 'get_analytics': 'reads', 'export_patients': 'reads',
+            'export_queue': 'reads', 'export_assignments': 'reads',
+        },
+        rate_limiter=RateLimiter(rate=float(os.getenv('ADMISSION_RATE', '20')),
+                                 burst=int(os.getenv('ADMISSION_BURST', '40'))),
+    )
+else:
+    admission = None
+
+@app.before_request
+def pull_shared_state():
+    """
+    Catch up with patients and token revocations from other workers (shared state only).
+    
+    Registered before admit_request, so sessions are validated against current revocations.
+    """
+    if patient_sync is not None:
+        patient_sync.pull()
+        revoked_tokens.pull()
+
+# Intake routes whose changes are written to the database. While the write-behind
+# buffer is full (database down or too slow) they are refused, so the backlog
+# stays bounded; reads and calling the next patient keep working.
+PERSISTED_INTAKE = frozenset({'create_patient', 'create_patients_bulk', 'add_to_queue', 'add_to_queue_bulk'})
+
+@app.before_request
+def shed_unwritable_intake():
+    """Refuse intake with 503 while the database write backlog is full."""
+    if persistence is None or request.endpoint not in PERSISTED_INTAKE or persistence.writer.has_room():
+        return None
+    response = jsonify({'error': 'Server busy, please retry', 'reason': 'write_backlog'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(persistence.writer.flush_interval)))
+    return response
+
+@app.before_request
+def admit_request():
+    """Admit the request under its route's limits, or shed it with 429/503."""
+    if admission is None or request.endpoint not in admission.routes:
+        return None
+    if request.method == 'GET':
+        priority = PRIORITY_READ
+    else:
+        body = request.get_json(silent=True)
+        is_emergency = isinstance(body, dict) and body.get('is_emergency')
+        priority = PRIORITY_EMERGENCY if is_emergency else PRIORITY_WRITE
+    # Signed-in callers are limited per user, anyone else per client address
+    # (an unvalidated header would give every made-up token a fresh bucket)
+    session_data = current_session()
+    client = f"user:{session_data['user_id']}" if session_data else f"ip:{request.remote_addr}"
+    try:
+        g.admission_ticket = admission.admit(request.endpoint, priority, client)
+    except Rejected as e:
+        response = jsonify({'error': 'Server busy, please retry' if e.status == 503 else 'Too many requests',
+                            'reason': e.reason})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response
+
+@app.teardown_request
+def release_admission(exc=None):
+    """Free the request's admission slot."""
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        admission.release(ticket)
 
 # Helper function to check authentication
+def current_session():
+    """Validate the request's session token once per request (None if absent or invalid)."""
+    if 'session_data' not in g:
+        token = request.headers.get('Authorization') or session.get('token')
+        g.session_data = auth_manager.validate_session(token.replace('Bearer ', '')) if token else None
+    return g.session_data
+
 def require_auth():
     """Check if user is authenticated."""
-    token = request.headers.get('Authorization') or session.get('token')
-    if not token:
-        return None
-    return auth_manager.validate_session(token.replace('Bearer ', ''))
+    return current_session()
 
 # Helper function to check admin
 def require_admin():
     """Check if user is admin."""
-    token = request.headers.get('Authorization') or session.get('token')
-    if not token:
-        return None
-    session_data = auth_manager.validate_session(token.replace('Bearer ', ''))
+    session_data = current_session()
     if not session_data:
         return None
-    return auth_manager.is_admin(session_data['email'])
+    return session_data['is_admin']
+
+# Helper function for versioned (ETag) JSON responses
+def versioned_json(name, version, build, cache=True):
+    """
+    Return a JSON response tagged with the data version.
+    
+    Answers 304 Not Modified without building anything when the client's
+    If-None-Match already has this version, and reuses the last serialized
+    body while the version is unchanged. `build` may return a payload to
+    serialize or an already encoded body.
+    """
+    etag = f"{_ETAG_PREFIX}-{name}-{version}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    cached = _response_cache.get(name) if cache else None
+    if cached is not None and cached[0] == etag:
+        body = cached[1]
+    else:
+        body = build()
+        if not isinstance(body, (str, bytes)):
+            body = app.json.dumps(body)
+        if cache:
+            _response_cache[name] = (etag, body)
+    
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers may keep the body but must revalidate it with If-None-Match
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Helper function to stream newline-delimited JSON
+def ndjson_response(rows, chunk_size=500):
+    """
+    Stream an iterable of JSON-serializable rows as NDJSON.
+    
+    The request context stays open until the stream ends, so the request's
+    admission slot is held while rows are sent, not released on return.
+    """
+    def generate():
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row, separators=(',', ':')))
+            if len(lines) >= chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 # ==================== AUTHENTICATION ENDPOINTS ====================
@@ -237,7 +506,7 @@ def get_current_user():
         'user': {
             'id': session_data['user_id'],
             'email': session_data['email'],
-            'is_admin': auth_manager.is_admin(session_data['email'])
+            'is_admin': session_data['is_admin']
         }
     }), 200
 
@@ -246,13 +515,35 @@ def get_current_user():
 
 @app.route('/api/patients', methods=['GET'])
 def get_patients():
-    """Get all patients."""
+    """Get all patients, or one page of them with ?limit=&after=<cursor>."""
     session_data = require_auth()
     if not session_data:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    patients = patient_list.display()
-    return jsonify({'patients': patients}), 200
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    if limit is None and after is None:
+        return versioned_json('patients', patient_list.version,
+                              lambda: {'patients': patient_list.display()})
+    
+    try:
+        limit = min(max(int(limit if limit is not None else 100), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    try:
+        patients, next_cursor = patient_list.page(limit, after=after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Pages are tagged but not cached: there are too many possible cursors.
+    # The tag uses a digest of the (validated) cursor, never the client's raw text
+    page_key = hashlib.sha256(after.encode()).hexdigest()[:16] if after is not None else 'start'
+    return versioned_json(f"patients-{limit}-{page_key}", patient_list.version, lambda: {
+        'patients': patients,
+        'next_cursor': next_cursor,
+        'total': patient_list.get_size()
+    }, cache=False)
 
 @app.route('/api/patients', methods=['POST'])
 def create_patient():
@@ -263,10 +554,8 @@ def create_patient():
     
     try:
         data = request.json
-        patient_id = f"P{str(uuid.uuid4())[:3].upper()}"
-        
         patient_data = {
-            'id': patient_id,
+            'id': f"P{str(uuid.uuid4())[:3].upper()}",
             'name': data.get('name'),
             'age': data.get('age'),
             'phone': data.get('phone'),
@@ -276,13 +565,64 @@ def create_patient():
             'priority': data.get('priority', 5)
         }
         
-        # Add to linked list
-        patient_list.append(patient_data)
+        # With shared state the id is claimed in the database, so it is unique across workers
+        add_patient = patient_sync.add if patient_sync is not None else patient_list.append
+        try:
+            add_patient(patient_data)
+        except ValueError:
+            # Short IDs collide quickly in a large registry; use a longer one
+            patient_data['id'] = f"P{uuid.uuid4().hex[:12].upper()}"
+            add_patient(patient_data)
         
         return jsonify({'message': 'Patient created successfully', 'patient': patient_data}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/patients/bulk', methods=['POST'])
+def create_patients_bulk():
+    """Register many patients from a JSON array or a text/csv upload."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    body = request.get_json(silent=True)
+    if request.mimetype != 'text/csv' and not isinstance(body, list):
+        return jsonify({'error': 'Send a JSON array of patients or text/csv'}), 400
+    
+    report = BulkReport()
+    row_number = 0
+    try:
+        for chunk in chunked(read_rows(request.stream, request.mimetype, body), BULK_CHUNK_SIZE):
+            batch = []
+            batch_rows = {}  # patient id -> row number
+            with patient_list.lock:
+                for row in chunk:
+                    row_number += 1
+                    try:
+                        patient = patient_from_row(row)
+                    except (ValueError, TypeError) as e:
+                        report.error(row_number, str(e))
+                        continue
+                    if patient['id'] in batch_rows or patient_list.find(patient['id']) is not None:
+                        report.error(row_number, f"Duplicate patient id: {patient['id']}")
+                        continue
+                    batch_rows[patient['id']] = row_number
+                    batch.append(patient)
+                # One registry (or shared table) update per chunk; attached indexes load in bulk
+                if patient_sync is not None:
+                    # Another worker may have registered some of these ids since the check above
+                    for patient in patient_sync.add_many(batch):
+                        report.error(batch_rows.pop(patient['id']), f"Duplicate patient id: {patient['id']}")
+                else:
+                    patient_list.extend(batch)
+                for patient_id, number in batch_rows.items():
+                    report.ok(number, id=patient_id)
+    except (ValueError, csv.Error) as e:
+        # Unreadable input (e.g. bad encoding): rows before it are already registered
+        report.error(row_number + 1, f"Unreadable input: {e}")
+    
+    return jsonify(report.to_dict('patients')), 201 if report.accepted else 400
+
 @app.route('/api/patients/<patient_id>', methods=['GET'])
 def get_patient(patient_id):
     """Get a specific patient."""
@@ -291,6 +631,9 @@ def get_patient(patient_id):
         return jsonify({'error': 'Unauthorized'}), 401
     
     patient = patient_list.find(patient_id)
+    if not patient:
+        # Patients stored by another instance (or before a restart) are read through the cache
+        patient = cached_db.get_patient(patient_id)
     if not patient:
         return jsonify({'error': 'Patient not found'}), 404
     
@@ -307,25 +650,67 @@ def search_patients():
     if not query:
         return jsonify({'patients': []}), 200
     
-    all_patients = patient_list.display()
-    results = [p for p in all_patients if query in p.get('name', '').lower()]
+    try:
+        limit = request.args.get('limit')
+        limit = max(int(limit), 0) if limit is not None else None
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    # Only records sharing the query's trigrams are checked
+    with patient_list.lock:
+        results = patient_name_index.search(query, limit=limit)
     
     return jsonify({'patients': results}), 200
 
+@app.route('/api/patients/autocomplete', methods=['GET'])
+def autocomplete_names():
+    """Autocomplete patient and doctor names by prefix."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 0), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    with patient_list.lock:
+        suggestions = name_autocomplete.complete(request.args.get('q', ''), limit=limit)
+    return jsonify({'suggestions': suggestions}), 200
+
 
 # ==================== DOCTOR ENDPOINTS ====================
 
 @app.route('/api/doctors', methods=['GET'])
 def get_doctors():
     """Get all doctors."""
-    return jsonify({'doctors': DOCTORS}), 200
+    # Encoded once per roster/availability change
+    return versioned_json('doctors', doctor_directory.version, doctor_directory.list_json, cache=False)
 
 @app.route('/api/doctors/<doctor_id>', methods=['GET'])
 def get_doctor(doctor_id):
     """Get a specific doctor."""
-    doctor = next((d for d in DOCTORS if d['id'] == doctor_id), None)
+    if doctor_directory.get(doctor_id) is None:
+        return jsonify({'error': 'Doctor not found'}), 404
+    return versioned_json(f"doctor-{doctor_id}", doctor_directory.version,
+                          lambda: doctor_directory.doctor_json(doctor_id), cache=False)
+
+@app.route('/api/doctors/<doctor_id>/availability', methods=['POST'])
+def set_doctor_availability(doctor_id):
+    """Mark a doctor as available or unavailable (admin only)."""
+    if not require_admin():
+        return jsonify({'error': 'Access Denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('available'), bool):
+        return jsonify({'error': 'available must be true or false'}), 400
+    
+    doctor = doctor_directory.set_available(doctor_id, data['available'])
     if not doctor:
         return jsonify({'error': 'Doctor not found'}), 404
+    
+    dashboard_stats.set_doctor_available(doctor_id, doctor['available'])
+    eta_engine.set_servers(d['id'] for d in doctor_directory.all() if d['available'])
     return jsonify({'doctor': doctor}), 200
 
 
@@ -338,20 +723,114 @@ def get_queue():
     if not session_data:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Format emergency queue with priority information
-    emergency_list = []
-    for entry in emergency_queue.items:
-        emergency_list.append({
-            'item': entry['item'],
-            'priority': entry['priority']
-        })
+    # Optional window over the regular queue (e.g. ?offset=0&limit=50)
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = request.args.get('limit')
+        stop = offset + max(int(limit), 0) if limit is not None else None
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
     
-    return jsonify({
-        'regular_queue': regular_queue.display(),
-        'emergency_queue': emergency_list,
-        'regular_size': regular_queue.size(),
-        'emergency_size': emergency_queue.size()
-    }), 200
+    # Built from an immutable snapshot, so no lock is held while serializing
+    snapshot = queue_engine.snapshot()
+    if offset == 0 and stop is None:
+        return versioned_json('queue', snapshot.version, lambda: queue_state(snapshot=snapshot))
+    return versioned_json(f"queue-{offset}-{stop}", snapshot.version,
+                          lambda: queue_state(offset, stop, snapshot), cache=False)
+
+def queue_state(offset=0, stop=None, snapshot=None):
+    """Build the GET /api/queue payload (also used for stream snapshots)."""
+    snapshot = snapshot or queue_engine.snapshot()
+    return {
+        'regular_queue': list(snapshot.regular[offset:stop]),
+        'emergency_queue': list(snapshot.emergency),
+        'regular_size': len(snapshot.regular),
+        'emergency_size': len(snapshot.emergency)
+    }
+
+@app.route('/api/queue/eta/<patient_id>', methods=['GET'])
+def get_patient_eta(patient_id):
+    """Get a queued patient's place in line and estimated wait."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if shared_store is None:
+        # Positions are prefix sums kept current on every enqueue/dequeue: O(log n)
+        estimate = eta_engine.estimate(patient_id)
+    else:
+        # Other workers change the shared queues too, so count from a snapshot
+        # (service times are still learned from this worker's calls)
+        estimate = None
+        snapshot = queue_engine.snapshot()
+        for index, entry in enumerate(snapshot.emergency):
+            if entry['item'].get('id') == patient_id:
+                estimate = eta_engine.estimate_for(patient_id, 'emergency', index, 0)
+                break
+        else:
+            for index, patient in enumerate(snapshot.regular):
+                if patient.get('id') == patient_id:
+                    estimate = eta_engine.estimate_for(patient_id, 'regular', len(snapshot.emergency), index)
+                    break
+    
+    if estimate is None:
+        return jsonify({'error': 'Patient is not in the queue'}), 404
+    return jsonify({'eta': estimate}), 200
+
+def queue_stream_snapshot():
+    """Get (event id, 'snapshot' message) matching the queues exactly."""
+    # Queue changes publish while holding the queue locks, so nothing can
+    # change between reading the queues and reading the last event id
+    with queue_engine.locked():
+        return queue_events.snapshot(queue_state)
+
+@app.route('/api/queue/stream', methods=['GET'])
+def stream_queue():
+    """Push queue changes as Server-Sent Events (snapshot, enqueue, dequeue, assigned)."""
+    # EventSource can't set headers, so the token may also come in the query string
+    token = request.headers.get('Authorization') or session.get('token') or request.args.get('token')
+    if not token or not auth_manager.validate_session(token.replace('Bearer ', '')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or -1)
+    except ValueError:
+        last_id = -1
+    
+    try:
+        stream_slots.acquire(PRIORITY_READ)
+    except Rejected as e:
+        response = jsonify({'error': 'Too many live displays, poll /api/queue instead', 'reason': e.reason})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(SSE_MAX_CONNECTION_TIME)
+        return response
+    
+    def generate():
+        nonlocal last_id
+        # Tell the browser how soon to reconnect once this stream ends
+        yield "retry: 1000\n\n"
+        if last_id < 0 or queue_events.since(last_id) is None:
+            last_id, message = queue_stream_snapshot()
+            yield message
+        
+        deadline = time.monotonic() + SSE_MAX_CONNECTION_TIME
+        while time.monotonic() < deadline:
+            events = queue_events.wait(last_id, SSE_KEEPALIVE_INTERVAL)
+            if events is None:
+                # Fell behind the event history: start over from a snapshot
+                last_id, message = queue_stream_snapshot()
+                yield message
+            elif events:
+                last_id = events[-1][0]
+                yield ''.join(message for _, message in events)
+            else:
+                yield ': keep-alive\n\n'
+    
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Called by the server when the stream ends or the client goes away
+    response.call_on_close(stream_slots.release)
+    return response
 
 @app.route('/api/queue/add', methods=['POST'])
 def add_to_queue():
@@ -364,21 +843,57 @@ def add_to_queue():
         data = request.json
         patient_id = data.get('patient_id')
         is_emergency = data.get('is_emergency', False)
-        priority = data.get('priority', 5)
+        try:
+            priority = parse_priority(data.get('priority'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         patient = patient_list.find(patient_id)
         if not patient:
             return jsonify({'error': 'Patient not found'}), 404
         
-        if is_emergency:
-            emergency_queue.enqueue(patient, priority)
-        else:
-            regular_queue.enqueue(patient)
+        queue_engine.enqueue(patient, is_emergency=is_emergency, priority=priority)
         
         return jsonify({'message': 'Patient added to queue'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/queue/add/bulk', methods=['POST'])
+def add_to_queue_bulk():
+    """Add many patients to the queues from a JSON array or a text/csv upload."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    body = request.get_json(silent=True)
+    if request.mimetype != 'text/csv' and not isinstance(body, list):
+        return jsonify({'error': 'Send a JSON array of queue entries or text/csv'}), 400
+    
+    report = BulkReport()
+    row_number = 0
+    try:
+        for chunk in chunked(read_rows(request.stream, request.mimetype, body), BULK_CHUNK_SIZE):
+            entries = []
+            for row in chunk:
+                row_number += 1
+                try:
+                    patient_id, is_emergency, priority = queue_entry_from_row(row)
+                except (ValueError, TypeError) as e:
+                    report.error(row_number, str(e))
+                    continue
+                patient = patient_list.find(patient_id)
+                if not patient:
+                    report.error(row_number, f"Patient not found: {patient_id}")
+                    continue
+                entries.append((patient, is_emergency, priority))
+                report.ok(row_number, patient_id=patient_id,
+                          queue_type='emergency' if is_emergency else 'regular')
+            queue_engine.enqueue_many(entries)
+    except (ValueError, csv.Error) as e:
+        report.error(row_number + 1, f"Unreadable input: {e}")
+    
+    return jsonify(report.to_dict('queued')), 200 if report.accepted else 400
+
 @app.route('/api/queue/next', methods=['POST'])
 def get_next_patient():
     """Get next patient from queue (dequeue)."""
@@ -386,15 +901,20 @@ def get_next_patient():
     if not session_data:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Priority: emergency first, then regular
-    if not emergency_queue.is_empty():
-        patient = emergency_queue.dequeue()
-        return jsonify({'patient': patient, 'queue_type': 'emergency'}), 200
-    elif not regular_queue.is_empty():
-        patient = regular_queue.dequeue()
-        return jsonify({'patient': patient, 'queue_type': 'regular'}), 200
-    else:
+    # Optional doctor_id: the doctor calling the patient (used to learn service times;
+    # calls without one measure the whole clinic's pace)
+    data = request.get_json(silent=True) or {}
+    doctor_id = data.get('doctor_id')
+    if doctor_id is not None and doctor_directory.get(doctor_id) is None:
+        return jsonify({'error': 'Doctor not found'}), 404
+    
+    # Priority: emergency first, then regular, as one atomic step
+    queue_type, patient = queue_engine.dequeue_next()
+    if queue_type is None:
         return jsonify({'message': 'Queue is empty'}), 200
+    
+    eta_engine.record_call(doctor_id, queue_type)
+    return jsonify({'patient': patient, 'queue_type': queue_type}), 200
 
 
 # ==================== SCHEDULER ENDPOINTS ====================
@@ -407,26 +927,108 @@ def assign_patients():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        scheduler = Scheduler(DOCTORS)
+        # mode=specialization routes patients to matching, available specialists
+        data = request.get_json(silent=True) or {}
+        mode = data.get('mode') or request.args.get('mode', 'workload')
+        if mode not in ('workload', 'specialization'):
+            return jsonify({'error': "mode must be 'workload' or 'specialization'"}), 400
+        
+        scheduler = Scheduler(doctor_directory.all(), by_specialization=(mode == 'specialization'))
         
         # Add all patients from queues to scheduler
-        for patient in regular_queue.display():
+        snapshot = queue_engine.snapshot()
+        for patient in snapshot.regular:
             scheduler.add_patient(patient, is_emergency=False)
         
-        for entry in emergency_queue.items:
+        for entry in snapshot.emergency:
             scheduler.add_patient(entry['item'], is_emergency=True, priority=entry['priority'])
         
         # Run greedy assignment algorithm
-        assignments = scheduler.assign_patients()
+        try:
+            assignments = scheduler.assign_patients()
+        except ValueError as e:
+            # e.g. every doctor marked unavailable in specialization mode; the queues are untouched
+            return jsonify({'error': str(e)}), 409
+        save_assignments(assignments)
+        for doctor_id, patients in assignments.items():
+            queue_analytics.on_assign(doctor_id, len(patients))
+        queue_events.publish('assigned', {
+            'mode': mode,
+            'assignments': {doctor_id: len(patients) for doctor_id, patients in assignments.items()}
+        })
         
         return jsonify({
             'message': 'Patients assigned successfully',
+            'mode': mode,
             'assignments': assignments
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def save_assignments(assignments):
+    """Keep the latest scheduler output (in the shared store when workers share state)."""
+    global latest_assignments
+    if shared_store is not None:
+        shared_store.put_value('latest_assignments', assignments)
+    else:
+        latest_assignments = assignments
+
+def load_assignments():
+    """Get the latest scheduler output, from whichever worker ran it."""
+    if shared_store is not None:
+        return shared_store.get_value('latest_assignments', {})
+    return latest_assignments
+
+
+# ==================== EXPORT ENDPOINTS ====================
+
+@app.route('/api/export/patients.ndjson', methods=['GET'])
+def export_patients():
+    """Stream the patient registry as NDJSON, one patient per line."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Walks the registry nodes lazily; nothing is copied up front
+    return ndjson_response(iter(patient_list))
+
+@app.route('/api/export/queue.ndjson', methods=['GET'])
+def export_queue():
+    """Stream both queues as NDJSON, emergency entries first in service order."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Stream an immutable snapshot so later enqueues/dequeues can't break it
+    snapshot = queue_engine.snapshot()
+    
+    def rows():
+        for position, entry in enumerate(snapshot.emergency):
+            yield {'queue_type': 'emergency', 'position': position,
+                   'priority': entry['priority'], 'patient': entry['item']}
+        for position, patient in enumerate(snapshot.regular):
+            yield {'queue_type': 'regular', 'position': position, 'patient': patient}
+    
+    return ndjson_response(rows())
+
+@app.route('/api/export/assignments.ndjson', methods=['GET'])
+def export_assignments():
+    """Stream the latest scheduler assignments as NDJSON, one patient per line."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    assignments = load_assignments()
+    
+    def rows():
+        for doctor_id, patients in assignments.items():
+            for position, patient in enumerate(patients):
+                yield {'doctor_id': doctor_id, 'position': position, 'patient': patient}
+    
+    return ndjson_response(rows())
+
+
 # ==================== DASHBOARD ENDPOINTS ====================
 
 @app.route('/api/dashboard/stats', methods=['GET'])
@@ -436,15 +1038,29 @@ def get_dashboard_stats():
     if not session_data:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    stats = {
-        'total_patients': patient_list.get_size(),
-        'regular_queue_size': regular_queue.size(),
-        'emergency_queue_size': emergency_queue.size(),
-        'total_doctors': len(DOCTORS),
-        'available_doctors': len([d for d in DOCTORS if d['available']])
-    }
+    # Counters are maintained as changes happen, so this is a constant-time read.
+    # Rolling rates change with time, so the counters themselves are the version.
+    stats = dashboard_stats.snapshot()
+    if shared_store is not None:
+        # Queue sizes are shared by all workers; patient totals follow the shared
+        # registry. Arrival/service rates and doctor counts are this worker's
+        queues = queue_engine.snapshot()
+        stats['regular_queue_size'] = len(queues.regular)
+        stats['emergency_queue_size'] = len(queues.emergency)
+    version = '.'.join(str(value) for value in stats.values())
+    return versioned_json('stats', version, lambda: {'stats': stats})
+
+
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    """Get wait-time percentiles, per-doctor throughput and hourly arrivals."""
+    session_data = require_auth()
+    if not session_data:
+        return jsonify({'error': 'Unauthorized'}), 401
     
-    return jsonify({'stats': stats}), 200
+    # Computed over the whole event history; reused until the next event
+    return versioned_json('analytics', queue_analytics.version,
+                          lambda: {'analytics': queue_analytics.summary()})
 
 
 # ==================== ADMIN ENDPOINTS ====================
@@ -459,6 +1075,16 @@ def check_admin_access():
     return jsonify({'message': 'Admin access granted', 'has_access': True}), 200
 
 
+@app.route('/api/admin/admission', methods=['GET'])
+def get_admission_stats():
+    """Get admission-control counters and queue-wait metrics (admin only)."""
+    if not require_admin():
+        return jsonify({'error': 'Access Denied'}), 403
+    if admission is None:
+        return jsonify({'enabled': False, 'streams': stream_slots.stats()}), 200
+    return jsonify({'enabled': True, **admission.stats(), 'streams': stream_slots.stats()}), 200
+
+
 # ==================== HEALTH CHECK ====================
 
 @app.route('/api/health', methods=['GET'])
@@ -3,7 +3,9 @@ Authentication Module
 """
 
 from .auth import AuthManager
+from .session_store import SessionStore
+from .tokens import TokenSigner, RevocationList
 
-__all__ = ['AuthManager']
+__all__ = ['AuthManager', 'SessionStore', 'TokenSigner', 'RevocationList']
 
 
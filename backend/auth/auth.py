@@ -8,18 +8,38 @@ import secrets
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 
+from .session_store import SessionStore
+from .tokens import TokenSigner
+
 class AuthManager:
-    """Manages user authentication and sessions."""
+    """
+    Manages user authentication and sessions.
+    
+    Two session modes:
+    - Stored (default): random tokens looked up in this process's SessionStore
+    - Stateless (token_secret given): HMAC-signed tokens that carry the
+      user id, email, admin flag and expiry, so every worker sharing the
+      secret validates them without a session lookup; logout adds the
+      token to a deny-list until it expires
+    """
     
-    def __init__(self, db):
+    def __init__(self, db, max_sessions=100000, session_ttl=24 * 3600, token_secret=None,
+                 revoked=None):
         """
         Initialize authentication manager.
         
         Args:
             db: Database instance
+            max_sessions: Maximum live sessions (least recently used are evicted)
+            session_ttl: Session lifetime in seconds
+            token_secret: Signing key that enables stateless tokens (e.g. app.secret_key)
+            revoked: Deny-list for revoked stateless tokens (default: in-process
+                     RevocationList)
         """
         self.db = db
-        self.sessions = {}  # In-memory session storage (use Redis in production)
+        # Bounded, self-expiring in-memory session storage (use Redis in production)
+        self.sessions = SessionStore(max_size=max_sessions, ttl=session_ttl)
+        self.tokens = TokenSigner(token_secret, session_ttl, revoked) if token_secret is not None else None
     
     def hash_password(self, password: str) -> str:
         """
@@ -58,13 +78,18 @@ class AuthManager:
         Returns:
             Session token
         """
+        if self.tokens is not None:
+            return self.tokens.issue(user_id, email, self.is_admin(email))
+        
         token = secrets.token_urlsafe(32)
-        self.sessions[token] = {
+        now = datetime.now()
+        self.sessions.add(token, {
             'user_id': user_id,
             'email': email,
-            'created_at': datetime.now(),
-            'expires_at': datetime.now() + timedelta(hours=24)
-        }
+            'is_admin': self.is_admin(email),
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=self.sessions.ttl)
+        })
         return token
     
     def validate_session(self, token: str) -> Optional[Dict]:
@@ -75,17 +100,21 @@ class AuthManager:
             token: Session token
             
         Returns:
-            Session data if valid, None otherwise
+            Session data (user_id, email, is_admin, expires_at) if valid, None otherwise
         """
-        if token not in self.sessions:
-            return None
-        
-        session = self.sessions[token]
-        if datetime.now() > session['expires_at']:
-            del self.sessions[token]
-            return None
+        if self.tokens is not None:
+            claims = self.tokens.verify(token)
+            if claims is None:
+                return None
+            return {
+                'user_id': claims['sub'],
+                'email': claims['email'],
+                'is_admin': claims['adm'],
+                'expires_at': datetime.fromtimestamp(claims['exp'])
+            }
         
-        return session
+        # O(1): expired sessions are dropped by the store itself
+        return self.sessions.get(token)
     
     def destroy_session(self, token: str):
         """
@@ -94,8 +123,10 @@ class AuthManager:
         Args:
             token: Session token
         """
-        if token in self.sessions:
-            del self.sessions[token]
+        if self.tokens is not None:
+            self.tokens.revoke(token)
+        else:
+            self.sessions.remove(token)
     
     def is_admin(self, email: str) -> bool:
         """
@@ -0,0 +1,139 @@
+"""
+Session Store
+Bounded in-memory session storage with expiry and LRU eviction.
+"""
+
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    """
+    Token -> session mapping with a size bound and automatic expiry.
+    
+    - Sessions live in an OrderedDict kept in least-recently-used order,
+      so lookup, touch and LRU eviction are all O(1)
+    - Expiry times go into a min-heap. Every write first pops the sessions
+      whose time has passed, so expired tokens are removed even if nobody
+      presents them again (amortized O(log n) per session)
+    - Once `max_size` sessions exist, creating one evicts the least
+      recently used
+    
+    Heap entries of sessions that were evicted or destroyed early are
+    skipped when they surface, and the heap is rebuilt when such stale
+    entries outnumber the live ones, so memory stays proportional to
+    max_size. All methods are thread-safe.
+    """
+    
+    def __init__(self, max_size=100000, ttl=24 * 3600, clock=time.time):
+        """
+        Initialize an empty store.
+        
+        Args:
+            max_size: Maximum number of live sessions
+            ttl: Session lifetime in seconds
+            clock: Function returning the current time in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # token -> (expires at, session data)
+        self._expiry = []               # heap of (expires at, token)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    def add(self, token, data):
+        """
+        Store a session that expires `ttl` seconds from now.
+        
+        Args:
+            token: Session token
+            data: Session dictionary returned by get()
+        """
+        with self._lock:
+            now = self._clock()
+            self._sweep(now)
+            if token in self._sessions:
+                del self._sessions[token]
+            while len(self._sessions) >= self.max_size:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            expires_at = now + self.ttl
+            self._sessions[token] = (expires_at, data)
+            heapq.heappush(self._expiry, (expires_at, token))
+            if len(self._expiry) > 2 * len(self._sessions) + 64:
+                self._compact()
+    
+    def get(self, token):
+        """
+        Get a live session and mark it recently used.
+        
+        Args:
+            token: Session token
+        
+        Returns:
+            Session dictionary, or None if unknown or expired
+        """
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._sessions[token]
+                return None
+            self._sessions.move_to_end(token)
+            return entry[1]
+    
+    def remove(self, token):
+        """
+        Delete a session.
+        
+        Args:
+            token: Session token
+        
+        Returns:
+            True if the session existed, False otherwise
+        """
+        with self._lock:
+            return self._sessions.pop(token, None) is not None
+    
+    def sweep(self, now=None):
+        """
+        Remove every expired session.
+        
+        Args:
+            now: Current time (default: the store's clock)
+        
+        Returns:
+            Number of sessions removed
+        """
+        with self._lock:
+            return self._sweep(self._clock() if now is None else now)
+    
+    def _sweep(self, now):
+        """Pop expired heap entries (caller holds the lock)."""
+        expiry = self._expiry
+        sessions = self._sessions
+        removed = 0
+        while expiry and expiry[0][0] <= now:
+            expires_at, token = heapq.heappop(expiry)
+            entry = sessions.get(token)
+            if entry is not None and entry[0] == expires_at:
+                del sessions[token]
+                removed += 1
+        return removed
+    
+    def _compact(self):
+        """Rebuild the expiry heap from the live sessions only."""
+        self._expiry = [(expires_at, token) for token, (expires_at, _) in self._sessions.items()]
+        heapq.heapify(self._expiry)
+    
+    def __contains__(self, token):
+        """Check whether a live session exists for the token."""
+        return self.get(token) is not None
+    
+    def __len__(self):
+        """Get the number of stored sessions (expired ones may remain until the next sweep)."""
+        return len(self._sessions)
@@ -0,0 +1,226 @@
+"""
+Signed Session Tokens
+Stateless HMAC-SHA256 tokens that any worker holding the secret key can
+validate, plus a compact deny-list for revoking them early.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+
+
+# Signing keys that must never be used: the fallback key committed in app.py
+# is public, so tokens signed with it could be forged by anyone
+PUBLIC_SECRETS = frozenset({b'dsa-project-secret-key-change-in-production'})
+MIN_SECRET_LENGTH = 16
+
+
+def _b64encode(raw):
+    """URL-safe base64 without padding."""
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    """Decode URL-safe base64 without padding."""
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class RevocationList:
+    """
+    Deny-list of revoked token ids (jti), kept only until the tokens expire.
+    
+    A revoked token would be rejected anyway once its expiry passes, so
+    each entry is dropped at that point: the list holds at most the tokens
+    revoked within one token lifetime. Expired entries are purged whenever
+    the list has doubled since the last purge (amortized O(1) per revoke).
+    """
+    
+    def __init__(self, clock=time.time):
+        """
+        Initialize an empty deny-list.
+        
+        Args:
+            clock: Function returning the current time in seconds
+        """
+        self._revoked = {}  # jti -> expires at
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._purge_at = 64
+    
+    def revoke(self, jti, expires_at):
+        """
+        Reject a token id until it expires.
+        
+        Args:
+            jti: Token id
+            expires_at: Token expiry (seconds since the epoch)
+        """
+        with self._lock:
+            self._revoked[jti] = expires_at
+            if len(self._revoked) >= self._purge_at:
+                self._purge(self._clock())
+                self._purge_at = max(64, 2 * len(self._revoked))
+    
+    def purge(self, now=None):
+        """
+        Drop entries whose tokens have expired.
+        
+        Args:
+            now: Current time (default: the list's clock)
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            return self._purge(self._clock() if now is None else now)
+    
+    def _purge(self, now):
+        """Remove expired entries (caller holds the lock)."""
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        for jti in expired:
+            del self._revoked[jti]
+        return len(expired)
+    
+    def __contains__(self, jti):
+        """Check whether a token id is revoked."""
+        return jti in self._revoked
+    
+    def __len__(self):
+        """Get the number of revoked token ids kept."""
+        return len(self._revoked)
+
+
+class TokenSigner:
+    """
+    Issues and verifies self-contained session tokens.
+    
+    Token format: base64url(JSON claims) + '.' + base64url(HMAC-SHA256).
+    The claims carry the user id, email, admin flag, expiry and a random
+    token id (jti) used for revocation.
+    
+    Verification needs only the secret key and the deny-list: no session
+    lookup, so a token issued by one worker is accepted by every other
+    worker or node configured with the same key. Signatures are compared
+    with hmac.compare_digest (constant time). Claims of recently verified
+    tokens are remembered (up to `cache_size`), so a client presenting the
+    same token on every call skips the HMAC and JSON decoding; expiry and
+    the deny-list are still checked each time.
+    
+    Time Complexity:
+    - issue / verify: O(token length), independent of the number of sessions
+    - revoke: O(1) amortized
+    """
+    
+    def __init__(self, secret, ttl=24 * 3600, revoked=None, clock=time.time, cache_size=10000):
+        """
+        Initialize the signer.
+        
+        Args:
+            secret: Signing key (str or bytes), e.g. Flask's app.secret_key
+            ttl: Token lifetime in seconds
+            revoked: RevocationList to consult (default: a new one)
+            clock: Function returning the current time in seconds
+            cache_size: Verified tokens whose claims are remembered
+        
+        Raises:
+            ValueError: If the secret is shorter than MIN_SECRET_LENGTH bytes
+                        or is a publicly known key
+        """
+        self._key = secret.encode() if isinstance(secret, str) else secret
+        if len(self._key) < MIN_SECRET_LENGTH or self._key in PUBLIC_SECRETS:
+            raise ValueError('Token signing needs a private secret key of at least '
+                             f'{MIN_SECRET_LENGTH} bytes (set SECRET_KEY)')
+        self.ttl = ttl
+        self.revoked = revoked if revoked is not None else RevocationList(clock)
+        self._clock = clock
+        self._verified = {}  # token -> claims of a genuine token
+        self.cache_size = cache_size
+    
+    def _sign(self, payload):
+        """Get the signature of an encoded payload."""
+        return _b64encode(hmac.new(self._key, payload.encode('ascii'), hashlib.sha256).digest())
+    
+    def issue(self, user_id, email, is_admin=False):
+        """
+        Create a signed token.
+        
+        Args:
+            user_id: User ID
+            email: User email
+            is_admin: Whether the user is an administrator
+        
+        Returns:
+            Token string
+        """
+        claims = {
+            'sub': user_id,
+            'email': email,
+            'adm': bool(is_admin),
+            'exp': int(self._clock()) + self.ttl,
+            'jti': secrets.token_urlsafe(9),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        return f"{payload}.{self._sign(payload)}"
+    
+    def claims(self, token):
+        """
+        Get the claims of a token with a valid signature (expiry is not checked).
+        
+        Args:
+            token: Token string
+        
+        Returns:
+            Claims dictionary, or None if the token is malformed or forged
+        """
+        payload, _, signature = token.partition('.')
+        if not signature:
+            return None
+        try:
+            if not hmac.compare_digest(signature.encode('ascii'), self._sign(payload).encode('ascii')):
+                return None
+            return json.loads(_b64decode(payload))
+        except ValueError:  # includes non-ASCII input and bad base64/JSON
+            return None
+    
+    def verify(self, token):
+        """
+        Validate a token.
+        
+        Args:
+            token: Token string
+        
+        Returns:
+            Claims dictionary if the token is genuine, unexpired and not
+            revoked, None otherwise
+        """
+        claims = self._verified.get(token)
+        if claims is None:
+            claims = self.claims(token)
+            if claims is None:
+                return None
+            if len(self._verified) >= self.cache_size:
+                self._verified.clear()
+            self._verified[token] = claims
+        if claims['exp'] <= self._clock() or claims['jti'] in self.revoked:
+            return None
+        return claims
+    
+    def revoke(self, token):
+        """
+        Revoke a token before it expires.
+        
+        Args:
+            token: Token string
+        
+        Returns:
+            True if a valid token was revoked, False otherwise
+        """
+        claims = self.verify(token)
+        if claims is None:
+            return False
+        self.revoked.revoke(claims['jti'], claims['exp'])
+        return True
@@ -0,0 +1,764 @@
+"""
+Benchmark script for DSA structures
+Run all benchmarks:      python benchmark.py
+Run selected benchmarks: python benchmark.py registry
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import sys
+import threading
+import time
+import tracemalloc
+
+from dsa.linked_list import LinkedList
+from dsa.patient_registry import PatientRegistry, RegistryNode
+from dsa.scheduler import Scheduler
+from dsa.search_index import TrigramIndex
+from dsa.prefix_index import PrefixIndex
+from dsa.doctor_directory import DoctorDirectory
+from dsa.concurrent_queue import QueueEngine
+from dsa.priority_queue import PriorityQueue
+from dsa.columnar import QueueEntryLog
+from dsa import analytics as analytics_module
+from dsa.analytics import QueueAnalytics
+from dsa.eta import ETAEngine
+from models.patient import Patient
+from shared_state import SQLiteStateStore, SharedQueueEngine
+from persistence import WriteBehindWriter, SupabasePersistence
+from sqlite_database import SQLiteDatabase
+from auth.auth import AuthManager
+from admission import (AdmissionController, AdmissionPool, Rejected,
+                       PRIORITY_EMERGENCY, PRIORITY_WRITE, PRIORITY_READ)
+
+FIRST_NAMES = ['Abebe', 'Almaz', 'Bekele', 'Dawit', 'Eden', 'Fikir', 'Genet', 'Hana', 'Kebede',
+               'Lidya', 'Meron', 'Naol', 'Rahel', 'Samuel', 'Selam', 'Tigist', 'Yonas', 'Zewdu']
+LAST_NAMES = ['Alemu', 'Bekele', 'Desta', 'Fayera', 'Girma', 'Hailu', 'Kassa', 'Mengistu',
+              'Mulisa', 'Negash', 'Tadesse', 'Tesfaye', 'Wolde', 'Yohannes', 'Zeleke']
+
+
+def make_doctors(count):
+    """Generate a synthetic doctor roster."""
+    return [{'id': f'D{i:05d}', 'name': f'Doctor {i}', 'specialization': 'General Medicine',
+             'available': True} for i in range(count)]
+
+
+def make_patients(count, start=0, seed=42):
+    """Generate synthetic patient records."""
+    rng = random.Random(seed)
+    return [
+        {'id': f'P{i:07d}', 'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}',
+         'age': 20 + i % 60,
+         'condition': 'Checkup', 'is_emergency': False, 'priority': 5}
+        for i in range(start, start + count)
+    ]
+
+
+def timed(func, *args):
+    """Run func(*args) and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_registry():
+    """Bulk load and lookup: LinkedList (linear) vs PatientRegistry (indexed)."""
+    print("\n[BENCH] Patient registry bulk load + find")
+    
+    def load(cls, records):
+        structure = cls()
+        for record in records:
+            structure.append(record)
+        return structure
+    
+    def find_all(structure, records):
+        for record in records[::max(len(records) // 1000, 1)]:
+            structure.find(record['id'])
+    
+    for count in (1_000, 5_000, 20_000):
+        records = make_patients(count)
+        linked, t_linked = timed(load, LinkedList, records)
+        registry, t_registry = timed(load, PatientRegistry, records)
+        _, f_linked = timed(find_all, linked, records)
+        _, f_registry = timed(find_all, registry, records)
+        print(f"  n={count:>9,}  load: LinkedList {t_linked:8.3f}s  "
+              f"PatientRegistry {t_registry:8.3f}s  |  "
+              f"1k finds: LinkedList {f_linked:8.3f}s  PatientRegistry {f_registry:8.4f}s")
+    
+    # LinkedList is quadratic here, so only the registry runs at full size
+    records = make_patients(500_000)
+    _, t_registry = timed(PatientRegistry, records)
+    print(f"  n={len(records):>9,}  load: PatientRegistry {t_registry:8.3f}s "
+          f"(LinkedList skipped: O(n^2))")
+    
+    def walk_pages(registry, limit):
+        cursor, pages = None, 0
+        while True:
+            _, cursor = registry.page(limit, after=cursor)
+            pages += 1
+            if cursor is None:
+                return pages
+    
+    registry = PatientRegistry(records)
+    _, t_display = timed(registry.display)
+    pages, t_pages = timed(walk_pages, registry, 100)
+    print(f"  n={len(records):>9,}  display() {t_display:8.3f}s  |  "
+          f"{pages:,} cursor pages of 100: {t_pages / pages * 1e6:6.1f}us per page")
+
+
+def bench_search(count=1_000_000):
+    """Name substring search: full scan vs TrigramIndex."""
+    print("\n[BENCH] Patient name search")
+    records = make_patients(count)
+    registry = PatientRegistry(records)
+    index = TrigramIndex(field='name')
+    _, t_build = timed(registry.attach_index, index)
+    print(f"  n={count:>9,}  index build {t_build:8.3f}s")
+    
+    def scan(query):
+        query = query.lower()
+        return [p for p in registry.display() if query in p.get('name', '').lower()]
+    
+    for query, limit in (('123456', None), ('almaz fay', None), ('tesfaye', 20), ('na', 20)):
+        expected, t_scan = timed(scan, query)
+        result, t_index = timed(index.search, query, limit)
+        assert result == expected[:limit], f"index results differ for {query!r}"
+        print(f"  q={query!r:<15} limit={str(limit):<5} hits={len(expected):>8,}  "
+              f"scan {t_scan:8.3f}s  index {t_index:8.4f}s")
+
+
+def bench_autocomplete(count=1_000_000):
+    """Name typeahead: full scan vs PrefixIndex."""
+    print("\n[BENCH] Name autocomplete")
+    records = make_patients(count)
+    registry = PatientRegistry(records)
+    index = PrefixIndex(field='name', kind='patient')
+    _, t_build = timed(registry.attach_index, index)
+    print(f"  n={count:>9,}  index build {t_build:8.3f}s")
+    
+    def scan(prefix, limit):
+        prefix = prefix.lower()
+        hits = [p for p in registry
+                if any(word.startswith(prefix) for word in p['name'].lower().split())]
+        return hits[:limit]
+    
+    for prefix in ('a', 'tes', 'mulisa 4242'):
+        _, t_scan = timed(scan, prefix, 10)
+        result, t_index = timed(index.complete, prefix, 10)
+        print(f"  q={prefix!r:<14} top-10 hits={len(result):>3}  scan {t_scan:8.3f}s  index {t_index:8.5f}s")
+    
+    _, t_insert = timed(registry.append, {'id': 'NEW', 'name': 'Zelalem Tesfaye'})
+    print(f"  single insert with index attached {t_insert * 1000:8.3f}ms")
+
+
+def linear_min_assign(doctors, emergencies, regulars):
+    """Reference greedy assignment using a linear min() scan per patient."""
+    assignments = {}
+    doctor_workload = {doc['id']: 0 for doc in doctors}
+    for patient in emergencies + regulars:
+        best_doctor = min(doctor_workload.items(), key=lambda x: x[1])[0]
+        assignments.setdefault(best_doctor, []).append(patient)
+        doctor_workload[best_doctor] += 1
+    return assignments
+
+
+def bench_scheduler():
+    """Greedy assignment: linear min() per patient vs the workload heap."""
+    print("\n[BENCH] Scheduler.assign_patients")
+    
+    def heap_assign(doctors, emergencies, regulars):
+        scheduler = Scheduler(doctors)
+        for priority, patient in emergencies:
+            scheduler.add_patient(patient, is_emergency=True, priority=priority)
+        for patient in regulars:
+            scheduler.add_patient(patient)
+        return scheduler.assign_patients()
+    
+    for doctor_count, patient_count in ((100, 10_000), (1_000, 10_000), (1_000, 100_000)):
+        doctors = make_doctors(doctor_count)
+        patients = make_patients(patient_count)
+        emergencies = [(1 + i % 5, p) for i, p in enumerate(patients[:patient_count // 10])]
+        regulars = patients[patient_count // 10:]
+        result, t_heap = timed(heap_assign, doctors, emergencies, regulars)
+        line = f"  D={doctor_count:>6,} P={patient_count:>9,}  heap {t_heap:8.3f}s"
+        if doctor_count * patient_count <= 10_000_000:
+            ordered = [p for _, _, p in sorted((pr, i, p) for i, (pr, p) in enumerate(emergencies))]
+            expected, t_linear = timed(linear_min_assign, doctors, ordered, regulars)
+            assert result == expected, "heap scheduler diverged from linear greedy order"
+            line += f"  linear min() {t_linear:8.3f}s  (same assignments)"
+        print(line)
+
+
+def bench_doctors(requests=10_000):
+    """Doctor endpoints: linear lookup + json.dumps per request vs DoctorDirectory."""
+    print("\n[BENCH] Doctor list / lookup")
+    
+    for count in (100, 1_000, 10_000):
+        doctors = make_doctors(count)
+        directory = DoctorDirectory(doctors)
+        ids = [doctors[i % count]['id'] for i in range(0, requests * 7919, 7919)]
+        
+        def linear_lookup():
+            for doctor_id in ids:
+                json.dumps({'doctor': next(d for d in doctors if d['id'] == doctor_id)})
+        
+        def indexed_lookup():
+            for doctor_id in ids:
+                directory.doctor_json(doctor_id)
+        
+        def list_each_time():
+            for _ in range(requests // 10):
+                json.dumps({'doctors': doctors})
+        
+        def list_cached():
+            for _ in range(requests // 10):
+                directory.list_json()
+        
+        _, t_linear = timed(linear_lookup)
+        _, t_indexed = timed(indexed_lookup)
+        _, t_dumps = timed(list_each_time)
+        _, t_cached = timed(list_cached)
+        print(f"  D={count:>6,}  {requests:,} lookups: linear {t_linear:7.3f}s  indexed {t_indexed:7.4f}s   "
+              f"{requests // 10:,} lists: dumps {t_dumps:7.3f}s  cached {t_cached:7.4f}s")
+
+
+class GlobalLockQueues(QueueEngine):
+    """Reference engine with one lock around both queues (no fine-grained locking)."""
+    
+    def __init__(self):
+        super().__init__()
+        self._regular_lock = self._emergency_lock = threading.RLock()
+
+
+def bench_concurrency(total_ops=200_000):
+    """
+    Contention on QueueEngine from 1-32 threads.
+    
+    A fixed number of operations is split across the threads: 50% enqueue,
+    49% dequeue_next, 1% snapshot.
+    """
+    print("\n[BENCH] Concurrent queue engine contention")
+    
+    def run(engine, threads):
+        ops_per_thread = total_ops // threads
+        served = []
+        barrier = threading.Barrier(threads)
+        
+        def worker(k):
+            barrier.wait()
+            taken = []
+            for i in range(ops_per_thread):
+                op = i % 10
+                if op < 5:
+                    engine.enqueue((k, i), is_emergency=op == 0, priority=i % 5)
+                elif op < 9 or i % 100 != 99:
+                    queue_type, item = engine.dequeue_next()
+                    if queue_type is not None:
+                        taken.append(item)
+                else:
+                    engine.snapshot()
+            served.extend(taken)
+        
+        pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        
+        # Drain what is left and check that nothing was lost or served twice
+        while True:
+            queue_type, item = engine.dequeue_next()
+            if queue_type is None:
+                break
+            served.append(item)
+        assert len(served) == len(set(served)) == threads * ops_per_thread // 2, "lost or duplicated patients"
+        return threads * ops_per_thread / elapsed
+    
+    for threads in (1, 2, 4, 8, 16, 32):
+        fine = run(QueueEngine(), threads)
+        coarse = run(GlobalLockQueues(), threads)
+        print(f"  threads={threads:>3}  per-queue locks {fine:>10,.0f} ops/s  "
+              f"single lock {coarse:>10,.0f} ops/s  (every patient served once)")
+
+
+def shared_queue_worker(path, worker, ops):
+    """One benchmark process: alternate enqueue / dequeue_next on the shared queues."""
+    engine = SharedQueueEngine(SQLiteStateStore(path))
+    served = []
+    for i in range(ops):
+        if i % 2 == 0:
+            engine.enqueue({'id': f'{worker}-{i}'}, is_emergency=i % 10 == 0, priority=i % 5)
+        else:
+            queue_type, item = engine.dequeue_next()
+            if queue_type is not None:
+                served.append(item['id'])
+    return served
+
+
+def bench_shared(total_ops=20_000):
+    """SharedQueueEngine (SQLite WAL) throughput against the number of worker processes."""
+    print("\n[BENCH] Shared queue state across processes")
+    
+    for workers in (1, 2, 4, 8):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'shared.db')
+            engine = SharedQueueEngine(SQLiteStateStore(path))
+            ops = total_ops // workers
+            with multiprocessing.Pool(workers) as pool:
+                start = time.perf_counter()
+                results = pool.starmap(shared_queue_worker, [(path, w, ops) for w in range(workers)])
+                elapsed = time.perf_counter() - start
+            
+            served = [patient_id for result in results for patient_id in result]
+            while True:
+                queue_type, item = engine.dequeue_next()
+                if queue_type is None:
+                    break
+                served.append(item['id'])
+            assert len(served) == len(set(served)) == workers * ops // 2, "lost or duplicated patients"
+            print(f"  workers={workers:>2}  {workers * ops / elapsed:>9,.0f} ops/s  (every patient served once)")
+
+
+class SlowClient:
+    """Stand-in Supabase client: every request costs one network round-trip."""
+    
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+    
+    def table(self, name):
+        return self
+    
+    def upsert(self, rows):
+        return self
+    
+    def execute(self):
+        time.sleep(self.latency)
+        self.requests += 1
+
+
+def bench_persistence(count=2_000, latency=0.02):
+    """Enqueue+dequeue cost on the request path: a write per change vs write-behind."""
+    print(f"\n[BENCH] Queue persistence ({latency * 1000:.0f}ms simulated round-trip)")
+    patients = make_patients(count)
+    
+    client = SlowClient(latency)
+    
+    def per_request():
+        for patient in patients[:count // 20]:
+            client.table('queue').upsert([patient]).execute()  # enqueue
+            client.table('queue').upsert([patient]).execute()  # dequeue
+    
+    _, t_direct = timed(per_request)
+    print(f"  per-request writes  {count // 20:>6,} patients  {t_direct:8.3f}s  "
+          f"({t_direct / (count // 20) * 1000:.1f}ms per patient, {client.requests:,} requests)")
+    
+    client = SlowClient(latency)
+    writer = WriteBehindWriter(client, batch_size=500, flush_interval=0.5)
+    persistence = SupabasePersistence(writer)
+    
+    def write_behind():
+        for patient in patients:
+            persistence.queue_changed('enqueue', 'regular', patient)
+            persistence.queue_changed('dequeue', 'regular', patient)
+    
+    _, t_buffered = timed(write_behind)
+    _, t_close = timed(writer.close)
+    print(f"  write-behind        {count:>6,} patients  {t_buffered:8.3f}s  "
+          f"({t_buffered / count * 1000:.3f}ms per patient, {client.requests:,} requests, "
+          f"shutdown flush {t_close:.3f}s)")
+
+
+def bench_sqlite(count=1_000_000):
+    """Bulk load synthetic patients into the SQLite backend, then time and explain hot queries."""
+    print("\n[BENCH] SQLite storage backend")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabase(os.path.join(tmp, 'hospital.db'))
+        client = db.get_client()
+        
+        def records():
+            for start in range(0, count, 100_000):
+                yield from make_patients(min(100_000, count - start), start=start)
+        
+        _, t_load = timed(db.bulk_load_patients, records())
+        print(f"  bulk load {count:,} patients  {t_load:8.3f}s  ({count / t_load:,.0f} rows/s)")
+        
+        queue_rows = [{'id': f'E{i}', 'patient_id': f'P{i:07d}', 'priority': 1 + i % 5,
+                       'added_at': f'2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}', 'status': 'waiting'}
+                      for i in range(0, count, 100)]
+        client.table('emergency_queue').upsert(queue_rows).execute()
+        
+        patient_id = f'P{count // 2:07d}'
+        queries = [
+            ('patient by id', "SELECT * FROM patients WHERE id = ?", (patient_id,),
+             lambda: client.table('patients').select('*').eq('id', patient_id).limit(1).execute()),
+            ('name prefix', "SELECT id, name FROM patients WHERE name >= ? AND name < ? LIMIT 10",
+             ('Naol Mulisa', 'Naol Mulisb'), None),
+            ('emergency queue order',
+             "SELECT * FROM emergency_queue WHERE status = 'waiting' ORDER BY priority, added_at LIMIT 50", (),
+             lambda: client.table('emergency_queue').select('*').eq('status', 'waiting')
+             .order('priority').order('added_at').limit(50).execute()),
+            ('queue rows of a patient', "SELECT * FROM queue WHERE patient_id = ?", (patient_id,),
+             lambda: client.table('queue').select('*').eq('patient_id', patient_id).execute()),
+        ]
+        conn = client.connection()
+        for name, sql, params, run in queries:
+            run = run or (lambda: conn.execute(sql, params).fetchall())
+            _, elapsed = timed(lambda: [run() for _ in range(100)])
+            print(f"  {name:<24} {elapsed / 100 * 1000:8.3f}ms  plan: {' | '.join(db.explain(sql, params))}")
+        
+        def load_registry():
+            registry = PatientRegistry()
+            registry.extend(db.iter_rows('patients'))
+            return registry
+        
+        registry, t_registry = timed(load_registry)
+        print(f"  app startup registry load from SQLite  {len(registry):,} patients  {t_registry:8.3f}s")
+
+
+def bench_sessions(count=1_000_000, max_sessions=100_000):
+    """Issue many login tokens: the old unbounded dict vs the bounded SessionStore."""
+    print(f"\n[BENCH] Sessions after {count:,} logins")
+    from datetime import datetime, timedelta
+    import secrets
+    
+    def unbounded_logins():
+        sessions = {}
+        for i in range(count):
+            sessions[secrets.token_urlsafe(32)] = {
+                'user_id': f'U{i}', 'email': 'kiosk@example.com',
+                'created_at': datetime.now(), 'expires_at': datetime.now() + timedelta(hours=24)}
+        return sessions
+    
+    def bounded_logins():
+        auth = AuthManager(None, max_sessions=max_sessions)
+        for i in range(count):
+            auth.create_session(f'U{i}', 'kiosk@example.com')
+        return auth
+    
+    for label, run in (('unbounded dict', unbounded_logins), (f'SessionStore max={max_sessions:,}', bounded_logins)):
+        tracemalloc.start()
+        result, elapsed = timed(run)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = len(result) if isinstance(result, dict) else len(result.sessions)
+        print(f"  {label:<26} live={size:>9,}  memory {current / 2**20:8.1f}MB (peak {peak / 2**20:.1f}MB)  "
+              f"{elapsed / count * 1e6:.2f}us per login (traced)")
+    
+    auth = result
+    tokens = [auth.create_session(f'V{i}', 'kiosk@example.com') for i in range(10_000)]
+    _, t_valid = timed(lambda: [auth.validate_session(token) for token in tokens])
+    _, t_unknown = timed(lambda: [auth.validate_session(f'unknown-{i}') for i in range(10_000)])
+    print(f"  validate_session: {t_valid / len(tokens) * 1e6:.2f}us valid, {t_unknown / 10_000 * 1e6:.2f}us unknown")
+
+
+def bench_tokens(count=100_000):
+    """Session-store tokens vs stateless signed tokens."""
+    print(f"\n[BENCH] Stateless signed tokens, {count:,} logins")
+    stored = AuthManager(None)
+    signed = AuthManager(None, token_secret='benchmark-secret')
+    other_worker = AuthManager(None, token_secret='benchmark-secret')
+    
+    for label, auth, validator in (('session store', stored, stored),
+                                   ('signed, same worker', signed, signed),
+                                   ('signed, other worker', signed, other_worker)):
+        tokens, t_issue = timed(lambda: [auth.create_session(f'U{i}', 'kiosk@example.com') for i in range(count)])
+        results, t_valid = timed(lambda: [validator.validate_session(token) for token in tokens])
+        accepted = sum(result is not None for result in results)
+        print(f"  {label:<22} issue {t_issue / count * 1e6:5.2f}us  validate {t_valid / count * 1e6:5.2f}us  "
+              f"accepted {accepted:,}/{count:,}")
+    
+    active = tokens[:1000] * (count // 1000)  # the same clients polling again and again
+    _, t_repeat = timed(lambda: [other_worker.validate_session(token) for token in active])
+    print(f"  signed, repeat callers validate {t_repeat / len(active) * 1e6:5.2f}us (verified-claims cache)")
+    
+    revoked = tokens[:count // 10]
+    _, t_revoke = timed(lambda: [signed.destroy_session(token) for token in revoked])
+    _, t_valid = timed(lambda: [signed.validate_session(token) for token in tokens])
+    print(f"  revoke {len(revoked):,}: {t_revoke / len(revoked) * 1e6:.2f}us each, deny-list "
+          f"{len(signed.tokens.revoked):,} entries, validate afterwards {t_valid / count * 1e6:.2f}us")
+
+
+def bench_admission(duration=2.0, worker_threads=32):
+    """
+    Dashboard-polling surge against emergency intake, with and without admission control.
+    
+    Simulated gunicorn worker: `worker_threads` request threads. 64 clients
+    poll a 20ms read, 16 clients send 10ms writes, and one client sends an
+    emergency enqueue every 25ms. Shed clients back off for 50ms.
+    """
+    print(f"\n[BENCH] Admission control under a polling surge ({worker_threads} worker threads)")
+    
+    def run(controller):
+        workers = threading.BoundedSemaphore(worker_threads)
+        stop = time.perf_counter() + duration
+        latencies = {'emergency': [], 'write': [], 'read': []}
+        shed = {'emergency': 0, 'write': 0, 'read': 0}
+        
+        def request(endpoint, priority, work, kind, client):
+            start = time.perf_counter()
+            with workers:  # a request holds a worker thread from the start
+                try:
+                    ticket = controller.admit(endpoint, priority, client) if controller else None
+                except Rejected:
+                    shed[kind] += 1
+                    return False
+                try:
+                    time.sleep(work)
+                finally:
+                    if controller:
+                        controller.release(ticket)
+            latencies[kind].append(time.perf_counter() - start)
+            return True
+        
+        def client(endpoint, priority, work, kind, name, pause=0.0):
+            while time.perf_counter() < stop:
+                if not request(endpoint, priority, work, kind, name):
+                    time.sleep(0.05)
+                time.sleep(pause)
+        
+        clients = ([threading.Thread(target=client, args=('get_dashboard_stats', PRIORITY_READ, 0.02, 'read', f'r{i}'))
+                    for i in range(64)]
+                   + [threading.Thread(target=client, args=('create_patient', PRIORITY_WRITE, 0.01, 'write', f'w{i}'))
+                      for i in range(16)]
+                   + [threading.Thread(target=client, args=('add_to_queue', PRIORITY_EMERGENCY, 0.01, 'emergency',
+                                                           'er', 0.025))])
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        return latencies, shed
+    
+    controller = AdmissionController(
+        pools=[AdmissionPool('intake', limit=16, max_waiting=32, max_wait=5.0),
+               AdmissionPool('reads', limit=8, max_waiting=4, max_wait=1.0)],
+        routes={'create_patient': 'intake', 'add_to_queue': 'intake', 'get_dashboard_stats': 'reads'})
+    for label, ctrl in (('no admission control', None), ('admission control', controller)):
+        latencies, shed = run(ctrl)
+        print(f"  {label}:")
+        for kind, values in latencies.items():
+            values.sort()
+            if values:
+                print(f"    {kind:<9} served {len(values):>5,}  shed {shed[kind]:>5,}  "
+                      f"p50 {values[len(values) // 2] * 1000:6.1f}ms  p95 {values[int(len(values) * 0.95)] * 1000:6.1f}ms")
+    waits = controller.stats()['pools']['intake']['wait_ms']
+    print(f"  intake queue wait (ms): {waits}")
+
+
+def bench_bulk(count=50_000):
+    """One request per row vs the /bulk endpoints (JSON and CSV), through the Flask app."""
+    print(f"\n[BENCH] Bulk registration and enqueue, {count:,} rows")
+    os.environ['ADMISSION_CONTROL'] = '0'  # measure the endpoints, not the rate limits
+    import app as server
+    
+    client = server.app.test_client()
+    token = client.post('/api/auth/login', json={'email': 'fayerakena@gmail.com',
+                                                 'password': 'dsa@project'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    rows = [{k: v for k, v in p.items() if k != 'id'} for p in make_patients(count)]
+    csv_body = 'name,age,condition,is_emergency,priority\n' + ''.join(
+        f"{r['name']},{r['age']},{r['condition']},{r['is_emergency']},{r['priority']}\n" for r in rows)
+    
+    def one_at_a_time(path, payloads):
+        return [client.post(path, headers=headers, json=payload).status_code for payload in payloads]
+    
+    def drain():
+        while server.queue_engine.dequeue_next()[0] is not None:
+            pass
+    
+    statuses, t_single = timed(one_at_a_time, '/api/patients', rows)
+    assert set(statuses) == {201}
+    response, t_json = timed(lambda: client.post('/api/patients/bulk', headers=headers, json=rows))
+    assert response.get_json()['accepted'] == count
+    response, t_csv = timed(lambda: client.post('/api/patients/bulk', data=csv_body,
+                                                headers={**headers, 'Content-Type': 'text/csv'}))
+    assert response.get_json()['accepted'] == count
+    print(f"  register one at a time: {t_single:7.2f}s  ({count / t_single:9,.0f} rows/s)")
+    print(f"  register bulk JSON:     {t_json:7.2f}s  ({count / t_json:9,.0f} rows/s)  {t_single / t_json:.0f}x")
+    print(f"  register bulk CSV:      {t_csv:7.2f}s  ({count / t_csv:9,.0f} rows/s)  {t_single / t_csv:.0f}x")
+    
+    ids = [row['id'] for row in response.get_json()['patients']]
+    entries = [{'patient_id': pid, 'is_emergency': i % 10 == 0, 'priority': i % 5 + 1} for i, pid in enumerate(ids)]
+    statuses, t_single = timed(one_at_a_time, '/api/queue/add', entries)
+    assert set(statuses) == {200}
+    drain()
+    response, t_bulk = timed(lambda: client.post('/api/queue/add/bulk', headers=headers, json=entries))
+    assert response.get_json()['accepted'] == count
+    drain()
+    print(f"  enqueue one at a time:  {t_single:7.2f}s  ({count / t_single:9,.0f} rows/s)")
+    print(f"  enqueue bulk JSON:      {t_bulk:7.2f}s  ({count / t_bulk:9,.0f} rows/s)  {t_single / t_bulk:.0f}x")
+
+
+def bench_memory(count=1_000_000):
+    """
+    Memory footprint of 1M patients and queue entries.
+    
+    The registry keeps one dict per patient (indexes, persistence and JSON
+    responses consume dicts); only its nodes are slotted. The slotted
+    Patient model is measured for comparison but is not what the registry
+    stores. Queue entries are compared as heap tuples vs the QueueEntryLog
+    columns the analytics keep.
+    """
+    print(f"\n[BENCH] Memory at {count:,} patients (tracemalloc)")
+    
+    class DictNode:
+        """The registry node before __slots__ (data, next, prev, seq in a __dict__)."""
+        def __init__(self, data, seq):
+            self.data, self.next, self.prev, self.seq = data, None, None, seq
+    
+    class DictPatient:
+        """The Patient model before __slots__."""
+        def __init__(self, **fields):
+            self.__dict__.update(fields)
+    
+    records = [dict(r, phone=f'09{i:08d}', email=f'p{i}@example.com') for i, r in enumerate(make_patients(count))]
+    now = time.time()
+    
+    def measure(label, build):
+        tracemalloc.start()
+        result = build()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"  {label:<44} {current / 2**20:8.1f}MB  {current / count:6.0f}B/patient")
+        return result
+    
+    measure('patient dicts (the records themselves)', lambda: [dict(r) for r in records])
+    measure('registry nodes, __dict__ (old)', lambda: [DictNode(r, i) for i, r in enumerate(records)])
+    measure('registry nodes, __slots__', lambda: [RegistryNode(r, i) for i, r in enumerate(records)])
+    measure('PatientRegistry total (dicts shared)', lambda: PatientRegistry(records))
+    measure('Patient model, __dict__ (old; not stored)', lambda: [DictPatient(**r) for r in records])
+    measure('Patient model, __slots__ (not stored)', lambda: [Patient(**r) for r in records])
+    
+    def heap_entries():
+        queue = PriorityQueue()
+        for r in records:
+            queue.enqueue(r['id'], r['priority'])
+        return queue, [now + i for i in range(count)]
+    
+    def entry_log():
+        log = QueueEntryLog()
+        for r in records:
+            log.append(r['id'], r['priority'], now + len(log), r['is_emergency'])
+        return log
+    
+    measure('queue entries: heap tuples + timestamp list', heap_entries)
+    measure('queue entries: QueueEntryLog columns', entry_log)
+
+
+def bench_analytics(count=1_000_000):
+    """QueueAnalytics.summary over a million historical events: NumPy vs plain Python."""
+    print(f"\n[BENCH] Queue analytics over {count:,} events")
+    rng = random.Random(7)
+    history = QueueAnalytics()
+    start = time.time() - 30 * 24 * 3600
+    doctors = [doctor['id'] for doctor in make_doctors(20)]
+    
+    def record():
+        for i in range(count // 2):
+            at = start + i * 5.0
+            is_emergency = i % 10 == 0
+            history.on_enqueue(f'P{i}', is_emergency, 1 + i % 5 if is_emergency else 5, at=at)
+            if i % 100:  # 1% still waiting
+                history.on_dequeue(f'P{i}', is_emergency, at=at + rng.expovariate(1 / 900))
+                history.on_assign(doctors[i % len(doctors)], at=at + 1000)
+    
+    _, t_record = timed(record)
+    print(f"  record {history.version:,} events: {t_record / history.version * 1e6:.2f}us each")
+    
+    runs = 5
+    for label, module in (('numpy', analytics_module.np), ('plain python', None)):
+        if label == 'numpy' and module is None:
+            print("  numpy: not installed")
+            continue
+        saved, analytics_module.np = analytics_module.np, module
+        try:
+            history.summary()  # warm up
+            summary, elapsed = timed(lambda: [history.summary() for _ in range(runs)])
+        finally:
+            analytics_module.np = saved
+        print(f"  summary ({label}): {elapsed / runs * 1000:8.1f}ms   "
+              f"p50/p95/p99 wait {summary[0]['wait_seconds']['all']['p50']}/"
+              f"{summary[0]['wait_seconds']['all']['p95']}/{summary[0]['wait_seconds']['all']['p99']}s")
+
+
+def bench_eta(count=200_000, lookups=2000):
+    """Per-patient wait estimates: Fenwick-tree positions vs scanning a queue snapshot."""
+    print(f"\n[BENCH] Wait estimates with {count:,} queued patients")
+    rng = random.Random(11)
+    engine = QueueEngine()
+    eta = ETAEngine()
+    eta.set_servers(doctor['id'] for doctor in make_doctors(20))
+    engine.on_change = lambda action, queue_type, item, priority: (
+        eta.on_enqueue(item['id'], queue_type, priority) if action == 'enqueue'
+        else eta.on_dequeue(item['id'], queue_type))
+    
+    def fill():
+        for i in range(count):
+            engine.enqueue({'id': f'P{i}'}, is_emergency=i % 10 == 0, priority=rng.randint(1, 5))
+    
+    _, t_fill = timed(fill)
+    _, t_churn = timed(lambda: [engine.dequeue_next() for _ in range(count // 4)])
+    print(f"  enqueue: {t_fill / count * 1e6:.2f}us   dequeue: {t_churn / (count // 4) * 1e6:.2f}us "
+          f"(queue engine + position tracking)")
+    
+    snapshot = engine.snapshot()
+    waiting = [entry['item']['id'] for entry in snapshot.emergency] + [item['id'] for item in snapshot.regular]
+    sample = rng.sample(waiting, lookups)
+    
+    def scan(patient_id):
+        # What the endpoint would do without the index: walk the service order
+        current = engine.snapshot()
+        for index, entry in enumerate(current.emergency):
+            if entry['item']['id'] == patient_id:
+                return eta.estimate_for(patient_id, 'emergency', index, 0)
+        for index, item in enumerate(current.regular):
+            if item['id'] == patient_id:
+                return eta.estimate_for(patient_id, 'regular', len(current.emergency), index)
+        return None
+    
+    indexed, t_indexed = timed(lambda: [eta.estimate(patient_id) for patient_id in sample])
+    scanned, t_scan = timed(lambda: [scan(patient_id) for patient_id in sample[:lookups // 100]])
+    assert [e['position'] for e in indexed[:lookups // 100]] == [e['position'] for e in scanned]
+    per_indexed = t_indexed / lookups
+    per_scan = t_scan / (lookups // 100)
+    print(f"  estimate (prefix sums): {per_indexed * 1e6:8.2f}us   "
+          f"scan snapshot: {per_scan * 1e3:8.2f}ms   ({per_scan / per_indexed:,.0f}x)")
+
+
+BENCHMARKS = {
+    'registry': bench_registry,
+    'scheduler': bench_scheduler,
+    'search': bench_search,
+    'autocomplete': bench_autocomplete,
+    'doctors': bench_doctors,
+    'concurrency': bench_concurrency,
+    'shared': bench_shared,
+    'persistence': bench_persistence,
+    'sqlite': bench_sqlite,
+    'sessions': bench_sessions,
+    'tokens': bench_tokens,
+    'admission': bench_admission,
+    'bulk': bench_bulk,
+    'memory': bench_memory,
+    'analytics': bench_analytics,
+    'eta': bench_eta,
+}
+
+
+def main(names):
+    """Run the named benchmarks, or all of them."""
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"[ERROR] Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
+
@@ -0,0 +1,199 @@
+"""
+Bulk Import Helpers
+Reading and validating batches of patient and queue rows sent as a JSON
+array or as CSV, for the /bulk endpoints.
+"""
+
+import csv
+import io
+import uuid
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('', '0', 'false', 'no', 'n')
+PRIORITY_LEVELS = range(1, 6)  # 1 is highest
+
+
+def read_rows(stream, content_type, json_body=None):
+    """
+    Iterate over the rows of a bulk request body.
+    
+    CSV (text/csv) is read from the stream line by line, so a large upload
+    is never held in memory as a whole; the first line holds the column
+    names.
+    
+    Args:
+        stream: Binary request body stream
+        content_type: Request mimetype
+        json_body: Parsed JSON body, if the request was JSON
+    
+    Yields:
+        Row dictionaries (CSV values are strings)
+    
+    Raises:
+        ValueError: If the body is neither a JSON array nor CSV
+    """
+    if content_type == 'text/csv':
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    elif isinstance(json_body, list):
+        yield from json_body
+    else:
+        raise ValueError('Send a JSON array of rows or text/csv')
+
+
+def chunked(rows, size):
+    """
+    Group rows into lists of at most `size`.
+    
+    Args:
+        rows: Iterable of rows
+        size: Rows per chunk
+    
+    Yields:
+        Lists of rows
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_bool(value):
+    """Parse a JSON boolean or a CSV flag such as 'true', '1' or 'no'."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower() if value is not None else ''
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def parse_priority(value):
+    """Parse a priority level (1-5, 1 is highest; empty means 5)."""
+    if value is None or value == '':
+        return 5
+    try:
+        priority = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"priority must be a whole number, got {value!r}") from None
+    if priority != value and not isinstance(value, str):
+        raise ValueError(f"priority must be a whole number, got {value!r}")
+    if priority not in PRIORITY_LEVELS:
+        raise ValueError(f"priority must be 1-5, got {priority}")
+    return priority
+
+
+def patient_from_row(row):
+    """
+    Build a patient record from a bulk row.
+    
+    Args:
+        row: Dictionary with 'name' and optional 'id', 'age', 'phone',
+             'email', 'condition', 'is_emergency', 'priority'
+    
+    Returns:
+        Patient dictionary (a new id is assigned when the row has none)
+    
+    Raises:
+        ValueError: If the row is invalid
+    """
+    if not isinstance(row, dict):
+        raise ValueError('row must be an object')
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    age = row.get('age')
+    if age is not None and age != '':
+        try:
+            age = int(age)
+        except (TypeError, ValueError):
+            raise ValueError(f"age must be a whole number, got {age!r}") from None
+        if age < 0:
+            raise ValueError(f"age must not be negative, got {age}")
+    else:
+        age = None
+    return {
+        'id': str(row.get('id') or '').strip() or f"P{uuid.uuid4().hex[:12].upper()}",
+        'name': name,
+        'age': age,
+        'phone': row.get('phone') or None,
+        'email': row.get('email') or None,
+        'condition': row.get('condition') or None,
+        'is_emergency': parse_bool(row.get('is_emergency')),
+        'priority': parse_priority(row.get('priority'))
+    }
+
+
+def queue_entry_from_row(row):
+    """
+    Read one bulk enqueue row.
+    
+    Args:
+        row: Dictionary with 'patient_id' and optional 'is_emergency', 'priority'
+    
+    Returns:
+        Tuple of (patient_id, is_emergency, priority)
+    
+    Raises:
+        ValueError: If the row is invalid
+    """
+    if not isinstance(row, dict):
+        raise ValueError('row must be an object')
+    patient_id = str(row.get('patient_id') or '').strip()
+    if not patient_id:
+        raise ValueError('patient_id is required')
+    return patient_id, parse_bool(row.get('is_emergency')), parse_priority(row.get('priority'))
+
+
+class BulkReport:
+    """
+    Per-row outcome of a bulk request.
+    
+    Rows are numbered from 1 in the order received (for CSV, the first
+    data line after the header is row 1). Only the first `max_errors`
+    errors are listed; 'rejected' in the response has the total.
+    """
+    
+    def __init__(self, max_errors=1000):
+        """
+        Initialize an empty report.
+        
+        Args:
+            max_errors: Maximum number of errors listed in the response
+        """
+        self.max_errors = max_errors
+        self.accepted = []
+        self.errors = []
+        self.error_count = 0
+    
+    def ok(self, row_number, **fields):
+        """Record an accepted row."""
+        self.accepted.append({'row': row_number, **fields})
+    
+    def error(self, row_number, message):
+        """Record a rejected row."""
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'error': message})
+    
+    def to_dict(self, accepted_key):
+        """
+        Get the response body.
+        
+        Args:
+            accepted_key: Name for the list of accepted rows, e.g. 'patients'
+        
+        Returns:
+            Dictionary with counts, accepted rows and errors
+        """
+        return {
+            'accepted': len(self.accepted),
+            'rejected': self.error_count,
+            accepted_key: self.accepted,
+            'errors': self.errors
+        }
@@ -12,10 +12,15 @@ Why Supabase?
 """
 
 import os
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from typing import Optional
 
+from sqlite_database import SQLiteDatabase
+
 load_dotenv()
 
 class Database:
@@ -50,8 +55,122 @@ class Database:
             print(f"Database connection error: {e}")
             return False
 
-# Initialize database instance
-db = Database()
+class CachedDatabase:
+    """
+    Read-through cache in front of a Database for hot reads.
+    
+    - get_patient reads from Supabase only on a miss; results (including
+      "not found") are kept for a per-table TTL
+    - At most `max_entries` results are kept; the least recently used one
+      is evicted first
+    - invalidate() drops cached rows after a write, e.g. from the
+      write-behind writer once a batch is stored. It also bumps the
+      table's generation, so a load that was already running when the
+      write landed is returned but not cached
+    - `stats` counts hits, misses and evictions
+    
+    Without a Supabase client every read returns the empty result and
+    nothing is cached.
+    """
+    
+    DEFAULT_TTLS = {'patients': 60, 'health': 30}
+    
+    def __init__(self, database, ttls=None, max_entries=10000, clock=time.monotonic):
+        """
+        Initialize the cache.
+        
+        Args:
+            database: Database (anything with get_client())
+            ttls: Optional {table: seconds} overriding DEFAULT_TTLS
+            max_entries: Maximum number of cached results
+            clock: Function returning the current time in seconds
+        """
+        self.database = database
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._entries = OrderedDict()  # (table, key) -> (expires at, value); '*' keys hold whole lists
+        self._generations = {}  # table -> number of invalidations
+        self._clock = clock
+        self._lock = threading.Lock()
+    
+    def get_client(self):
+        """Get Supabase client."""
+        return self.database.get_client()
+    
+    def _read(self, table, key, load):
+        """Return a cached result, or load and cache it."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((table, key))
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+            generation = self._generations.get(table, 0)
+        
+        value = load()
+        with self._lock:
+            if self._generations.get(table, 0) != generation:
+                return value  # invalidated while loading: may predate the write
+            self._entries[(table, key)] = (self._clock() + self.ttls.get(table, 60), value)
+            self._entries.move_to_end((table, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return value
+    
+    def get_patient(self, patient_id):
+        """
+        Get one row of the patients table.
+        
+        Args:
+            patient_id: Patient identifier
+        
+        Returns:
+            Patient row, or None if not found (or without a client)
+        """
+        client = self.get_client()
+        if not client:
+            return None
+        
+        def load():
+            rows = client.table('patients').select('*').eq('id', patient_id).limit(1).execute().data
+            return rows[0] if rows else None
+        return self._read('patients', patient_id, load)
+    
+    def test_connection(self):
+        """Test database connection (the result is cached for the 'health' TTL)."""
+        if not self.get_client():
+            return False
+        return self._read('health', '*', self.database.test_connection)
+    
+    def invalidate(self, table, keys=None):
+        """
+        Drop cached results for a table after a write.
+        
+        Args:
+            table: Table that was written
+            keys: Ids of the written rows, or None to drop everything cached
+                  for the table. Cached whole-table lists are always dropped.
+        """
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            if keys is None:
+                for entry_key in [k for k in self._entries if k[0] == table]:
+                    del self._entries[entry_key]
+                return
+            self._entries.pop((table, '*'), None)
+            for key in keys:
+                self._entries.pop((table, key), None)
+
+# Initialize database instance (SQLITE_DB_PATH selects a local SQLite file instead of Supabase)
+if os.getenv('SQLITE_DB_PATH'):
+    db = SQLiteDatabase(os.getenv('SQLITE_DB_PATH'))
+else:
+    db = Database()
+cached_db = CachedDatabase(db)  # Use for reads; writes go through the write-behind writer
 
 # This part only runs if you play this file directly
 if __name__ == "__main__":
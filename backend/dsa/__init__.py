@@ -1,13 +1,26 @@
 """
 Data Structures & Algorithms Module
-Contains implementations of Queue, Priority Queue, Linked List, and Greedy Scheduler
+Contains implementations of Queue, Priority Queue, Concurrent Queue Engine,
+Linked List, Patient Registry, Columnar entry log, Trigram search index, Prefix
+index, Dashboard statistics, Queue analytics, Wait-time estimation, Doctor
+directory, and Greedy Scheduler
 """
 
 from .queue import Queue
 from .priority_queue import PriorityQueue
+from .concurrent_queue import QueueEngine, QueueSnapshot
 from .linked_list import LinkedList, Node
+from .patient_registry import PatientRegistry, RegistryNode
+from .columnar import QueueEntryLog
+from .search_index import TrigramIndex
+from .prefix_index import PrefixIndex
+from .stats import DashboardStats, RollingCounter
+from .analytics import QueueAnalytics
+from .eta import FenwickTree, QueuePositions, ETAEngine
+from .doctor_directory import DoctorDirectory
 from .scheduler import Scheduler
 
-__all__ = ['Queue', 'PriorityQueue', 'LinkedList', 'Node', 'Scheduler']
-
-
+__all__ = ['Queue', 'PriorityQueue', 'QueueEngine', 'QueueSnapshot', 'LinkedList', 'Node',
+           'PatientRegistry', 'RegistryNode', 'QueueEntryLog', 'TrigramIndex',
+           'PrefixIndex', 'DashboardStats', 'RollingCounter', 'QueueAnalytics', 'FenwickTree',
+           'QueuePositions', 'ETAEngine', 'DoctorDirectory', 'Scheduler']
@@ -0,0 +1,237 @@
+"""
+Queue Analytics Implementation
+Records enqueue, dequeue and assignment times in compact arrays and
+summarizes them (wait-time percentiles, per-doctor throughput, hourly
+arrivals) with vectorized NumPy operations.
+"""
+
+import math
+import threading
+import time
+from array import array
+
+from .columnar import QueueEntryLog
+
+try:
+    import numpy as np
+except ImportError:  # optional: summaries fall back to plain Python
+    np = None
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _wait_stats(ordered):
+    """
+    Summarize wait times in seconds.
+    
+    Args:
+        ordered: Waits sorted ascending (NumPy array or list)
+    
+    Returns:
+        Dictionary with count, mean, max and the PERCENTILES (linear
+        interpolation between closest ranks, as numpy.percentile does)
+    """
+    count = len(ordered)
+    if not count:
+        return {'count': 0}
+    mean = float(ordered.mean()) if np is not None else sum(ordered) / count
+    stats = {'count': count, 'mean': round(mean, 1), 'max': round(float(ordered[-1]), 1)}
+    for p in PERCENTILES:
+        rank = (count - 1) * p / 100
+        low = int(rank)
+        high = min(low + 1, count - 1)
+        value = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+        stats[f"p{p}"] = round(float(value), 1)
+    return stats
+
+
+class QueueAnalytics:
+    """
+    Event history of the queues and the scheduler, kept in typed arrays.
+    
+    - Queue entries live in a QueueEntryLog (enqueue and dequeue times,
+      priority, emergency flag); an open-entry map pairs each dequeue with
+      its enqueue in O(1)
+    - Assignments are two parallel arrays: a doctor code (array('i'),
+      an index into `doctor_ids`) and the assignment time (array('d'))
+    
+    summary() copies the arrays out under the lock (a memcpy each) and
+    computes everything with whole-array NumPy operations: no Python
+    loop over events. Without NumPy the same figures are computed in
+    plain Python, which is correct but much slower on large histories.
+    
+    `version` increases on every recorded event, so a summary can be
+    cached until something changes.
+    
+    Time Complexity:
+    - on_enqueue / on_dequeue / on_assign: O(1) amortized
+    - summary: O(n log n) for n events (sorting the waits)
+    """
+    
+    def __init__(self, clock=time.time):
+        """
+        Initialize an empty history.
+        
+        Args:
+            clock: Function returning the current time in seconds
+        """
+        self.entries = QueueEntryLog()
+        self.doctor_ids = []
+        self._doctor_codes = {}   # doctor id -> code
+        self.assigned_doctor = array('i')
+        self.assigned_at = array('d')
+        self._open = {}  # (is_emergency, patient id) -> rows still waiting
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.version = 0
+    
+    def on_enqueue(self, patient_id, is_emergency=False, priority=5, at=None):
+        """
+        Record that a patient joined a queue.
+        
+        Args:
+            patient_id: Patient ID
+            is_emergency: Whether it is the emergency queue
+            priority: Emergency priority (regular entries use 5)
+            at: Event time (default: now)
+        """
+        at = self._clock() if at is None else at
+        with self._lock:
+            row = self.entries.append(patient_id, priority, at, is_emergency)
+            self._open.setdefault((bool(is_emergency), patient_id), []).append(row)
+            self.version += 1
+    
+    def on_dequeue(self, patient_id, is_emergency=False, at=None):
+        """
+        Record that a patient left a queue.
+        
+        Pairs the dequeue with the patient's earliest open entry in that
+        queue (for the emergency queue, the most urgent one - the entry the
+        priority queue serves first).
+        
+        Args:
+            patient_id: Patient ID
+            is_emergency: Whether it is the emergency queue
+            at: Event time (default: now)
+        """
+        at = self._clock() if at is None else at
+        key = (bool(is_emergency), patient_id)
+        with self._lock:
+            rows = self._open.get(key)
+            if not rows:
+                return
+            if is_emergency and len(rows) > 1:
+                row = min(rows, key=lambda r: self.entries.priorities[r])
+                rows.remove(row)
+            else:
+                row = rows.pop(0)
+            if not rows:
+                del self._open[key]
+            self.entries.mark_dequeued(row, at)
+            self.version += 1
+    
+    def on_assign(self, doctor_id, count=1, at=None):
+        """
+        Record patients assigned to a doctor.
+        
+        Args:
+            doctor_id: Doctor ID
+            count: Number of patients assigned
+            at: Event time (default: now)
+        """
+        at = self._clock() if at is None else at
+        with self._lock:
+            code = self._doctor_codes.get(doctor_id)
+            if code is None:
+                code = self._doctor_codes[doctor_id] = len(self.doctor_ids)
+                self.doctor_ids.append(doctor_id)
+            self.assigned_doctor.extend([code] * count)
+            self.assigned_at.extend([at] * count)
+            self.version += 1
+    
+    def _columns(self):
+        """Copy the event arrays (caller holds the lock)."""
+        entries = self.entries
+        if np is not None:
+            # np.array copies, so appends can resume as soon as the lock is released
+            return (np.array(entries.enqueued_at, dtype=np.float64),
+                    np.array(entries.dequeued_at, dtype=np.float64),
+                    np.array(entries.emergency, dtype=np.int8),
+                    np.array(self.assigned_doctor, dtype=np.int32),
+                    np.array(self.assigned_at, dtype=np.float64))
+        return (array('d', entries.enqueued_at), array('d', entries.dequeued_at),
+                array('b', entries.emergency), array('i', self.assigned_doctor),
+                array('d', self.assigned_at))
+    
+    def summary(self):
+        """
+        Compute the analytics over the whole history.
+        
+        Returns:
+            Dictionary with:
+            - wait_seconds: count, mean, max and p50/p90/p95/p99 of served
+              patients' waits, overall and per queue
+            - waiting: entries not dequeued yet
+            - arrivals_by_hour: 24 enqueue counts by local hour of day
+            - doctors: per-doctor assignment count and patients per hour
+            - events: number of recorded enqueues and assignments
+        """
+        with self._lock:
+            enqueued, dequeued, emergency, doctors, assigned_at = self._columns()
+            doctor_ids = list(self.doctor_ids)
+        offset = time.localtime(self._clock()).tm_gmtoff
+        
+        if np is not None:
+            served = ~np.isnan(dequeued)
+            waits = dequeued[served] - enqueued[served]
+            is_emergency = emergency.view(np.bool_)[served]  # 0/1 bytes read as booleans
+            by_queue = {'emergency': np.sort(waits[is_emergency]), 'regular': np.sort(waits[~is_emergency])}
+            # Two sorted runs: a stable (merge) sort joins them in linear time
+            waits = np.sort(np.concatenate((by_queue['emergency'], by_queue['regular'])), kind='stable')
+            waiting = len(enqueued) - len(waits)
+            # Count per absolute hour (a short array), then fold onto the 24 hours of the day
+            if len(enqueued):
+                hours = ((enqueued + offset) * (1 / 3600)).astype(np.int64)
+                first = int(hours.min())
+                per_hour = np.bincount(hours - first)
+                arrivals = np.bincount((np.arange(len(per_hour)) + first) % 24, weights=per_hour,
+                                       minlength=24).astype(np.int64).tolist()
+            else:
+                arrivals = [0] * 24
+            assigned = np.bincount(doctors, minlength=len(doctor_ids)).tolist()
+            span = float(assigned_at.max() - assigned_at.min()) if len(assigned_at) else 0.0
+        else:
+            waits, by_queue = [], {'emergency': [], 'regular': []}
+            for start, end, flag in zip(enqueued, dequeued, emergency):
+                if not math.isnan(end):
+                    waits.append(end - start)
+                    by_queue['emergency' if flag else 'regular'].append(end - start)
+            waits.sort()
+            by_queue['emergency'].sort()
+            by_queue['regular'].sort()
+            waiting = len(enqueued) - len(waits)
+            arrivals = [0] * 24
+            for start in enqueued:
+                arrivals[int((start + offset) // 3600 % 24)] += 1
+            assigned = [0] * len(doctor_ids)
+            for code in doctors:
+                assigned[code] += 1
+            span = max(assigned_at) - min(assigned_at) if assigned_at else 0.0
+        
+        # Throughput over the span of recorded assignments (at least an hour)
+        hours_covered = max(span / 3600, 1.0)
+        return {
+            'wait_seconds': {
+                'all': _wait_stats(waits),
+                'emergency': _wait_stats(by_queue['emergency']),
+                'regular': _wait_stats(by_queue['regular']),
+            },
+            'waiting': waiting,
+            'arrivals_by_hour': arrivals,
+            'doctors': [
+                {'doctor_id': doctor_id, 'assigned': count,
+                 'per_hour': round(count / hours_covered, 2)}
+                for doctor_id, count in zip(doctor_ids, assigned)
+            ],
+            'events': len(enqueued) + len(doctors),
+        }
@@ -0,0 +1,85 @@
+"""
+Columnar Storage Implementation
+Array-backed, column-per-field tables for large numbers of queue entries,
+instead of one dictionary per record.
+"""
+
+import math
+from array import array
+
+NOT_DEQUEUED = math.nan  # dequeued_at of an entry still waiting
+
+
+class QueueEntryLog:
+    """
+    Append-only log of queue entries in parallel columns.
+    
+    Each enqueue adds one row: the patient id, its priority (array('b')),
+    whether it joined the emergency queue (array('b')), the enqueue time
+    and, once served, the dequeue time (array('d'), seconds since the
+    epoch; NaN while waiting) - 18 bytes of numbers and one list slot per
+    entry (the id string is shared with the patient record), instead of a
+    dict or tuple per entry.
+    """
+    
+    def __init__(self):
+        """Initialize an empty log."""
+        self.patient_ids = []
+        self.priorities = array('b')
+        self.emergency = array('b')
+        self.enqueued_at = array('d')
+        self.dequeued_at = array('d')
+    
+    def append(self, patient_id, priority, enqueued_at, is_emergency=False):
+        """
+        Record an enqueue.
+        
+        Args:
+            patient_id: ID of the queued patient
+            priority: Queue priority (1 = highest)
+            enqueued_at: Enqueue time in seconds since the epoch
+            is_emergency: Whether the patient joined the emergency queue
+        
+        Returns:
+            Row number of the entry
+        """
+        self.patient_ids.append(patient_id)
+        self.priorities.append(priority)
+        self.emergency.append(1 if is_emergency else 0)
+        self.enqueued_at.append(enqueued_at)
+        self.dequeued_at.append(NOT_DEQUEUED)
+        return len(self.patient_ids) - 1
+    
+    def mark_dequeued(self, index, dequeued_at):
+        """
+        Record when an entry left the queue.
+        
+        Args:
+            index: Row number returned by append()
+            dequeued_at: Dequeue time in seconds since the epoch
+        """
+        self.dequeued_at[index] = dequeued_at
+    
+    def entry(self, index):
+        """
+        Get one entry.
+        
+        Args:
+            index: Row number
+        
+        Returns:
+            Dictionary with patient_id, priority, is_emergency, enqueued_at
+            and dequeued_at (None while waiting)
+        """
+        dequeued_at = self.dequeued_at[index]
+        return {
+            'patient_id': self.patient_ids[index],
+            'priority': self.priorities[index],
+            'is_emergency': bool(self.emergency[index]),
+            'enqueued_at': self.enqueued_at[index],
+            'dequeued_at': None if math.isnan(dequeued_at) else dequeued_at
+        }
+    
+    def __len__(self):
+        """Get the number of logged entries."""
+        return len(self.patient_ids)
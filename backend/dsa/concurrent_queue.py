@@ -0,0 +1,197 @@
+"""
+Concurrent Queue Engine Implementation
+Thread-safe access to the regular and emergency queues for threaded workers.
+"""
+
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from .queue import Queue
+from .priority_queue import PriorityQueue
+
+
+def check_priority(priority, allowed):
+    """
+    Reject an emergency priority before it reaches a queue.
+    
+    Args:
+        priority: Priority to check
+        allowed: Container of accepted priorities (e.g. range(1, 6)), or
+                 None to accept anything
+    
+    Raises:
+        ValueError: If the priority is not a whole number in `allowed`
+    """
+    if allowed is None:
+        return
+    if isinstance(priority, bool) or not isinstance(priority, int) or priority not in allowed:
+        raise ValueError(f"priority must be a whole number in {allowed}, got {priority!r}")
+
+
+QueueSnapshot = namedtuple('QueueSnapshot', ['version', 'emergency', 'regular'])
+QueueSnapshot.__doc__ = """
+Immutable view of both queues at one moment.
+
+Fields:
+    version: "<regular version>.<emergency version>"
+    emergency: Tuple of {'item', 'priority'} entries in service order
+    regular: Tuple of items in FIFO order
+"""
+
+
+class QueueEngine:
+    """
+    Wraps a regular Queue and an emergency PriorityQueue so they can be
+    shared by many request threads.
+    
+    Locking:
+    - Each queue has its own lock, so regular and emergency enqueues do not
+      wait for each other.
+    - dequeue_next() holds the emergency lock while it falls through to the
+      regular queue, so "emergency first, then regular" is one atomic step
+      and two callers can never receive the same patient.
+    - Locks are always taken emergency first, then regular.
+    
+    Reads go through snapshot(): an immutable copy cached per version.
+    Readers only take the locks when the queues changed since the last
+    snapshot, and never hold them while serializing.
+    
+    `on_change(action, queue_type, item, priority)` is called after every
+    enqueue ('enqueue') and dequeue ('dequeue') while that queue's lock is
+    still held, so events it publishes are in the same order as the changes.
+    With `priorities` set, an emergency priority outside it is rejected
+    before the item is queued, so on_change never sees a value its
+    consumers cannot store.
+    
+    Time Complexity:
+    - enqueue: O(1) regular, O(log n) emergency
+    - enqueue_many: O(k log n) for k items, one lock acquisition
+    - dequeue_next: O(log n)
+    - snapshot: O(1) when unchanged, O(n log n) to rebuild
+    """
+    
+    def __init__(self, regular=None, emergency=None, on_change=None, priorities=None):
+        """
+        Initialize the engine.
+        
+        Args:
+            regular: Queue for regular appointments (default: new Queue)
+            emergency: PriorityQueue for emergency cases (default: new PriorityQueue)
+            on_change: Optional callback(action, queue_type, item, priority)
+            priorities: Accepted emergency priorities, e.g. range(1, 6)
+                        (default: any)
+        """
+        self.regular = regular if regular is not None else Queue()
+        self.emergency = emergency if emergency is not None else PriorityQueue()
+        self.on_change = on_change
+        self.priorities = priorities
+        self._regular_lock = threading.RLock()
+        self._emergency_lock = threading.RLock()
+        self._snapshot = None
+    
+    @property
+    def version(self):
+        """Get the combined "<regular>.<emergency>" version string."""
+        return f"{self.regular.version}.{self.emergency.version}"
+    
+    @contextmanager
+    def locked(self):
+        """
+        Hold both queue locks (emergency first, then regular).
+        
+        Use for multi-step work that must see both queues unchanged, e.g.
+        building a stream snapshot that lines up with published events.
+        """
+        with self._emergency_lock, self._regular_lock:
+            yield self
+    
+    def _changed(self, action, queue_type, item, priority=None):
+        """Report a change to on_change (caller holds the queue's lock)."""
+        if self.on_change is not None:
+            self.on_change(action, queue_type, item, priority)
+    
+    def enqueue(self, item, is_emergency=False, priority=5):
+        """
+        Add an item to the regular or emergency queue.
+        
+        Args:
+            item: The item to add (e.g., patient data)
+            is_emergency: Whether to add to the emergency queue
+            priority: Emergency priority (1 = highest); ignored for regular
+        
+        Returns:
+            'emergency' or 'regular', the queue the item joined
+        
+        Raises:
+            ValueError: If an emergency priority is not in `priorities`
+        """
+        if is_emergency:
+            check_priority(priority, self.priorities)
+            with self._emergency_lock:
+                self.emergency.enqueue(item, priority)
+                self._changed('enqueue', 'emergency', item, priority)
+            return 'emergency'
+        
+        with self._regular_lock:
+            self.regular.enqueue(item)
+            self._changed('enqueue', 'regular', item)
+        return 'regular'
+    
+    def enqueue_many(self, entries):
+        """
+        Add a batch of items, taking the locks once for the whole batch.
+        
+        Args:
+            entries: Iterable of (item, is_emergency, priority) tuples
+        
+        Returns:
+            Dictionary with the number of items added to each queue
+        """
+        counts = {'regular': 0, 'emergency': 0}
+        with self.locked():
+            for item, is_emergency, priority in entries:
+                counts[self.enqueue(item, is_emergency, priority)] += 1
+        return counts
+    
+    def dequeue_next(self):
+        """
+        Atomically remove the next patient: emergency first, then regular.
+        
+        Returns:
+            Tuple of (queue_type, item), or (None, None) if both are empty
+        """
+        with self._emergency_lock:
+            if not self.emergency.is_empty():
+                item = self.emergency.dequeue()
+                self._changed('dequeue', 'emergency', item)
+                return 'emergency', item
+            
+            # Still holding the emergency lock: no emergency can arrive
+            # and be skipped while a regular patient is taken
+            with self._regular_lock:
+                if self.regular.is_empty():
+                    return None, None
+                item = self.regular.dequeue()
+                self._changed('dequeue', 'regular', item)
+                return 'regular', item
+    
+    def snapshot(self):
+        """
+        Get an immutable, consistent view of both queues.
+        
+        Returns:
+            QueueSnapshot, shared by all readers until the next change
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.version:
+            return snapshot
+        
+        with self.locked():
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self.version:
+                snapshot = QueueSnapshot(self.version, tuple(self.emergency.items),
+                                         tuple(self.regular))
+                self._snapshot = snapshot
+            return snapshot
+
@@ -0,0 +1,164 @@
+"""
+Doctor Directory Implementation
+Indexed doctor roster with pre-serialized JSON responses.
+"""
+
+import json
+
+
+class DoctorDirectory:
+    """
+    The doctor roster, indexed by id and by specialization.
+    
+    Doctor records are the same dictionaries passed in, kept in roster
+    order. The encoded JSON for the full list and for each doctor is built
+    on first request and reused until the roster or an availability flag
+    changes, so read endpoints skip serialization entirely.
+    
+    Time Complexity:
+    - get / by_specialization: O(1) dictionary lookups
+    - list_json / doctor_json: O(1) after the first call per version
+    - set_available: O(1); add / remove: O(D) to keep roster order
+    """
+    
+    def __init__(self, doctors=None):
+        """
+        Initialize the directory.
+        
+        Args:
+            doctors: Optional list of doctor dictionaries with an 'id'
+        """
+        self._doctors = []
+        self._by_id = {}
+        self._by_specialization = {}
+        self._encoded = {}  # cache key -> encoded JSON bytes
+        self.version = 0
+        for doctor in doctors or []:
+            self.add(doctor)
+    
+    def _changed(self):
+        """Bump the version and drop cached encodings."""
+        self.version += 1
+        self._encoded.clear()
+    
+    def add(self, doctor):
+        """
+        Add a doctor to the end of the roster.
+        
+        Args:
+            doctor: Doctor dictionary with a unique 'id'
+        
+        Raises:
+            ValueError: If a doctor with the same id already exists
+        """
+        if doctor['id'] in self._by_id:
+            raise ValueError(f"Duplicate doctor id: {doctor['id']}")
+        self._doctors.append(doctor)
+        self._by_id[doctor['id']] = doctor
+        self._by_specialization.setdefault(doctor.get('specialization'), []).append(doctor)
+        self._changed()
+    
+    def remove(self, doctor_id):
+        """
+        Remove a doctor from the roster.
+        
+        Args:
+            doctor_id: Doctor identifier
+        
+        Returns:
+            True if the doctor was found and removed, False otherwise
+        """
+        doctor = self._by_id.pop(doctor_id, None)
+        if doctor is None:
+            return False
+        self._doctors.remove(doctor)
+        self._by_specialization[doctor.get('specialization')].remove(doctor)
+        self._changed()
+        return True
+    
+    def get(self, doctor_id):
+        """
+        Find a doctor by id.
+        
+        Args:
+            doctor_id: Doctor identifier
+        
+        Returns:
+            Doctor dictionary, or None if not found
+        """
+        return self._by_id.get(doctor_id)
+    
+    def by_specialization(self, specialization):
+        """
+        Get the doctors of one specialization, in roster order.
+        
+        Args:
+            specialization: Specialization name
+        
+        Returns:
+            List of doctor dictionaries (empty if none)
+        """
+        return list(self._by_specialization.get(specialization, []))
+    
+    def all(self):
+        """
+        Get every doctor in roster order.
+        
+        Returns:
+            List of doctor dictionaries
+        """
+        return list(self._doctors)
+    
+    def set_available(self, doctor_id, available):
+        """
+        Change a doctor's availability.
+        
+        Args:
+            doctor_id: Doctor identifier
+            available: New availability flag
+        
+        Returns:
+            The updated doctor dictionary, or None if not found
+        """
+        doctor = self._by_id.get(doctor_id)
+        if doctor is None:
+            return None
+        if doctor.get('available') != available:
+            doctor['available'] = available
+            self._changed()
+        return doctor
+    
+    def list_json(self):
+        """
+        Get the encoded {"doctors": [...]} response body.
+        
+        Returns:
+            UTF-8 JSON bytes
+        """
+        body = self._encoded.get(('all',))
+        if body is None:
+            body = self._encoded[('all',)] = json.dumps({'doctors': self._doctors}).encode()
+        return body
+    
+    def doctor_json(self, doctor_id):
+        """
+        Get the encoded {"doctor": {...}} response body for one doctor.
+        
+        Args:
+            doctor_id: Doctor identifier
+        
+        Returns:
+            UTF-8 JSON bytes, or None if the doctor is not found
+        """
+        body = self._encoded.get(('doctor', doctor_id))
+        if body is None:
+            doctor = self._by_id.get(doctor_id)
+            if doctor is None:
+                return None
+            body = self._encoded[('doctor', doctor_id)] = json.dumps({'doctor': doctor}).encode()
+        return body
+    
+    def __len__(self):
+        """Get the number of doctors."""
+        return len(self._doctors)
+
@@ -0,0 +1,373 @@
+"""
+Wait-Time Estimation Implementation
+Live "how long until I'm seen" estimates from queue positions kept in
+Fenwick trees (incremental prefix sums) and running service-time averages.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Service time assumed (seconds) until calls have been observed
+DEFAULT_SERVICE_SECONDS = {'regular': 600.0, 'emergency': 900.0}
+
+
+class FenwickTree:
+    """
+    A binary indexed tree: prefix sums over a growing array of numbers.
+    
+    Time Complexity:
+    - add / prefix: O(log n)
+    - append: O(log n)
+    """
+    
+    def __init__(self, values=()):
+        """
+        Initialize the tree.
+        
+        Args:
+            values: Optional initial values (built in O(n))
+        """
+        tree = [0] + list(values)
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+    
+    def __len__(self):
+        """Get the number of values."""
+        return len(self._tree) - 1
+    
+    def append(self, value):
+        """
+        Add a value at the end.
+        
+        Args:
+            value: Number to append
+        """
+        i = len(self._tree)
+        # Node i covers positions (i - lowbit(i), i]; all but the last are already stored
+        self._tree.append(value + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+    
+    def add(self, index, delta):
+        """
+        Change the value at a position.
+        
+        Args:
+            index: 0-based position
+            delta: Amount to add
+        """
+        tree = self._tree
+        i = index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+    
+    def prefix(self, count):
+        """
+        Sum the first `count` values.
+        
+        Args:
+            count: Number of values from the start
+        
+        Returns:
+            Sum of positions [0, count)
+        """
+        tree = self._tree
+        total = 0
+        i = count
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+class QueuePositions:
+    """
+    The live entries of one FIFO lane, with each entry's rank in O(log n).
+    
+    Every entry gets the next slot of a FenwickTree holding 1 (waiting) or
+    0 (gone), so the number of entries ahead of a slot is a prefix sum.
+    A patient may be in the lane more than once; each patient's slots are
+    kept oldest first. When removed entries outnumber live ones the slots
+    are renumbered, so the tree stays proportional to the lane's length
+    (amortized O(log n) per removal).
+    """
+    
+    def __init__(self):
+        """Initialize an empty lane."""
+        self._tree = FenwickTree()
+        self._slots = {}  # patient id -> deque of slots, oldest first
+        self._live = 0
+    
+    def push(self, patient_id):
+        """
+        Add an entry at the back of the lane.
+        
+        Args:
+            patient_id: ID of the queued patient
+        """
+        slot = len(self._tree)
+        self._tree.append(1)
+        self._slots.setdefault(patient_id, deque()).append(slot)
+        self._live += 1
+    
+    def pop(self, patient_id):
+        """
+        Remove a patient's oldest entry.
+        
+        Args:
+            patient_id: ID of the patient
+        
+        Returns:
+            True if the patient had an entry, False otherwise
+        """
+        slots = self._slots.get(patient_id)
+        if not slots:
+            return False
+        self._tree.add(slots.popleft(), -1)
+        if not slots:
+            del self._slots[patient_id]
+        self._live -= 1
+        if len(self._tree) > 2 * self._live + 64:
+            self._renumber()
+        return True
+    
+    def _renumber(self):
+        """Give the live entries consecutive slots and rebuild the tree."""
+        live = sorted((slot, patient_id) for patient_id, slots in self._slots.items() for slot in slots)
+        self._slots = {}
+        for new_slot, (_, patient_id) in enumerate(live):
+            self._slots.setdefault(patient_id, deque()).append(new_slot)
+        self._tree = FenwickTree([1] * len(live))
+    
+    def rank(self, patient_id):
+        """
+        Count the entries ahead of a patient's oldest entry.
+        
+        Args:
+            patient_id: ID of the patient
+        
+        Returns:
+            Number of entries ahead, or None if the patient is not in the lane
+        """
+        slots = self._slots.get(patient_id)
+        if not slots:
+            return None
+        return self._tree.prefix(slots[0])
+    
+    def __contains__(self, patient_id):
+        """Check whether a patient has an entry in the lane."""
+        return patient_id in self._slots
+    
+    def __len__(self):
+        """Get the number of live entries."""
+        return self._live
+
+
+class ETAEngine:
+    """
+    Estimated wait per queued patient.
+    
+    Queue order mirrors QueueEngine: every emergency entry (lowest
+    priority number first, then arrival) is served before the regular
+    FIFO queue. The emergency queue is one QueuePositions lane per
+    priority level, so a patient's place is the size of the more urgent
+    levels plus a prefix sum in their own lane.
+    
+    Service times are exponentially weighted moving averages, per queue
+    type and per doctor, learned from record_call(): the time between two
+    calls of the same doctor is the service time of the first patient.
+    The estimate is
+        
+        eta = (emergency ahead x emergency avg + regular ahead x regular avg)
+              / capacity
+    
+    where capacity adds up each available doctor's speed (overall average
+    / that doctor's average, 1.0 for a doctor not measured yet).
+    
+    Calls not attributed to a doctor (a front desk calling patients for
+    everyone) measure the whole clinic instead: the gap between two such
+    calls is already time per patient with every doctor working, so it is
+    kept apart (`desk_service`) and used without dividing by capacity.
+    Doctor-attributed measurements take precedence once there are any.
+    
+    Time Complexity:
+    - on_enqueue / on_dequeue: O(log n) amortized
+    - estimate: O(log n + priority levels)
+    - record_call / set_servers: O(available doctors), to update the capacity
+    """
+    
+    def __init__(self, alpha=0.2, max_service=2 * 3600, default_service=None, clock=time.time):
+        """
+        Initialize the engine.
+        
+        Args:
+            alpha: Weight of the newest observation in the moving averages
+            max_service: Longest gap between calls counted as service (seconds);
+                         longer gaps (breaks, end of day) are ignored
+            default_service: Starting averages by queue type (default:
+                             DEFAULT_SERVICE_SECONDS)
+            clock: Function returning the current time in seconds
+        """
+        self.alpha = alpha
+        self.max_service = max_service
+        self.service = dict(default_service or DEFAULT_SERVICE_SECONDS)  # queue type -> avg seconds
+        self.overall_service = sum(self.service.values()) / len(self.service)
+        self.doctor_service = {}  # doctor id -> avg seconds
+        self.desk_service = {}  # queue type -> avg seconds between unattributed calls
+        self.servers = []
+        self.capacity = 1.0
+        self._regular = QueuePositions()
+        self._emergency = {}  # priority -> QueuePositions
+        self._last_call = {}  # doctor id (None: unattributed) -> (time, queue type)
+        self._lock = threading.Lock()
+        self._clock = clock
+    
+    def on_enqueue(self, patient_id, queue_type, priority=5):
+        """
+        Record a patient joining a queue.
+        
+        Args:
+            patient_id: Patient ID
+            queue_type: 'regular' or 'emergency'
+            priority: Emergency priority (1 = highest)
+        """
+        with self._lock:
+            if queue_type == 'emergency':
+                lane = self._emergency.get(priority)
+                if lane is None:
+                    lane = self._emergency[priority] = QueuePositions()
+                lane.push(patient_id)
+            else:
+                self._regular.push(patient_id)
+    
+    def on_dequeue(self, patient_id, queue_type):
+        """
+        Record a patient leaving a queue (their most urgent, oldest entry).
+        
+        Args:
+            patient_id: Patient ID
+            queue_type: 'regular' or 'emergency'
+        """
+        with self._lock:
+            if queue_type != 'emergency':
+                self._regular.pop(patient_id)
+                return
+            for priority in sorted(self._emergency):
+                lane = self._emergency[priority]
+                if lane.pop(patient_id):
+                    if not len(lane):
+                        del self._emergency[priority]
+                    return
+    
+    def record_call(self, doctor_id, queue_type, at=None):
+        """
+        Record a doctor calling their next patient, updating service times.
+        
+        Args:
+            doctor_id: Doctor that called the patient, or None for a call
+                       not attributed to a doctor (front desk)
+            queue_type: Queue the called patient came from
+            at: Call time (default: now)
+        """
+        at = self._clock() if at is None else at
+        with self._lock:
+            previous = self._last_call.get(doctor_id)
+            self._last_call[doctor_id] = (at, queue_type)
+            if previous is None:
+                return
+            duration = at - previous[0]
+            if not 0 < duration <= self.max_service:
+                return
+            alpha = self.alpha
+            if doctor_id is None:
+                average = self.desk_service.get(previous[1])
+                self.desk_service[previous[1]] = duration if average is None else average + alpha * (duration - average)
+                return
+            self.service[previous[1]] += alpha * (duration - self.service[previous[1]])
+            self.overall_service += alpha * (duration - self.overall_service)
+            average = self.doctor_service.get(doctor_id)
+            self.doctor_service[doctor_id] = duration if average is None else average + alpha * (duration - average)
+            self._update_capacity()
+    
+    def set_servers(self, doctor_ids):
+        """
+        Set the doctors currently seeing patients.
+        
+        Args:
+            doctor_ids: Iterable of available doctor IDs
+        """
+        with self._lock:
+            self.servers = list(doctor_ids)
+            self._update_capacity()
+    
+    def _update_capacity(self):
+        """Recompute the sum of the available doctors' speeds (at least 1; caller holds the lock)."""
+        capacity = sum(self.overall_service / self.doctor_service.get(doctor_id, self.overall_service)
+                       for doctor_id in self.servers)
+        self.capacity = max(capacity, 1.0)
+    
+    def _seconds_per_patient(self, queue_type, capacity):
+        """Clinic-wide time per patient of a queue (caller holds the lock)."""
+        if not self.doctor_service and queue_type in self.desk_service:
+            return self.desk_service[queue_type]
+        return self.service[queue_type] / capacity
+    
+    def estimate_for(self, patient_id, queue_type, emergency_ahead, regular_ahead):
+        """
+        Build an estimate from the number of patients ahead.
+        
+        Args:
+            patient_id: Patient ID
+            queue_type: Queue the patient is waiting in
+            emergency_ahead: Emergency patients served first
+            regular_ahead: Regular patients served first
+        
+        Returns:
+            Dictionary with the position, patients ahead, estimated wait in
+            seconds, the expected time it ends and the seconds per patient
+            (across all available doctors) it was based on
+        """
+        with self._lock:
+            capacity = self.capacity
+            per_patient = {queue: self._seconds_per_patient(queue, capacity) for queue in ('emergency', 'regular')}
+        eta_seconds = emergency_ahead * per_patient['emergency'] + regular_ahead * per_patient['regular']
+        return {
+            'patient_id': patient_id,
+            'queue_type': queue_type,
+            'position': emergency_ahead + regular_ahead + 1,
+            'ahead': {'emergency': emergency_ahead, 'regular': regular_ahead},
+            'eta_seconds': round(eta_seconds),
+            'eta_at': self._clock() + eta_seconds,
+            'seconds_per_patient': {queue: round(seconds, 1) for queue, seconds in per_patient.items()},
+            'capacity': round(capacity, 2)
+        }
+    
+    def estimate(self, patient_id):
+        """
+        Estimate a queued patient's wait.
+        
+        Args:
+            patient_id: Patient ID
+        
+        Returns:
+            Estimate dictionary (see estimate_for), or None if the patient
+            is not queued
+        """
+        with self._lock:
+            emergency_ahead = 0
+            for priority in sorted(self._emergency):
+                lane = self._emergency[priority]
+                rank = lane.rank(patient_id)
+                if rank is not None:
+                    queue_type, emergency_ahead, regular_ahead = 'emergency', emergency_ahead + rank, 0
+                    break
+                emergency_ahead += len(lane)
+            else:
+                rank = self._regular.rank(patient_id)
+                if rank is None:
+                    return None
+                queue_type, regular_ahead = 'regular', rank
+        return self.estimate_for(patient_id, queue_type, emergency_ahead, regular_ahead)
@@ -6,6 +6,9 @@ Used for dynamic patient record management.
 class Node:
     """A node in the linked list containing patient data."""
     
+    # No per-node __dict__: a node is just its two references
+    __slots__ = ('data', 'next')
+    
     def __init__(self, data):
         """
         Initialize a node with data.
@@ -0,0 +1,312 @@
+"""
+Patient Registry Data Structure Implementation
+An indexed, insertion-ordered patient list for large record counts.
+"""
+
+import base64
+import binascii
+import json
+import threading
+
+from .linked_list import LinkedList, Node
+
+
+class RegistryNode(Node):
+    """A doubly linked node so any record can be unlinked in O(1)."""
+    
+    __slots__ = ('prev', 'seq')
+    
+    def __init__(self, data, seq=0):
+        """
+        Initialize a node with data.
+        
+        Args:
+            data: The patient data to store
+            seq: Position key; increases from head to tail
+        """
+        super().__init__(data)
+        self.prev = None
+        self.seq = seq
+
+
+class PatientRegistry(LinkedList):
+    """
+    A doubly linked list of patient records with a tail pointer and a hash
+    index on the patient 'id' field.
+    
+    Keeps the LinkedList API (append, prepend, remove, find, display,
+    is_empty, get_size) and insertion order, but replaces the linear scans:
+    
+    Time Complexity:
+    - append / prepend: O(1) (tail pointer)
+    - find / remove: O(1) (id -> node dictionary)
+    - extend: O(k) for k records
+    - page: O(page size) when resuming from a live record
+    
+    Patient IDs must be unique; adding a duplicate raises ValueError.
+    Records without an 'id' are kept in order but cannot be looked up.
+    
+    Secondary indexes (e.g. TrigramIndex) can be attached with
+    attach_index(); they are told about every added and removed record.
+    `version` increases on every change.
+    
+    Changes are serialized by `lock` (re-entrant), which also covers the
+    attached indexes. find() and iteration need no lock: removed nodes keep
+    their `next` link, so a concurrent walk never loses its place. Hold
+    `lock` while querying an attached index from several threads.
+    """
+    
+    def __init__(self, records=None):
+        """
+        Initialize the registry, optionally bulk-loading records.
+        
+        Args:
+            records: Optional iterable of patient dictionaries
+        """
+        super().__init__()
+        self.tail = None
+        self.lock = threading.RLock()
+        self._index = {}
+        self._listeners = []
+        self._first_seq = 0  # next seq for prepend (counts down)
+        self._last_seq = 0   # last seq used by append (counts up)
+        self.version = 0
+        if records is not None:
+            self.extend(records)
+    
+    def _link_last(self, data):
+        """Create a node for data and link it after the current tail."""
+        patient_id = data.get('id')
+        if patient_id is not None and patient_id in self._index:
+            raise ValueError(f"Duplicate patient id: {patient_id}")
+        self._last_seq += 1
+        new_node = RegistryNode(data, self._last_seq)
+        if self.tail is None:
+            self.head = new_node
+        else:
+            new_node.prev = self.tail
+            self.tail.next = new_node
+        self.tail = new_node
+        if patient_id is not None:
+            self._index[patient_id] = new_node
+        self.size += 1
+        self.version += 1
+    
+    def _notify_added(self, records):
+        """Tell attached indexes about newly linked records."""
+        for listener in self._listeners:
+            add_records = getattr(listener, 'add_records', None)
+            if add_records is not None:
+                add_records(records)
+            else:
+                for data in records:
+                    listener.add_record(data)
+    
+    def attach_index(self, index, load_existing=True):
+        """
+        Keep a secondary index in sync with the registry.
+        
+        The index is loaded with the current records, then receives
+        add_record(data) / remove_record(data) calls on every change.
+        Indexes that also define add_records(records) get bulk loads
+        in one call.
+        
+        Args:
+            index: Object with add_record and remove_record methods
+            load_existing: Set False if the index already holds the current
+                           records (e.g. the table they were loaded from)
+        """
+        with self.lock:
+            add_records = getattr(index, 'add_records', None)
+            if load_existing and add_records is not None:
+                add_records(list(self))
+            elif load_existing:
+                for data in self:
+                    index.add_record(data)
+            self._listeners.append(index)
+    
+    def append(self, data):
+        """
+        Add a new patient record to the end of the list.
+        
+        Args:
+            data: Patient data to add
+        
+        Raises:
+            ValueError: If a record with the same id is already registered
+        """
+        with self.lock:
+            self._link_last(data)
+            for listener in self._listeners:
+                listener.add_record(data)
+    
+    def extend(self, records):
+        """
+        Bulk-load patient records in order.
+        
+        Args:
+            records: Iterable of patient dictionaries
+        
+        Raises:
+            ValueError: On the first duplicate id (earlier records stay loaded)
+        """
+        link_last = self._link_last
+        linked = []
+        with self.lock:
+            try:
+                for data in records:
+                    link_last(data)
+                    linked.append(data)
+            finally:
+                if linked:
+                    self._notify_added(linked)
+    
+    def prepend(self, data):
+        """
+        Add a new patient record to the beginning of the list.
+        
+        Args:
+            data: Patient data to add
+        
+        Raises:
+            ValueError: If a record with the same id is already registered
+        """
+        with self.lock:
+            patient_id = data.get('id')
+            if patient_id is not None and patient_id in self._index:
+                raise ValueError(f"Duplicate patient id: {patient_id}")
+            new_node = RegistryNode(data, self._first_seq)
+            self._first_seq -= 1
+            new_node.next = self.head
+            if self.head is None:
+                self.tail = new_node
+            else:
+                self.head.prev = new_node
+            self.head = new_node
+            if patient_id is not None:
+                self._index[patient_id] = new_node
+            self.size += 1
+            self.version += 1
+            for listener in self._listeners:
+                listener.add_record(data)
+    
+    def remove(self, patient_id):
+        """
+        Remove a patient record by ID.
+        
+        Args:
+            patient_id: The ID of the patient to remove
+        
+        Returns:
+            True if patient was found and removed, False otherwise
+        """
+        with self.lock:
+            node = self._index.pop(patient_id, None)
+            if node is None:
+                return False
+            
+            if node.prev is None:
+                self.head = node.next
+            else:
+                node.prev.next = node.next
+            if node.next is None:
+                self.tail = node.prev
+            else:
+                node.next.prev = node.prev
+            # Keep node.next so an iterator parked on this node can still move on
+            node.prev = None
+            self.size -= 1
+            self.version += 1
+            for listener in self._listeners:
+                listener.remove_record(node.data)
+            return True
+    
+    def find(self, patient_id):
+        """
+        Find a patient record by ID.
+        
+        Args:
+            patient_id: The ID of the patient to find
+        
+        Returns:
+            Patient data if found, None otherwise
+        """
+        node = self._index.get(patient_id)
+        return node.data if node is not None else None
+    
+    def page(self, limit, after=None):
+        """
+        Get one page of records in insertion order.
+        
+        The cursor names the last record of the previous page, so records
+        appended while a client is paging show up on later pages and
+        nothing shifts between pages. Resuming from a record that still
+        exists is O(limit); if that record was removed meanwhile, the
+        registry falls back to a scan for the next position.
+        
+        Args:
+            limit: Maximum number of records to return
+            after: Opaque cursor from a previous page, or None to start
+        
+        Returns:
+            Tuple of (list of records, cursor for the next page or None)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        if after is None:
+            node = self.head
+        else:
+            seq, patient_id = self._decode_cursor(after)
+            node = self._index.get(patient_id) if patient_id is not None else None
+            if node is not None and node.seq == seq:
+                node = node.next
+            else:
+                node = self.head
+                while node is not None and node.seq <= seq:
+                    node = node.next
+        
+        records = []
+        last = None
+        while node is not None and len(records) < limit:
+            records.append(node.data)
+            last = node
+            node = node.next
+        
+        next_cursor = self._encode_cursor(last) if last is not None and node is not None else None
+        return records, next_cursor
+    
+    @staticmethod
+    def _encode_cursor(node):
+        """Encode a node position as an opaque URL-safe cursor."""
+        raw = json.dumps([node.seq, node.data.get('id')]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Decode a cursor into (seq, patient id)."""
+        try:
+            # validate=True: characters outside the URL-safe alphabet are errors, not skipped
+            raw = base64.b64decode(cursor + '=' * (-len(cursor) % 4), altchars=b'-_', validate=True)
+            seq, patient_id = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        if not isinstance(seq, int) or not isinstance(patient_id, (str, int, type(None))):
+            raise ValueError("Invalid cursor")
+        return seq, patient_id
+    
+    def __contains__(self, patient_id):
+        """Check whether a patient ID is registered."""
+        return patient_id in self._index
+    
+    def __iter__(self):
+        """Iterate over patient records in insertion order without copying."""
+        current = self.head
+        while current is not None:
+            yield current.data
+            current = current.next
+    
+    def __len__(self):
+        """Get the number of patient records."""
+        return self.size
+
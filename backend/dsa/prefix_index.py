@@ -0,0 +1,168 @@
+"""
+Prefix Index Implementation
+Sorted-array index for name autocomplete (typeahead).
+"""
+
+from bisect import bisect_left
+from operator import itemgetter
+
+
+class PrefixIndex:
+    """
+    A sorted array of (lower-cased name suffix, kind, key) entries, with
+    each entry's payload at the same position of a parallel list.
+    
+    Each name is indexed once per word, starting at that word, so typing
+    either "naol" or "mul" finds "Naol Mulisa". A prefix lookup is a binary
+    search followed by a walk over the matching run, so results come back
+    in alphabetical order without touching the rest of the array.
+    
+    Time Complexity:
+    - complete: O(log n + prefix + k) for k results
+    - add / remove: O(log n) search plus an array shift per word
+    - add_many / add_records: one O(n log n) sort for the whole batch
+    
+    Several kinds of records (e.g. patients and doctors) can share one index;
+    add_record/remove_record let it be attached to a PatientRegistry.
+    """
+    
+    def __init__(self, field='name', key='id', kind='patient'):
+        """
+        Initialize an empty prefix index.
+        
+        Args:
+            field: Record field holding the name (default: 'name')
+            key: Record field that uniquely identifies a record (default: 'id')
+            kind: Kind label used by add_record/remove_record (default: 'patient')
+        """
+        self.field = field
+        self.key = key
+        self.kind = kind
+        self._entries = []   # sorted (text, kind, key) tuples
+        self._payloads = []  # payload of the entry at the same position
+        self._entries_by_key = {}  # (kind, key) -> entries for that record
+    
+    def add(self, name, kind, key, payload):
+        """
+        Index a name (re-indexes it if (kind, key) is already present).
+        
+        Args:
+            name: Name to index
+            kind: Record kind, e.g. 'patient' or 'doctor'
+            key: Record identifier, unique within the kind
+            payload: Value returned by complete() for this record
+        """
+        record_key = (kind, str(key))
+        if record_key in self._entries_by_key:
+            self.remove(kind, key)
+        
+        words = str(name or '').lower().split()
+        entries = []
+        for i in range(len(words)):
+            entry = (' '.join(words[i:]), kind, record_key[1])
+            position = bisect_left(self._entries, entry)
+            self._entries.insert(position, entry)
+            self._payloads.insert(position, payload)
+            entries.append(entry)
+        self._entries_by_key[record_key] = entries
+    
+    def add_many(self, items):
+        """
+        Index many (name, kind, key, payload) tuples with a single sort.
+        
+        Cheaper than repeated add() when loading a large batch, since the
+        array is re-sorted once instead of shifted for every word.
+        
+        Args:
+            items: Iterable of (name, kind, key, payload) tuples
+        """
+        batch = {}
+        for name, kind, key, payload in items:
+            batch[(kind, str(key))] = (name, payload)  # last one wins, like add()
+        
+        for kind, key in batch:
+            if (kind, key) in self._entries_by_key:
+                self.remove(kind, key)
+        
+        rows = list(zip(self._entries, self._payloads))
+        for record_key, (name, payload) in batch.items():
+            kind = record_key[0]
+            words = str(name or '').lower().split()
+            entries = [(' '.join(words[i:]), kind, record_key[1]) for i in range(len(words))]
+            self._entries_by_key[record_key] = entries
+            rows.extend((entry, payload) for entry in entries)
+        rows.sort(key=itemgetter(0))
+        self._entries = [entry for entry, _ in rows]
+        self._payloads = [payload for _, payload in rows]
+    
+    def remove(self, kind, key):
+        """
+        Remove a record from the index.
+        
+        Args:
+            kind: Record kind
+            key: Record identifier
+        
+        Returns:
+            True if the record was indexed, False otherwise
+        """
+        entries = self._entries_by_key.pop((kind, str(key)), None)
+        if entries is None:
+            return False
+        
+        for entry in entries:
+            position = bisect_left(self._entries, entry)
+            del self._entries[position]
+            del self._payloads[position]
+        return True
+    
+    def add_record(self, record):
+        """Index a record dictionary under this index's kind."""
+        payload = {'type': self.kind, 'id': record.get(self.key), 'name': record.get(self.field)}
+        self.add(record.get(self.field), self.kind, record.get(self.key), payload)
+    
+    def add_records(self, records):
+        """Bulk-index record dictionaries under this index's kind."""
+        self.add_many(
+            (record.get(self.field), self.kind, record.get(self.key),
+             {'type': self.kind, 'id': record.get(self.key), 'name': record.get(self.field)})
+            for record in records
+        )
+    
+    def remove_record(self, record):
+        """Remove a record dictionary indexed under this index's kind."""
+        return self.remove(self.kind, record.get(self.key))
+    
+    def complete(self, prefix, limit=10):
+        """
+        Find records with a word starting with the prefix (case-insensitive).
+        
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of results
+        
+        Returns:
+            List of payloads in alphabetical order of the matched text
+        """
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix or limit <= 0:
+            return []
+        
+        entries = self._entries
+        position = bisect_left(entries, (prefix,))
+        results = []
+        seen = set()
+        while position < len(entries) and len(results) < limit:
+            text, kind, key = entries[position]
+            if not text.startswith(prefix):
+                break
+            if (kind, key) not in seen:
+                seen.add((kind, key))
+                results.append(self._payloads[position])
+            position += 1
+        return results
+    
+    def __len__(self):
+        """Get the number of indexed records."""
+        return len(self._entries_by_key)
+
@@ -3,29 +3,44 @@ Priority Queue Data Structure Implementation
 Used for handling emergency patients - higher priority patients are served first.
 """
 
+import heapq
+import itertools
+
+
 class PriorityQueue:
     """
-    A priority queue implementation for emergency cases.
+    A binary-heap priority queue implementation for emergency cases.
     Lower priority number = higher priority (1 is highest, 5 is lowest).
+    
+    Each entry is stored as a (priority, sequence, item) tuple. The sequence
+    number comes from a monotonic counter, so patients with equal priority
+    are served first-come-first-served and items are never compared directly.
+    
+    Time Complexity:
+    - enqueue: O(log n)
+    - dequeue: O(log n)
+    - peek / size / is_empty: O(1)
+    
+    `version` increases on every change, so callers can tell whether the
+    contents changed without comparing them.
     """
     
     def __init__(self):
         """Initialize an empty priority queue."""
-        self.items = []
+        self._heap = []
+        self._counter = itertools.count()
+        self.version = 0
     
     def enqueue(self, item, priority):
         """
         Add an item with a priority to the queue.
-        Items are automatically sorted by priority.
         
         Args:
             item: The item to add (e.g., patient data)
             priority: Priority level (1 = highest, 5 = lowest)
         """
-        entry = {'item': item, 'priority': priority}
-        self.items.append(entry)
-        # Sort by priority (lower number = higher priority)
-        self.items.sort(key=lambda x: x['priority'])
+        heapq.heappush(self._heap, (priority, next(self._counter), item))
+        self.version += 1
     
     def dequeue(self):
         """
@@ -36,7 +51,8 @@ class PriorityQueue:
         """
         if self.is_empty():
             return None
-        return self.items.pop(0)['item']
+        self.version += 1
+        return heapq.heappop(self._heap)[2]
     
     def is_empty(self):
         """
@@ -45,7 +61,7 @@ class PriorityQueue:
         Returns:
             True if empty, False otherwise
         """
-        return len(self.items) == 0
+        return len(self._heap) == 0
     
     def size(self):
         """
@@ -54,7 +70,7 @@ class PriorityQueue:
         Returns:
             The size of the queue
         """
-        return len(self.items)
+        return len(self._heap)
     
     def peek(self):
         """
@@ -65,7 +81,21 @@ class PriorityQueue:
         """
         if self.is_empty():
             return None
-        return self.items[0]['item']
+        return self._heap[0][2]
+    
+    @property
+    def items(self):
+        """
+        Get all entries in service order as {'item', 'priority'} dictionaries.
+        
+        The heap itself is only partially ordered, so this sorts a copy.
+        Use it for display, not on hot paths.
+        
+        Returns:
+            List of entries sorted by priority, then arrival order
+        """
+        return [{'item': item, 'priority': priority}
+                for priority, _, item in sorted(self._heap)]
     
     def display(self):
         """
@@ -74,6 +104,5 @@ class PriorityQueue:
         Returns:
             List of all items sorted by priority
         """
-        return [entry['item'] for entry in self.items]
-
+        return [item for _, _, item in sorted(self._heap)]
 
@@ -3,15 +3,28 @@ Queue Data Structure Implementation
 A simple FIFO (First In First Out) queue for managing patient appointments.
 """
 
+from collections import deque
+from itertools import islice
+
+
 class Queue:
     """
-    A basic queue implementation using a list.
+    A queue implementation backed by collections.deque.
     Follows FIFO principle - first patient in is first patient out.
+    
+    Time Complexity:
+    - enqueue / dequeue / peek: O(1)
+    - enqueue_many / dequeue_many: O(k) for k items
+    - slice(start, stop): O(stop), without copying the rest of the queue
+    
+    `version` increases on every change, so callers can tell whether the
+    contents changed without comparing them.
     """
     
     def __init__(self):
         """Initialize an empty queue."""
-        self.items = []
+        self.items = deque()
+        self.version = 0
     
     def enqueue(self, item):
         """
@@ -21,6 +34,19 @@ class Queue:
             item: The item to add to the queue
         """
         self.items.append(item)
+        self.version += 1
+    
+    def enqueue_many(self, items):
+        """
+        Add several items to the rear of the queue, preserving their order.
+        
+        Args:
+            items: Iterable of items to add to the queue
+        """
+        count = len(self.items)
+        self.items.extend(items)
+        if len(self.items) != count:
+            self.version += 1
     
     def dequeue(self):
         """
@@ -31,7 +57,24 @@ class Queue:
         """
         if self.is_empty():
             return None
-        return self.items.pop(0)
+        self.version += 1
+        return self.items.popleft()
+    
+    def dequeue_many(self, count):
+        """
+        Remove and return up to `count` items from the front of the queue.
+        
+        Args:
+            count: Maximum number of items to remove
+        
+        Returns:
+            List of removed items in FIFO order (shorter if the queue runs out)
+        """
+        count = max(min(count, len(self.items)), 0)
+        if count:
+            self.version += 1
+        popleft = self.items.popleft
+        return [popleft() for _ in range(count)]
     
     def is_empty(self):
         """
@@ -62,6 +105,27 @@ class Queue:
             return None
         return self.items[0]
     
+    def slice(self, start=0, stop=None):
+        """
+        Iterate over part of the queue without copying it.
+        
+        Args:
+            start: Position of the first item (0 is the front)
+            stop: Position to stop before, or None for the rear
+        
+        Returns:
+            Iterator over the selected items in FIFO order
+        """
+        return islice(self.items, start, stop)
+    
+    def __iter__(self):
+        """Iterate over the queue from front to rear without copying it."""
+        return iter(self.items)
+    
+    def __len__(self):
+        """Get the number of items in the queue."""
+        return len(self.items)
+    
     def display(self):
         """
         Get all items in the queue (for display purposes).
@@ -69,6 +133,5 @@ class Queue:
         Returns:
             List of all items in the queue
         """
-        return self.items.copy()
-
+        return list(self.items)
 
@@ -3,10 +3,76 @@ Greedy Scheduling Algorithm Implementation
 Assigns patients to doctors efficiently using a greedy approach.
 """
 
+import heapq
+import re
+
 from .queue import Queue
 from .priority_queue import PriorityQueue
 
 
+# Fallback specialization when a condition has no mapping or no available doctor
+DEFAULT_SPECIALIZATION = 'General Medicine'
+EMERGENCY_SPECIALIZATION = 'Emergency Medicine'
+
+# Condition keyword -> specialization used by specialization-aware scheduling.
+# Conditions are matched case-insensitively, first exactly, then by whole-word keyword.
+CONDITION_SPECIALIZATIONS = {
+    'chest pain': 'Cardiology',
+    'heart': 'Cardiology',
+    'palpitations': 'Cardiology',
+    'high blood pressure': 'Cardiology',
+    'hypertension': 'Cardiology',
+    'broken': 'Orthopedics',
+    'fracture': 'Orthopedics',
+    'sprain': 'Orthopedics',
+    'back pain': 'Orthopedics',
+    'joint': 'Orthopedics',
+    'headache': 'Neurology',
+    'migraine': 'Neurology',
+    'seizure': 'Neurology',
+    'stroke': 'Neurology',
+    'dizziness': 'Neurology',
+    'fever': 'General Medicine',
+    'cold': 'General Medicine',
+    'flu': 'General Medicine',
+    'cough': 'General Medicine',
+}
+
+# Patients younger than this are routed to Pediatrics when no condition matches
+PEDIATRIC_AGE_LIMIT = 16
+
+
+def specialization_for(patient):
+    """
+    Map a patient to the specialization that should treat them.
+    
+    Lookup cost depends only on the size of CONDITION_SPECIALIZATIONS,
+    never on the number of doctors.
+    
+    Args:
+        patient: Patient data dictionary
+    
+    Returns:
+        Specialization name, or None if nothing matches
+    """
+    condition = (patient.get('condition') or '').strip().lower()
+    if condition in CONDITION_SPECIALIZATIONS:
+        return CONDITION_SPECIALIZATIONS[condition]
+    for keyword, specialization in CONDITION_SPECIALIZATIONS.items():
+        # Whole words only: 'cold' matches "common cold" but not "scold"
+        if re.search(r'\b' + re.escape(keyword) + r'\b', condition):
+            return specialization
+    
+    # Ages may arrive as strings (form fields, CSV rows)
+    try:
+        age = int(patient.get('age'))
+    except (TypeError, ValueError):
+        return None
+    if 0 <= age < PEDIATRIC_AGE_LIMIT:
+        return 'Pediatrics'
+    return None
+
+
 class Scheduler:
     """
     Greedy scheduling algorithm for assigning patients to doctors.
@@ -15,16 +81,30 @@ class Scheduler:
     1. Always assign the highest priority patient first (emergency cases)
     2. Assign to the doctor with the least current workload
     3. This ensures urgent cases are handled quickly and workload is balanced
+    
+    Doctor workloads are kept in a min-heap keyed by (workload, roster
+    position), so each pick is O(log D) instead of a scan over every doctor
+    and a full pass costs O(P log D). Ties go to the doctor listed first,
+    exactly as a linear min() over the roster would.
+    
+    With by_specialization=True, only available doctors are scheduled and
+    each specialization gets its own workload heap. Patients are routed with
+    specialization_for(); emergencies fall back to Emergency Medicine, then
+    everyone falls back to General Medicine, and finally to the least loaded
+    doctor of any specialization.
     """
     
-    def __init__(self, doctors):
+    def __init__(self, doctors, by_specialization=False):
         """
         Initialize the scheduler with available doctors.
         
         Args:
             doctors: List of doctor objects with their availability
+            by_specialization: Route patients to matching specializations
+                and skip unavailable doctors
         """
         self.doctors = doctors
+        self.by_specialization = by_specialization
         self.regular_queue = Queue()
         self.emergency_queue = PriorityQueue()
         self.assignments = {}  # Track doctor-patient assignments
@@ -43,6 +123,54 @@ class Scheduler:
         else:
             self.regular_queue.enqueue(patient)
     
+    def _build_pools(self):
+        """
+        Build the workload heaps used for doctor selection.
+        
+        Returns:
+            Dictionary of pool name -> heap of (workload, roster position, doctor id).
+            The default mode uses a single pool named None.
+        """
+        pools = {}
+        for position, doc in enumerate(self.doctors):
+            if self.by_specialization:
+                if not doc.get('available', True):
+                    continue
+                key = doc.get('specialization') or DEFAULT_SPECIALIZATION
+            else:
+                key = None
+            pools.setdefault(key, []).append((0, position, doc['id']))
+        for heap in pools.values():
+            heapq.heapify(heap)
+        return pools
+    
+    def _select_pool(self, pools, patient, is_emergency):
+        """
+        Choose the workload heap a patient should be assigned from.
+        
+        Args:
+            pools: Pools built by _build_pools
+            patient: Patient data dictionary
+            is_emergency: True if the patient came from the emergency queue
+        
+        Returns:
+            The selected heap (never empty)
+        """
+        if not self.by_specialization:
+            return pools[None]
+        
+        candidates = [specialization_for(patient)]
+        if is_emergency:
+            candidates.append(EMERGENCY_SPECIALIZATION)
+        candidates.append(DEFAULT_SPECIALIZATION)
+        for specialization in candidates:
+            heap = pools.get(specialization)
+            if heap:
+                return heap
+        
+        # No matching specialist at all: least loaded doctor across pools
+        return min(pools.values(), key=lambda heap: heap[0])
+    
     def assign_patients(self):
         """
         Greedy algorithm to assign patients to doctors.
@@ -51,34 +179,34 @@ class Scheduler:
         1. First, assign all emergency patients (highest priority first)
         2. Then, assign regular patients
         3. For each patient, choose the doctor with minimum current workload
+           (within the patient's specialization pool when by_specialization is set)
         
         Returns:
             Dictionary of doctor-patient assignments
         """
         assignments = {}
         
-        # Initialize doctor workload tracking
-        doctor_workload = {doc['id']: 0 for doc in self.doctors}
+        # Initialize doctor workload tracking: (workload, roster position, doctor id)
+        pools = self._build_pools()
+        if not pools and (self.emergency_queue.size() or self.regular_queue.size()):
+            raise ValueError("No doctors available for assignment")
         
-        # Step 1: Assign emergency patients first (greedy: always handle urgent cases first)
-        while not self.emergency_queue.is_empty():
-            patient = self.emergency_queue.dequeue()
+        def assign(patient, is_emergency):
             # Greedy choice: assign to doctor with least workload
-            best_doctor = min(doctor_workload.items(), key=lambda x: x[1])[0]
+            workload_heap = self._select_pool(pools, patient, is_emergency)
+            workload, position, best_doctor = workload_heap[0]
             if best_doctor not in assignments:
                 assignments[best_doctor] = []
             assignments[best_doctor].append(patient)
-            doctor_workload[best_doctor] += 1
+            heapq.heapreplace(workload_heap, (workload + 1, position, best_doctor))
+        
+        # Step 1: Assign emergency patients first (greedy: always handle urgent cases first)
+        while not self.emergency_queue.is_empty():
+            assign(self.emergency_queue.dequeue(), True)
         
         # Step 2: Assign regular patients (greedy: balance workload)
         while not self.regular_queue.is_empty():
-            patient = self.regular_queue.dequeue()
-            # Greedy choice: assign to doctor with least workload
-            best_doctor = min(doctor_workload.items(), key=lambda x: x[1])[0]
-            if best_doctor not in assignments:
-                assignments[best_doctor] = []
-            assignments[best_doctor].append(patient)
-            doctor_workload[best_doctor] += 1
+            assign(self.regular_queue.dequeue(), False)
         
         self.assignments = assignments
         return assignments
@@ -97,4 +225,3 @@ class Scheduler:
             'next_emergency': self.emergency_queue.peek()
         }
 
-
@@ -0,0 +1,146 @@
+"""
+Trigram Inverted Index Implementation
+Substring search over patient names without scanning every record.
+"""
+
+import heapq
+
+
+class TrigramIndex:
+    """
+    An inverted index from 3-character substrings (trigrams) to records.
+    
+    Every indexed name is lower-cased and split into its trigrams; each
+    trigram keeps a posting set of record sequence numbers. A substring
+    query only needs to look at records that contain all of its trigrams,
+    and the candidates are then confirmed with a real substring check.
+    
+    Results come back in insertion order, like a scan of the registry would.
+    
+    Time Complexity:
+    - add_record / remove_record: O(L) for a name of length L
+    - search: O(smallest posting set + k log k) for k candidates, instead of
+      O(N * L) over every record
+    
+    Can be attached to a PatientRegistry so it follows appends and removals.
+    """
+    
+    GRAM = 3
+    
+    def __init__(self, field='name', key='id'):
+        """
+        Initialize an empty index.
+        
+        Args:
+            field: Record field to index (default: 'name')
+            key: Record field that uniquely identifies a record (default: 'id')
+        """
+        self.field = field
+        self.key = key
+        self._postings = {}   # trigram -> set of sequence numbers
+        self._records = {}    # sequence number -> (lower-cased text, record)
+        self._seq_by_key = {}  # record key -> sequence number
+        self._next_seq = 0
+    
+    def _grams(self, text):
+        """Get the distinct trigrams of a lower-cased string."""
+        gram = self.GRAM
+        if len(text) < gram:
+            # Very short names are indexed whole so short queries still find them
+            return {text} if text else set()
+        return {text[i:i + gram] for i in range(len(text) - gram + 1)}
+    
+    def add_record(self, record):
+        """
+        Index a record (re-indexes it if the key is already present).
+        
+        Args:
+            record: Dictionary with the key and text fields
+        """
+        record_key = record.get(self.key)
+        if record_key in self._seq_by_key:
+            self.remove_record(record)
+        
+        text = str(record.get(self.field) or '').lower()
+        seq = self._next_seq
+        self._next_seq += 1
+        self._records[seq] = (text, record)
+        self._seq_by_key[record_key] = seq
+        postings = self._postings
+        for gram in self._grams(text):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {seq}
+            else:
+                posting.add(seq)
+    
+    def remove_record(self, record):
+        """
+        Remove a record from the index.
+        
+        Args:
+            record: Dictionary with the key field
+        
+        Returns:
+            True if the record was indexed, False otherwise
+        """
+        seq = self._seq_by_key.pop(record.get(self.key), None)
+        if seq is None:
+            return False
+        
+        text, _ = self._records.pop(seq)
+        for gram in self._grams(text):
+            posting = self._postings[gram]
+            posting.discard(seq)
+            if not posting:
+                del self._postings[gram]
+        return True
+    
+    def _candidates(self, query):
+        """Get sequence numbers of records that may contain the query."""
+        if len(query) >= self.GRAM:
+            postings = []
+            for gram in self._grams(query):
+                posting = self._postings.get(gram)
+                if not posting:
+                    return set()
+                postings.append(posting)
+            postings.sort(key=len)
+            return postings[0].intersection(*postings[1:])
+        
+        # Shorter than a trigram: union the postings of every trigram that
+        # contains it. The number of distinct trigrams is bounded by the
+        # alphabet, not by the number of records.
+        candidates = set()
+        for gram, posting in self._postings.items():
+            if query in gram:
+                candidates.update(posting)
+        return candidates
+    
+    def search(self, query, limit=None):
+        """
+        Find records whose indexed text contains the query (case-insensitive).
+        
+        Args:
+            query: Substring to look for
+            limit: Maximum number of results, or None for all
+        
+        Returns:
+            List of matching records in insertion order
+        """
+        query = query.lower()
+        if not query:
+            return []
+        
+        records = self._records
+        matches = [seq for seq in self._candidates(query) if query in records[seq][0]]
+        if limit is not None and limit < len(matches):
+            matches = heapq.nsmallest(limit, matches)
+        else:
+            matches.sort()
+        return [records[seq][1] for seq in matches]
+    
+    def __len__(self):
+        """Get the number of indexed records."""
+        return len(self._records)
+
@@ -0,0 +1,189 @@
+"""
+Incremental Statistics Implementation
+Constant-time dashboard counters and rolling per-minute rates.
+"""
+
+import threading
+import time
+
+
+class RollingCounter:
+    """
+    Counts events over a sliding time window using a ring of buckets.
+    
+    The window is split into fixed buckets (one second each by default).
+    A bucket is reset lazily the first time it is reused, so recording
+    is O(1) and reading is O(number of buckets), independent of traffic.
+    """
+    
+    def __init__(self, window=60, buckets=60, clock=time.monotonic):
+        """
+        Initialize an empty counter.
+        
+        Args:
+            window: Window length in seconds
+            buckets: Number of buckets the window is split into
+            clock: Function returning the current time in seconds
+        """
+        self.window = window
+        self._width = window / buckets
+        self._counts = [0] * buckets
+        self._slots = [None] * buckets  # absolute slot number each bucket holds
+        self._clock = clock
+    
+    def record(self, count=1):
+        """
+        Record events at the current time.
+        
+        Args:
+            count: Number of events to add
+        """
+        slot = int(self._clock() // self._width)
+        index = slot % len(self._counts)
+        if self._slots[index] != slot:
+            self._slots[index] = slot
+            self._counts[index] = 0
+        self._counts[index] += count
+    
+    def total(self):
+        """
+        Get the number of events recorded within the window.
+        
+        Returns:
+            Event count over the last `window` seconds
+        """
+        current = int(self._clock() // self._width)
+        oldest = current - len(self._counts) + 1
+        return sum(count for slot, count in zip(self._slots, self._counts)
+                   if slot is not None and oldest <= slot <= current)
+
+
+class DashboardStats:
+    """
+    Dashboard counters updated as changes happen, so reads are O(1).
+    
+    - Patient totals follow the registry (attach with
+      PatientRegistry.attach_index, which calls add_record/remove_record)
+    - Queue sizes and arrival/service counts are updated through
+      on_enqueue/on_dequeue
+    - Doctor totals are set once with set_doctors and updated through
+      set_doctor_available
+    
+    Arrival and service rates are rolling per-minute counts.
+    
+    Every method takes an internal lock, so the hooks may be called from
+    several request threads at once.
+    """
+    
+    def __init__(self, clock=time.monotonic):
+        """
+        Initialize all counters at zero.
+        
+        Args:
+            clock: Function returning the current time in seconds
+        """
+        self.total_patients = 0
+        self.queue_sizes = {'regular': 0, 'emergency': 0}
+        self.enqueued_total = 0
+        self.dequeued_total = 0
+        self.total_doctors = 0
+        self.available_doctors = 0
+        self._doctor_available = {}
+        self.arrivals = RollingCounter(clock=clock)
+        self.services = RollingCounter(clock=clock)
+        self._lock = threading.Lock()
+    
+    def add_record(self, record):
+        """Count a patient added to the registry."""
+        with self._lock:
+            self.total_patients += 1
+    
+    def add_records(self, records):
+        """Count a batch of patients added to the registry."""
+        with self._lock:
+            self.total_patients += len(records)
+    
+    def remove_record(self, record):
+        """Count a patient removed from the registry."""
+        with self._lock:
+            self.total_patients -= 1
+    
+    def on_enqueue(self, queue_type, count=1):
+        """
+        Record patients joining a queue.
+        
+        Args:
+            queue_type: 'regular' or 'emergency'
+            count: Number of patients added
+        """
+        with self._lock:
+            self.queue_sizes[queue_type] += count
+            self.enqueued_total += count
+            self.arrivals.record(count)
+    
+    def on_dequeue(self, queue_type, count=1):
+        """
+        Record patients leaving a queue to be seen.
+        
+        Args:
+            queue_type: 'regular' or 'emergency'
+            count: Number of patients removed
+        """
+        with self._lock:
+            self.queue_sizes[queue_type] -= count
+            self.dequeued_total += count
+            self.services.record(count)
+    
+    def set_doctors(self, doctors):
+        """
+        Reset doctor counters from a roster.
+        
+        Args:
+            doctors: List of doctor dictionaries with 'id' and 'available'
+        """
+        with self._lock:
+            self._doctor_available = {d['id']: bool(d.get('available', True)) for d in doctors}
+            self.total_doctors = len(self._doctor_available)
+            self.available_doctors = sum(self._doctor_available.values())
+    
+    def set_doctor_available(self, doctor_id, available):
+        """
+        Record a doctor's availability change.
+        
+        Args:
+            doctor_id: Doctor identifier
+            available: New availability flag
+        """
+        available = bool(available)
+        with self._lock:
+            previous = self._doctor_available.get(doctor_id)
+            if previous is None:
+                self.total_doctors += 1
+            elif previous == available:
+                return
+            elif previous:
+                self.available_doctors -= 1
+            self._doctor_available[doctor_id] = available
+            if available:
+                self.available_doctors += 1
+    
+    def snapshot(self):
+        """
+        Get all dashboard statistics.
+        
+        Returns:
+            Dictionary of counters and per-minute rates
+        """
+        with self._lock:
+            return {
+                'total_patients': self.total_patients,
+                'regular_queue_size': self.queue_sizes['regular'],
+                'emergency_queue_size': self.queue_sizes['emergency'],
+                'total_doctors': self.total_doctors,
+                'available_doctors': self.available_doctors,
+                'enqueued_total': self.enqueued_total,
+                'dequeued_total': self.dequeued_total,
+                'arrivals_per_minute': self.arrivals.total(),
+                'served_per_minute': self.services.total()
+            }
+
@@ -0,0 +1,141 @@
+"""
+Event Broadcasting for Server-Sent Events
+Fans queue changes out to every connected display from one shared log.
+"""
+
+import json
+import threading
+from collections import deque
+from itertools import islice
+
+
+def format_sse(event_id, event_type, data):
+    """
+    Format one Server-Sent Events message.
+    
+    Args:
+        event_id: Monotonic event id (sent as the SSE id field)
+        event_type: SSE event name, e.g. 'enqueue'
+        data: JSON-serializable payload
+    
+    Returns:
+        The encoded message, terminated by a blank line
+    """
+    payload = json.dumps(data, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+class EventBroker:
+    """
+    A bounded, append-only log of serialized events with blocking readers.
+    
+    Fan-out design:
+    - Each event is serialized once, when it is published, and every
+      subscriber streams the same string. Adding displays adds no
+      serialization work.
+    - Subscribers do not have their own queues. Each one only remembers the
+      id of the last event it sent and reads the shared log from there, so
+      a connection costs one waiting thread and no buffered data.
+    - The log keeps the last `history` events, so a reconnecting
+      EventSource (Last-Event-ID) resumes without a new snapshot. A
+      subscriber that fell further behind is told to resync.
+    
+    Streams are meant to be short-lived (the endpoint closes them after a
+    minute or so and the browser reconnects). Run them on threaded workers
+    (gunicorn gthread) so a display holds a cheap thread rather than a whole
+    sync worker, and cap how many are open at once (app.py SSE_MAX_STREAMS)
+    so streams cannot take every thread from the API.
+    
+    This removes per-display serialization, not the thread per display:
+    with the default cap of 8 streams per worker, a wall of ~200 displays
+    mostly polls. Streaming to all of them needs an async (e.g. gevent)
+    worker for the stream route or threads sized for every display.
+    
+    Mutations that must be ordered with their events should publish before
+    releasing the lock that serializes them (`broker.lock`, or the caller's
+    own, e.g. QueueEngine's). Snapshots taken under the same lock then line
+    up exactly with the event ids.
+    """
+    
+    def __init__(self, history=1000):
+        """
+        Initialize an empty broker.
+        
+        Args:
+            history: Number of recent events kept for resuming subscribers
+        """
+        self.lock = threading.RLock()
+        self._condition = threading.Condition(self.lock)
+        self._events = deque(maxlen=history)  # (event id, serialized message)
+        self._last_id = 0
+    
+    @property
+    def last_id(self):
+        """Get the id of the most recent event (0 if none yet)."""
+        return self._last_id
+    
+    def publish(self, event_type, data):
+        """
+        Append an event to the log and wake every waiting subscriber.
+        
+        Args:
+            event_type: SSE event name
+            data: JSON-serializable payload
+        
+        Returns:
+            The id assigned to the event
+        """
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, format_sse(self._last_id, event_type, data)))
+            self._condition.notify_all()
+            return self._last_id
+    
+    def since(self, last_id):
+        """
+        Get the serialized events published after last_id.
+        
+        Args:
+            last_id: Id of the last event the subscriber has seen
+        
+        Returns:
+            List of (event id, message) tuples, or None if some of those
+            events are no longer in the log and the subscriber must resync
+        """
+        with self.lock:
+            if last_id == self._last_id:
+                return []
+            if last_id > self._last_id or last_id < self._events[0][0] - 1:
+                # Unknown id (e.g. from before a restart) or already evicted
+                return None
+            start = last_id - self._events[0][0] + 1
+            return list(islice(self._events, start, None))
+    
+    def wait(self, last_id, timeout):
+        """
+        Block until there are events after last_id or the timeout expires.
+        
+        Args:
+            last_id: Id of the last event the subscriber has seen
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Same as since(): new events, [] on timeout, or None to resync
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id != last_id, timeout)
+            return self.since(last_id)
+    
+    def snapshot(self, build):
+        """
+        Build a snapshot consistent with the event log.
+        
+        Args:
+            build: Callable returning the JSON-serializable snapshot payload
+        
+        Returns:
+            Tuple of (event id the snapshot reflects, serialized 'snapshot' message)
+        """
+        with self.lock:
+            return self._last_id, format_sse(self._last_id, 'snapshot', build())
+
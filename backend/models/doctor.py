@@ -6,6 +6,8 @@ Represents a doctor in the system.
 class Doctor:
     """Doctor model class."""
     
+    __slots__ = ('id', 'name', 'specialization', 'available')
+    
     def __init__(self, id, name, specialization=None, available=True):
         """
         Initialize a doctor.
@@ -6,6 +6,8 @@ Represents a patient in the system.
 class Patient:
     """Patient model class."""
     
+    __slots__ = ('id', 'name', 'age', 'phone', 'email', 'condition', 'is_emergency', 'priority')
+    
     def __init__(self, id, name, age=None, phone=None, email=None, condition=None, is_emergency=False, priority=5):
         """
         Initialize a patient.
@@ -0,0 +1,387 @@
+"""
+Write-Behind Persistence
+Buffers patient and queue changes in memory and writes them to the Supabase
+tables in batches, off the request path.
+"""
+
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+
+# Parent tables first, so foreign keys exist before rows that reference them
+TABLE_ORDER = ('patients', 'queue', 'emergency_queue')
+PATIENT_COLUMNS = ('id', 'name', 'age', 'phone', 'email', 'condition', 'is_emergency', 'priority')
+
+
+class WriteBehindWriter:
+    """
+    Coalescing write-behind buffer in front of a Supabase client.
+    
+    - upsert()/delete() only record the change; a background thread sends
+      them as one bulk request per table when `batch_size` changes are
+      pending or `flush_interval` seconds have passed
+    - Changes to the same row are merged while they wait, so a row written
+      many times between flushes costs one write
+    - Backpressure: once `max_pending` rows are waiting, writers block
+      (up to `block_timeout` seconds) until a flush makes room. If the
+      database stays unreachable the change is still kept and counted as
+      an overflow rather than lost. Writers that must not wait (queue and
+      registry hooks, which hold locks) pass block=False; their callers
+      should check has_room() first and turn new work away instead
+    - A failed bulk request is split in halves and retried, down to single
+      rows, so one bad row cannot hold back its neighbours. A row the
+      database rejects on its own in `max_attempts` flushes is moved to
+      `dead_letters` (and counted) instead of being retried forever
+    - If nothing in a flush gets through and a one-row read fails too, the
+      database is taken to be unreachable: the rows are kept (newer changes
+      win) and retried on the next interval without counting attempts
+    - flush() writes everything synchronously; close() stops the thread
+      after a final flush (call it at shutdown)
+    """
+    
+    def __init__(self, client, batch_size=500, flush_interval=1.0, max_pending=10000,
+                 block_timeout=5.0, on_flush=None, max_attempts=3, dead_letter_size=1000):
+        """
+        Initialize the writer and start its flush thread.
+        
+        Args:
+            client: Supabase client (anything with client.table(name).upsert/delete)
+            batch_size: Pending rows that trigger an early flush
+            flush_interval: Maximum seconds a change waits before it is written
+            max_pending: Pending rows at which writers start to block
+            block_timeout: Maximum seconds a writer blocks for room
+            on_flush: Optional callback(table, ids) after rows are stored,
+                      e.g. CachedDatabase.invalidate
+            max_attempts: Flushes in which a row may be rejected before it is
+                          dead-lettered
+            dead_letter_size: Most recent dead-lettered changes kept
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.on_flush = on_flush
+        self.max_attempts = max_attempts
+        self.stats = {'rows_written': 0, 'requests': 0, 'errors': 0, 'overflows': 0, 'dead_letters': 0}
+        self.dead_letters = deque(maxlen=dead_letter_size)  # {'table', 'key', 'change', 'error'}
+        self._pending = {}  # (table, key) -> ('upsert', row) or ('delete', key)
+        self._attempts = {}  # (table, key) -> flushes in which the row alone was rejected
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+    
+    def upsert(self, table, row, block=True):
+        """
+        Queue an insert-or-update of a row.
+        
+        Args:
+            table: Table name
+            row: Column dictionary with the primary key 'id'; merged into any
+                 pending write of the same row
+            block: Wait for room when the buffer is full (False: keep the
+                   change at once and count an overflow)
+        """
+        with self._condition:
+            self._wait_for_room(block)
+            self._merge(self._pending, (table, row['id']), ('upsert', row))
+            self._wake_if_full()
+    
+    @staticmethod
+    def _merge(pending, row_key, change):
+        """Record a change on top of any pending change to the same row."""
+        previous = pending.get(row_key)
+        if change[0] == 'upsert' and previous is not None and previous[0] == 'upsert':
+            change = ('upsert', {**previous[1], **change[1]})
+        pending[row_key] = change
+    
+    def delete(self, table, key_value, block=True):
+        """
+        Queue a row deletion by primary key ('id').
+        
+        Args:
+            table: Table name
+            key_value: Primary key of the row to delete
+            block: Wait for room when the buffer is full (see upsert)
+        """
+        with self._condition:
+            self._wait_for_room(block)
+            self._pending[(table, key_value)] = ('delete', key_value)
+            self._wake_if_full()
+    
+    def _wait_for_room(self, block=True):
+        """Block while the buffer is full (caller holds the condition)."""
+        if len(self._pending) < self.max_pending:
+            return
+        self._condition.notify_all()
+        if not block or not self._condition.wait_for(lambda: len(self._pending) < self.max_pending,
+                                                     self.block_timeout):
+            self.stats['overflows'] += 1
+    
+    def _wake_if_full(self):
+        """Start a flush early once a batch is ready (caller holds the condition)."""
+        if len(self._pending) >= self.batch_size:
+            self._condition.notify_all()
+    
+    def pending(self):
+        """Get the number of rows waiting to be written."""
+        return len(self._pending)
+    
+    def has_room(self):
+        """Check whether the buffer is below `max_pending` (callers can shed new writes if not)."""
+        return len(self._pending) < self.max_pending
+    
+    def _run(self):
+        """Flush thread: write on a size or interval trigger until closed."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.batch_size,
+                    self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+    
+    def flush(self):
+        """
+        Write every pending change now.
+        
+        Returns:
+            True if nothing is kept for retry (rejected rows may have been
+            dead-lettered), False if some rows are kept for retry
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, {}
+                self._condition.notify_all()  # room for blocked writers
+            if not batch:
+                return True
+            
+            failed = {}
+            probe = {'ok': False, 'failures': 0, 'rejected': []}
+            tables = sorted({table for table, _ in batch},
+                            key=lambda t: (TABLE_ORDER.index(t) if t in TABLE_ORDER else len(TABLE_ORDER), t))
+            for table in tables:
+                upserts = [(row_key, change) for row_key, change in batch.items()
+                           if row_key[0] == table and change[0] == 'upsert']
+                deletes = [(row_key, change) for row_key, change in batch.items()
+                           if row_key[0] == table and change[0] == 'delete']
+                for start in range(0, len(upserts), self.batch_size):
+                    self._write(table, upserts[start:start + self.batch_size], failed, probe,
+                                lambda chunk: self.client.table(table).upsert(
+                                    [change[1] for _, change in chunk]).execute())
+                for start in range(0, len(deletes), self.batch_size):
+                    self._write(table, deletes[start:start + self.batch_size], failed, probe,
+                                lambda chunk: self.client.table(table).delete().in_(
+                                    'id', [change[1] for _, change in chunk]).execute())
+            
+            if probe['rejected'] and not probe['ok']:
+                probe['ok'] = self._reachable(probe['rejected'][0][0][0])
+            for row_key, change, error in probe['rejected']:
+                if not probe['ok']:
+                    failed[row_key] = change  # nothing got through: not the row's fault
+                    continue
+                attempts = self._attempts.get(row_key, 0) + 1
+                if attempts < self.max_attempts:
+                    self._attempts[row_key] = attempts
+                    failed[row_key] = change
+                else:
+                    self._attempts.pop(row_key, None)
+                    self.stats['dead_letters'] += 1
+                    self.dead_letters.append({'table': row_key[0], 'key': row_key[1],
+                                              'change': change, 'error': str(error)})
+                    print(f"Write-behind dead letter: {row_key[0]} {row_key[1]}: {error}")
+            
+            if failed:
+                with self._condition:
+                    # Changes made since this batch was taken are newer; apply them on top
+                    for row_key, change in self._pending.items():
+                        self._merge(failed, row_key, change)
+                        self._attempts.pop(row_key, None)  # a new version gets fresh attempts
+                    self._pending = failed
+            return not failed
+    
+    def _write(self, table, chunk, failed, probe, request):
+        """
+        Send one bulk request; if it fails, bisect it to isolate rejected rows.
+        
+        Args:
+            table: Table name
+            chunk: List of (row key, change) pairs
+            failed: Dictionary collecting changes to retry
+            probe: Flush state: 'ok' once any request succeeded, 'failures'
+                   before that, and 'rejected' (row key, change, error) triples
+            request: Function sending a chunk
+        """
+        if not probe['ok'] and probe['failures'] > 2 * self.batch_size.bit_length() + 2:
+            # Many failures and no success: the database is unreachable, stop trying
+            failed.update(chunk)
+            return
+        error = self._send(table, [row_key[1] for row_key, _ in chunk], lambda: request(chunk))
+        if error is None:
+            probe['ok'] = True
+            for row_key, _ in chunk:
+                self._attempts.pop(row_key, None)
+            return
+        if not probe['ok']:
+            probe['failures'] += 1
+        if len(chunk) > 1:
+            middle = len(chunk) // 2
+            self._write(table, chunk[:middle], failed, probe, request)
+            self._write(table, chunk[middle:], failed, probe, request)
+        else:
+            probe['rejected'].append((chunk[0][0], chunk[0][1], error))
+    
+    def _reachable(self, table):
+        """Check that the database answers a one-row read of a table."""
+        try:
+            self.client.table(table).select('id').limit(1).execute()
+        except Exception:
+            return False
+        return True
+    
+    def _send(self, table, ids, request):
+        """Run one bulk request for the given row ids; return its error, or None."""
+        try:
+            request()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Write-behind flush error: {e}")
+            return e
+        self.stats['requests'] += 1
+        self.stats['rows_written'] += len(ids)
+        if self.on_flush is not None:
+            self.on_flush(table, ids)
+        return None
+    
+    def close(self):
+        """Stop the flush thread and write whatever is still pending."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+
+
+class WaitingRows:
+    """
+    Queue-table rows still 'waiting', so a dequeue can mark the right one 'served'.
+    
+    Kept in this process; with several workers use
+    shared_state.SharedWaitingRows, so a patient enqueued on one worker and
+    called on another still gets their row updated.
+    """
+    
+    def __init__(self):
+        """Initialize an empty map."""
+        self._rows = {}  # (table, patient id) -> rows still waiting, oldest first
+        self._lock = threading.Lock()
+    
+    def add(self, table, patient_id, row):
+        """
+        Remember a waiting row.
+        
+        Args:
+            table: 'queue' or 'emergency_queue'
+            patient_id: Queued patient's ID
+            row: Row dictionary (emergency rows carry 'priority')
+        """
+        with self._lock:
+            self._rows.setdefault((table, patient_id), []).append(row)
+    
+    def take(self, table, patient_id):
+        """
+        Remove the row a dequeue of this patient served.
+        
+        Args:
+            table: 'queue' or 'emergency_queue'
+            patient_id: Dequeued patient's ID
+        
+        Returns:
+            The row, or None if none is waiting
+        """
+        key = (table, patient_id)
+        with self._lock:
+            rows = self._rows.get(key)
+            if not rows:
+                return None
+            # Same order the queues serve: priority (emergency only), then arrival
+            row = min(rows, key=lambda r: r.get('priority', 0))
+            rows.remove(row)
+            if not rows:
+                del self._rows[key]
+            return row
+
+
+class SupabasePersistence:
+    """
+    Maps registry and queue changes onto the schema.sql tables.
+    
+    - Attach to a PatientRegistry (attach_index) to mirror patients into
+      `patients`
+    - Call queue_changed() from the queue engine's on_change callback to
+      write `queue` / `emergency_queue` rows: an enqueue inserts a
+      'waiting' row, a dequeue marks that row 'served'
+    
+    These hooks run while the registry or queue locks are held, so they
+    never wait for room in the writer; the app bounds the backlog by
+    refusing intake requests while writer.has_room() is False.
+    """
+    
+    def __init__(self, writer, waiting=None):
+        """
+        Initialize the mapping.
+        
+        Args:
+            writer: WriteBehindWriter the rows are sent through
+            waiting: Store of rows still waiting (default: in-process WaitingRows)
+        """
+        self.writer = writer
+        self.waiting = waiting if waiting is not None else WaitingRows()
+    
+    def _patient_row(self, record):
+        """Get the patients-table columns of a patient record."""
+        return {column: record.get(column) for column in PATIENT_COLUMNS}
+    
+    def add_record(self, record):
+        """Write a patient added to the registry."""
+        if record.get('id') is not None:
+            self.writer.upsert('patients', self._patient_row(record), block=False)
+    
+    def add_records(self, records):
+        """Write a batch of patients added to the registry."""
+        for record in records:
+            self.add_record(record)
+    
+    def remove_record(self, record):
+        """Delete a patient removed from the registry."""
+        if record.get('id') is not None:
+            self.writer.delete('patients', record['id'], block=False)
+    
+    def queue_changed(self, action, queue_type, patient, priority=None):
+        """
+        Write a queue change.
+        
+        Args:
+            action: 'enqueue' or 'dequeue'
+            queue_type: 'regular' or 'emergency'
+            patient: Patient dictionary
+            priority: Emergency priority (enqueue only)
+        """
+        table = 'emergency_queue' if queue_type == 'emergency' else 'queue'
+        if action == 'enqueue':
+            row = {'id': str(uuid.uuid4()), 'patient_id': patient.get('id'),
+                   'added_at': datetime.now(timezone.utc).isoformat(), 'status': 'waiting'}
+            if table == 'emergency_queue':
+                row['priority'] = priority
+            self.waiting.add(table, patient.get('id'), row)
+        else:
+            row = self.waiting.take(table, patient.get('id'))
+            if row is None:
+                return
+            row = {**row, 'status': 'served'}
+        self.writer.upsert(table, row, block=False)
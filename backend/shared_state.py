@@ -0,0 +1,589 @@
+"""
+Shared State for Multiple Worker Processes
+SQLite (WAL mode) store that lets several gunicorn workers on one host share
+the queues, the patient registry and the queue event log.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from events import format_sse
+from dsa.concurrent_queue import QueueSnapshot, check_priority
+from auth.tokens import RevocationList
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared_values (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patients (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue_entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue_type TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    patient TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_entries_order ON queue_entries(queue_type, priority, seq);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    jti TEXT UNIQUE NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiting_rows (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    patient_id TEXT,
+    priority INTEGER NOT NULL,
+    row TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_waiting_rows_order ON waiting_rows(table_name, patient_id, priority, seq);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('queue_version', '0');
+"""
+
+
+class SQLiteStateStore:
+    """
+    A SQLite database file shared by every worker process on the host.
+    
+    - WAL mode lets readers run while one writer commits
+    - transaction() takes the database write lock up front (BEGIN
+      IMMEDIATE), so a read-modify-write is atomic across processes;
+      transaction(write=False) is a consistent read that blocks no one
+    - Each thread gets its own connection; connections are reopened after
+      a fork, so the store may be created before gunicorn forks workers
+    """
+    
+    def __init__(self, path, timeout=30):
+        """
+        Open (and if needed create) the shared database.
+        
+        Args:
+            path: Database file path; every worker must use the same one
+            timeout: Seconds to wait for another process's write lock
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self.connection()
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', ?)",
+                     (uuid.uuid4().hex[:8],))
+        # Identifies this database, e.g. to namespace ETags built on its versions
+        self.instance_id = conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()[0]
+    
+    def connection(self):
+        """
+        Get this thread's connection.
+        
+        Returns:
+            sqlite3.Connection in autocommit mode (transactions are explicit)
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            local.conn, local.pid, local.depth = conn, os.getpid(), 0
+        return local.conn
+    
+    @contextmanager
+    def transaction(self, write=True):
+        """
+        Run a block as one transaction, atomic across processes.
+        
+        Nested use on the same thread joins the outer transaction (a write
+        must not be nested inside a read).
+        
+        Args:
+            write: Take the write lock at the start (False for read-only blocks)
+        
+        Yields:
+            This thread's connection
+        """
+        conn = self.connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+        
+        conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+        finally:
+            local.depth = 0
+    
+    def put_value(self, key, value):
+        """
+        Store a JSON-serializable value every worker can read.
+        
+        Args:
+            key: Value name
+            value: JSON-serializable value (replaces any previous one)
+        """
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO shared_values (key, value) VALUES (?, ?) "
+                         "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, json.dumps(value)))
+    
+    def get_value(self, key, default=None):
+        """
+        Read a value stored with put_value().
+        
+        Args:
+            key: Value name
+            default: Returned when nothing is stored under the key
+        
+        Returns:
+            The stored value, or default
+        """
+        row = self.connection().execute("SELECT value FROM shared_values WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+
+class SharedQueueEngine:
+    """
+    QueueEngine backed by a SQLiteStateStore, for several worker processes.
+    
+    Same interface as dsa.QueueEngine: enqueue, enqueue_many, dequeue_next,
+    snapshot, version, locked and the on_change callback (called inside the write
+    transaction, so events published from it commit together with the
+    change). dequeue_next runs in one BEGIN IMMEDIATE transaction, so two
+    workers can never take the same patient.
+    
+    The version is a counter stored with the queues, so it is the same in
+    every process. Each process caches its last snapshot and re-reads the
+    queue rows only when that counter moved.
+    """
+    
+    def __init__(self, store, on_change=None, priorities=None):
+        """
+        Initialize the engine.
+        
+        Args:
+            store: SQLiteStateStore shared by all workers
+            on_change: Optional callback(action, queue_type, item, priority)
+            priorities: Accepted emergency priorities, e.g. range(1, 6)
+                        (default: any)
+        """
+        self.store = store
+        self.on_change = on_change
+        self.priorities = priorities
+        self._snapshot = None
+    
+    @property
+    def version(self):
+        """Get the shared queue version."""
+        return self.store.connection().execute(
+            "SELECT value FROM meta WHERE key = 'queue_version'").fetchone()[0]
+    
+    def locked(self):
+        """Hold the database write lock (no worker can change the queues)."""
+        return self.store.transaction()
+    
+    def _changed(self, conn, action, queue_type, item, priority=None):
+        """Bump the shared version and report the change (inside the transaction)."""
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'queue_version'")
+        if self.on_change is not None:
+            self.on_change(action, queue_type, item, priority)
+    
+    def enqueue(self, item, is_emergency=False, priority=5):
+        """
+        Add an item to the regular or emergency queue.
+        
+        Args:
+            item: JSON-serializable item (e.g., patient data)
+            is_emergency: Whether to add to the emergency queue
+            priority: Emergency priority (1 = highest); ignored for regular
+        
+        Returns:
+            'emergency' or 'regular', the queue the item joined
+        
+        Raises:
+            ValueError: If an emergency priority is not in `priorities`
+        """
+        if is_emergency:
+            check_priority(priority, self.priorities)
+        queue_type = 'emergency' if is_emergency else 'regular'
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO queue_entries (queue_type, priority, patient) VALUES (?, ?, ?)",
+                         (queue_type, priority if is_emergency else 0, json.dumps(item)))
+            self._changed(conn, 'enqueue', queue_type, item, priority if is_emergency else None)
+        return queue_type
+    
+    def enqueue_many(self, entries):
+        """
+        Add a batch of items in one transaction.
+        
+        Args:
+            entries: Iterable of (item, is_emergency, priority) tuples
+        
+        Returns:
+            Dictionary with the number of items added to each queue
+        """
+        counts = {'regular': 0, 'emergency': 0}
+        with self.store.transaction():
+            for item, is_emergency, priority in entries:
+                counts[self.enqueue(item, is_emergency, priority)] += 1
+        return counts
+    
+    def dequeue_next(self):
+        """
+        Atomically remove the next patient: emergency first, then regular.
+        
+        Returns:
+            Tuple of (queue_type, item), or (None, None) if both are empty
+        """
+        with self.store.transaction() as conn:
+            for queue_type in ('emergency', 'regular'):
+                row = conn.execute(
+                    "SELECT seq, patient FROM queue_entries WHERE queue_type = ? "
+                    "ORDER BY priority, seq LIMIT 1", (queue_type,)).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM queue_entries WHERE seq = ?", (row[0],))
+                    item = json.loads(row[1])
+                    self._changed(conn, 'dequeue', queue_type, item)
+                    return queue_type, item
+        return None, None
+    
+    def snapshot(self):
+        """
+        Get an immutable, consistent view of both queues.
+        
+        Returns:
+            QueueSnapshot, reused until another change from any worker
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.version:
+            return snapshot
+        
+        conn = self.store.connection()
+        with self.store.transaction(write=False):
+            version = self.version
+            emergency = tuple(
+                {'item': json.loads(patient), 'priority': priority}
+                for priority, patient in conn.execute(
+                    "SELECT priority, patient FROM queue_entries WHERE queue_type = 'emergency' "
+                    "ORDER BY priority, seq"))
+            regular = tuple(
+                json.loads(patient) for (patient,) in conn.execute(
+                    "SELECT patient FROM queue_entries WHERE queue_type = 'regular' ORDER BY seq"))
+        snapshot = self._snapshot = QueueSnapshot(version, emergency, regular)
+        return snapshot
+
+
+class SharedEventBroker:
+    """
+    EventBroker backed by a SQLiteStateStore, for several worker processes.
+    
+    Events are rows in the shared database, so ids are global: a display
+    reconnecting to a different worker resumes from its Last-Event-ID.
+    publish() joins the caller's transaction, so an event commits together
+    with the queue change it describes. Subscribers poll the table every
+    `poll_interval` seconds instead of waiting on an in-process condition.
+    """
+    
+    def __init__(self, store, history=1000, poll_interval=0.5):
+        """
+        Initialize the broker.
+        
+        Args:
+            store: SQLiteStateStore shared by all workers
+            history: Number of recent events kept for resuming subscribers
+            poll_interval: Seconds between checks for new events in wait()
+        """
+        self.store = store
+        self.history = history
+        self.poll_interval = poll_interval
+    
+    @property
+    def last_id(self):
+        """Get the id of the most recent event (0 if none yet)."""
+        row = self.store.connection().execute("SELECT MAX(id) FROM events").fetchone()
+        return row[0] or 0
+    
+    def publish(self, event_type, data):
+        """
+        Append an event to the shared log.
+        
+        Args:
+            event_type: SSE event name
+            data: JSON-serializable payload
+        
+        Returns:
+            The id assigned to the event
+        """
+        with self.store.transaction() as conn:
+            event_id = conn.execute("INSERT INTO events (message) VALUES ('')").lastrowid
+            conn.execute("UPDATE events SET message = ? WHERE id = ?",
+                         (format_sse(event_id, event_type, data), event_id))
+            conn.execute("DELETE FROM events WHERE id <= ?", (event_id - self.history,))
+            return event_id
+    
+    def since(self, last_id):
+        """
+        Get the serialized events published after last_id.
+        
+        Args:
+            last_id: Id of the last event the subscriber has seen
+        
+        Returns:
+            List of (event id, message) tuples, or None if some of those
+            events are no longer in the log and the subscriber must resync
+        """
+        conn = self.store.connection()
+        first_id, newest_id = conn.execute("SELECT MIN(id), MAX(id) FROM events").fetchone()
+        newest_id = newest_id or 0
+        if last_id == newest_id:
+            return []
+        if last_id > newest_id or first_id is None or last_id < first_id - 1:
+            # Unknown id (e.g. the database was reset) or already trimmed
+            return None
+        return conn.execute("SELECT id, message FROM events WHERE id > ? ORDER BY id",
+                            (last_id,)).fetchall()
+    
+    def wait(self, last_id, timeout):
+        """
+        Poll until there are events after last_id or the timeout expires.
+        
+        Args:
+            last_id: Id of the last event the subscriber has seen
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Same as since(): new events, [] on timeout, or None to resync
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.since(last_id)
+            remaining = deadline - time.monotonic()
+            if events != [] or remaining <= 0:
+                return events
+            time.sleep(min(self.poll_interval, remaining))
+    
+    def snapshot(self, build):
+        """
+        Build a snapshot consistent with the event log.
+        
+        Args:
+            build: Callable returning the JSON-serializable snapshot payload
+        
+        Returns:
+            Tuple of (event id the snapshot reflects, serialized 'snapshot' message)
+        """
+        with self.store.transaction(write=False):
+            last_id = self.last_id
+            return last_id, format_sse(last_id, 'snapshot', build())
+
+
+class RegistrySync:
+    """
+    Keeps a process-local PatientRegistry in step with the shared patients table.
+    
+    New patients are written to the shared table first (its unique id
+    column rejects duplicates from any worker), then every worker appends
+    rows it has not seen yet with pull(). Local indexes attached to the
+    registry (search, autocomplete, stats) follow as usual.
+    
+    The registry is append-only here: removals are not propagated.
+    """
+    
+    def __init__(self, store, registry):
+        """
+        Initialize the sync.
+        
+        Args:
+            store: SQLiteStateStore shared by all workers
+            registry: This process's PatientRegistry
+        """
+        self.store = store
+        self.registry = registry
+        self._seq = 0  # last shared row already in the local registry
+    
+    def add(self, record):
+        """
+        Register a patient for every worker.
+        
+        Args:
+            record: Patient dictionary with an 'id'
+        
+        Raises:
+            ValueError: If any worker already registered that id
+        """
+        try:
+            with self.store.transaction() as conn:
+                conn.execute("INSERT INTO patients (id, data) VALUES (?, ?)",
+                             (record.get('id'), json.dumps(record)))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Duplicate patient id: {record.get('id')}") from None
+        self.pull()
+    
+    def add_many(self, records):
+        """
+        Register many patients for every worker in one transaction.
+        
+        Args:
+            records: Iterable of patient dictionaries with an 'id'
+        
+        Returns:
+            List of the records not added because some worker already
+            registered their id (for seed data, the ones loaded before)
+        """
+        duplicates = []
+        with self.store.transaction() as conn:
+            for record in records:
+                try:
+                    conn.execute("INSERT INTO patients (id, data) VALUES (?, ?)",
+                                 (record.get('id'), json.dumps(record)))
+                except sqlite3.IntegrityError:
+                    duplicates.append(record)
+        self.pull()
+        return duplicates
+    
+    def pull(self):
+        """
+        Append patients registered by any worker since the last pull.
+        
+        Returns:
+            Number of patients added to the local registry
+        """
+        with self.registry.lock:
+            rows = self.store.connection().execute(
+                "SELECT seq, data FROM patients WHERE seq > ? ORDER BY seq", (self._seq,)).fetchall()
+            if rows:
+                self.registry.extend(json.loads(data) for _, data in rows)
+                self._seq = rows[-1][0]
+            return len(rows)
+
+
+class SharedRevocationList(RevocationList):
+    """
+    Token deny-list shared by every worker process.
+    
+    Revocations are written to the shared revoked_tokens table and copied
+    into each worker's in-memory list by pull(), so checking a token stays
+    a local dictionary lookup. Expired rows are deleted as new ones arrive.
+    """
+    
+    def __init__(self, store, clock=time.time):
+        """
+        Initialize the list and load the current revocations.
+        
+        Args:
+            store: SQLiteStateStore shared by all workers
+            clock: Function returning the current time in seconds
+        """
+        super().__init__(clock)
+        self.store = store
+        self._seq = 0  # last shared row already in the local list
+        self.pull()
+    
+    def revoke(self, jti, expires_at):
+        """
+        Reject a token id in every worker until it expires.
+        
+        Args:
+            jti: Token id
+            expires_at: Token expiry (seconds since the epoch)
+        """
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (self._clock(),))
+            conn.execute("INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+                         (jti, expires_at))
+        super().revoke(jti, expires_at)
+    
+    def pull(self):
+        """
+        Copy revocations made by any worker since the last pull.
+        
+        Returns:
+            Number of revocations added to the local list
+        """
+        rows = self.store.connection().execute(
+            "SELECT seq, jti, expires_at FROM revoked_tokens WHERE seq > ? ORDER BY seq",
+            (self._seq,)).fetchall()
+        for _, jti, expires_at in rows:
+            super().revoke(jti, expires_at)
+        if rows:
+            self._seq = rows[-1][0]
+        return len(rows)
+
+
+class SharedWaitingRows:
+    """
+    persistence.WaitingRows kept in the shared database.
+    
+    A patient enqueued on one worker may be called on another; keeping the
+    waiting rows in the shared store lets that worker mark the right row
+    'served'. add() and take() join the queue engine's transaction when
+    called from its on_change callback.
+    """
+    
+    def __init__(self, store):
+        """
+        Initialize the map.
+        
+        Args:
+            store: SQLiteStateStore shared by all workers
+        """
+        self.store = store
+    
+    def add(self, table, patient_id, row):
+        """
+        Remember a waiting row.
+        
+        Args:
+            table: 'queue' or 'emergency_queue'
+            patient_id: Queued patient's ID
+            row: Row dictionary (emergency rows carry 'priority')
+        """
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO waiting_rows (table_name, patient_id, priority, row) VALUES (?, ?, ?, ?)",
+                         (table, patient_id, row.get('priority') or 0, json.dumps(row)))
+    
+    def take(self, table, patient_id):
+        """
+        Remove the row a dequeue of this patient served.
+        
+        Args:
+            table: 'queue' or 'emergency_queue'
+            patient_id: Dequeued patient's ID
+        
+        Returns:
+            The row, or None if none is waiting
+        """
+        with self.store.transaction() as conn:
+            found = conn.execute(
+                "SELECT seq, row FROM waiting_rows WHERE table_name = ? AND patient_id = ? "
+                "ORDER BY priority, seq LIMIT 1", (table, patient_id)).fetchone()
+            if found is None:
+                return None
+            conn.execute("DELETE FROM waiting_rows WHERE seq = ?", (found[0],))
+        return json.loads(found[1])
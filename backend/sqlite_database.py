@@ -0,0 +1,361 @@
+"""
+Local SQLite Storage Backend
+Same interface as Database (get_client / test_connection), stored in a local
+SQLite file created from database/schema.sql. Used for offline development
+and for load-testing the API against large synthetic data sets.
+"""
+
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / 'database' / 'schema.sql'
+
+# Postgres-only pieces of schema.sql and their SQLite equivalents
+SCHEMA_REWRITES = [
+    (re.compile(r'\bUUID\b'), 'TEXT'),
+    (re.compile(r'gen_random_uuid\(\)', re.IGNORECASE), '(lower(hex(randomblob(16))))'),
+    (re.compile(r'\bNOW\(\)', re.IGNORECASE), 'CURRENT_TIMESTAMP'),
+]
+
+APIResponse = namedtuple('APIResponse', ['data'])
+
+
+def sqlite_schema(path=SCHEMA_PATH):
+    """
+    Translate schema.sql (PostgreSQL) into SQLite DDL.
+    
+    Tables, indexes and seed rows are kept as declared; only column types
+    and default functions SQLite lacks are rewritten.
+    
+    Args:
+        path: Path of the PostgreSQL schema file
+    
+    Returns:
+        SQL script for sqlite3.executescript
+    """
+    script = Path(path).read_text(encoding='utf-8')
+    for pattern, replacement in SCHEMA_REWRITES:
+        script = pattern.sub(replacement, script)
+    return script
+
+
+class SQLiteQuery:
+    """
+    One table query, built like the Supabase (PostgREST) client:
+        
+        client.table('patients').select('*').eq('id', 'P001').limit(1).execute().data
+    
+    Supports select / insert / upsert / update / delete with eq, in_,
+    order and limit. Column names are checked against the table, and
+    values are always bound as parameters.
+    """
+    
+    def __init__(self, client, table):
+        """
+        Initialize a query on a table.
+        
+        Args:
+            client: SQLiteClient that runs the query
+            table: Table name
+        """
+        self._client = client
+        self._table = table
+        self._columns = client.columns(table)
+        self._action = 'select'
+        self._selected = '*'
+        self._rows = None
+        self._values = None
+        self._where = []
+        self._order = []
+        self._limit = None
+    
+    def _column(self, name):
+        """Validate a column name for this table."""
+        if name not in self._columns:
+            raise ValueError(f"Unknown column '{name}' for table '{self._table}'")
+        return name
+    
+    def select(self, columns='*'):
+        """Select columns ('*' or a comma-separated list)."""
+        self._action = 'select'
+        if columns.strip() != '*':
+            self._selected = ', '.join(self._column(c.strip()) for c in columns.split(','))
+        return self
+    
+    def insert(self, rows):
+        """Insert one row (dict) or a list of rows."""
+        self._action, self._rows = 'insert', rows if isinstance(rows, list) else [rows]
+        return self
+    
+    def upsert(self, rows, on_conflict='id'):
+        """Insert rows, updating the given columns of rows whose key already exists."""
+        self._action, self._rows = 'upsert', rows if isinstance(rows, list) else [rows]
+        self._conflict = self._column(on_conflict)
+        return self
+    
+    def update(self, values):
+        """Update the matching rows with a column dictionary."""
+        self._action, self._values = 'update', values
+        return self
+    
+    def delete(self):
+        """Delete the matching rows."""
+        self._action = 'delete'
+        return self
+    
+    def eq(self, column, value):
+        """Filter on column = value."""
+        self._where.append((f"{self._column(column)} = ?", [value]))
+        return self
+    
+    def in_(self, column, values):
+        """Filter on column IN values."""
+        values = list(values)
+        if not values:
+            self._column(column)
+            self._where.append(('0', []))  # IN () matches nothing
+            return self
+        self._where.append((f"{self._column(column)} IN ({', '.join('?' * len(values))})", values))
+        return self
+    
+    def order(self, column, desc=False):
+        """Sort by a column (call again for secondary keys)."""
+        self._order.append(f"{self._column(column)} {'DESC' if desc else 'ASC'}")
+        return self
+    
+    def limit(self, count):
+        """Return at most count rows."""
+        self._limit = int(count)
+        return self
+    
+    def _where_sql(self):
+        """Get the WHERE clause and its parameters."""
+        if not self._where:
+            return '', []
+        params = [value for _, values in self._where for value in values]
+        return ' WHERE ' + ' AND '.join(clause for clause, _ in self._where), params
+    
+    def _write(self, conn):
+        """Run insert/upsert for every row, grouped by column set."""
+        groups = {}
+        for row in self._rows:
+            groups.setdefault(tuple(self._column(c) for c in row), []).append(row)
+        for columns, rows in groups.items():
+            sql = (f"INSERT INTO {self._table} ({', '.join(columns)}) "
+                   f"VALUES ({', '.join('?' * len(columns))})")
+            if self._action == 'upsert':
+                updates = [c for c in columns if c != self._conflict]
+                sql += f" ON CONFLICT ({self._conflict}) DO " + (
+                    'UPDATE SET ' + ', '.join(f"{c} = excluded.{c}" for c in updates) if updates else 'NOTHING')
+            conn.executemany(sql, [tuple(row[c] for c in columns) for row in rows])
+        return self._rows
+    
+    def execute(self):
+        """
+        Run the query.
+        
+        Returns:
+            APIResponse whose `data` is the list of selected (or written) rows
+        """
+        where, params = self._where_sql()
+        with self._client.transaction() as conn:
+            if self._action in ('insert', 'upsert'):
+                return APIResponse(self._write(conn))
+            if self._action == 'update':
+                columns = [self._column(c) for c in self._values]
+                conn.execute(f"UPDATE {self._table} SET {', '.join(f'{c} = ?' for c in columns)}{where}",
+                             [self._values[c] for c in columns] + params)
+                return APIResponse([])
+            if self._action == 'delete':
+                conn.execute(f"DELETE FROM {self._table}{where}", params)
+                return APIResponse([])
+            
+            sql = f"SELECT {self._selected} FROM {self._table}{where}"
+            if self._order:
+                sql += ' ORDER BY ' + ', '.join(self._order)
+            if self._limit is not None:
+                sql += f" LIMIT {self._limit}"
+            cursor = conn.execute(sql, params)
+            return APIResponse(self._client.to_dicts(self._table, cursor, cursor.fetchall()))
+
+
+class SQLiteClient:
+    """Supabase-client stand-in over a SQLite file (one connection per thread)."""
+    
+    def __init__(self, path):
+        """
+        Initialize the client.
+        
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+        self._columns = {}   # table -> set of column names
+        self._booleans = {}  # table -> BOOLEAN columns (stored as 0/1)
+    
+    def connection(self):
+        """Get this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block in one transaction (rolled back if it raises).
+        
+        Yields:
+            This thread's connection
+        """
+        conn = self.connection()
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+    
+    def columns(self, table):
+        """Get the column names of a table (raises ValueError for unknown tables)."""
+        if table not in self._columns:
+            info = self.connection().execute(f"PRAGMA table_info({table})").fetchall() if table.isidentifier() else []
+            if not info:
+                raise ValueError(f"Unknown table '{table}'")
+            self._columns[table] = {column[1] for column in info}
+            self._booleans[table] = {column[1] for column in info if column[2].upper() == 'BOOLEAN'}
+        return self._columns[table]
+    
+    def to_dicts(self, table, cursor, rows):
+        """Convert fetched rows to dictionaries, restoring BOOLEAN columns."""
+        names = [description[0] for description in cursor.description]
+        booleans = [i for i, name in enumerate(names) if name in self._booleans[table]]
+        result = []
+        for values in rows:
+            if booleans:
+                values = list(values)
+                for i in booleans:
+                    if values[i] is not None:
+                        values[i] = bool(values[i])
+            result.append(dict(zip(names, values)))
+        return result
+    
+    def table(self, name):
+        """Start a query on a table."""
+        return SQLiteQuery(self, name)
+
+
+class SQLiteDatabase:
+    """
+    Local SQLite storage with the same interface as Database.
+    
+    The file is created from database/schema.sql on first use, so it has
+    the same tables, indexes and seed rows as the Supabase project.
+    
+    Usage:
+        db = SQLiteDatabase('hospital.db')
+        db.bulk_load_patients(records)   # e.g. millions of synthetic rows
+        db.get_client().table('patients').select('*').eq('id', 'P001').execute()
+    
+    Set SQLITE_DB_PATH to run the app on it instead of Supabase.
+    """
+    
+    def __init__(self, path, schema_path=SCHEMA_PATH):
+        """
+        Open (and if needed create) the database.
+        
+        Args:
+            path: SQLite database file
+            schema_path: PostgreSQL schema to translate for a new database
+        """
+        self.path = path
+        self.client = SQLiteClient(path)
+        conn = self.client.connection()
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patients'").fetchone():
+            conn.executescript(sqlite_schema(schema_path))
+    
+    def get_client(self):
+        """Get the Supabase-compatible client."""
+        return self.client
+    
+    def test_connection(self):
+        """Test database connection."""
+        try:
+            self.client.table('users').select('id').limit(1).execute()
+            return True
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Database connection error: {e}")
+            return False
+    
+    def bulk_load_patients(self, records, batch_size=50000):
+        """
+        Insert patient records quickly (existing ids are skipped).
+        
+        Args:
+            records: Iterable of patient dictionaries
+            batch_size: Rows per transaction
+        
+        Returns:
+            Number of records processed
+        """
+        columns = ('id', 'name', 'age', 'phone', 'email', 'condition', 'is_emergency', 'priority')
+        sql = (f"INSERT OR IGNORE INTO patients ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(tuple(record.get(c) for c in columns))
+            if len(batch) >= batch_size:
+                count += self._insert_batch(sql, batch)
+                batch = []
+        if batch:
+            count += self._insert_batch(sql, batch)
+        return count
+    
+    def _insert_batch(self, sql, rows):
+        """Insert one batch of rows in a single transaction."""
+        with self.client.transaction() as conn:
+            conn.executemany(sql, rows)
+        return len(rows)
+    
+    def iter_rows(self, table, batch_size=10000):
+        """
+        Stream every row of a table in rowid order.
+        
+        Args:
+            table: Table name
+            batch_size: Rows fetched per round
+        
+        Yields:
+            Row dictionaries
+        """
+        self.client.columns(table)
+        cursor = self.client.connection().execute(f"SELECT * FROM {table} ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from self.client.to_dicts(table, cursor, rows)
+    
+    def explain(self, sql, params=()):
+        """
+        Get SQLite's query plan for a statement.
+        
+        Args:
+            sql: SELECT statement
+            params: Bound parameters
+        
+        Returns:
+            List of plan step descriptions
+        """
+        return [row[3] for row in self.client.connection().execute(f"EXPLAIN QUERY PLAN {sql}", params)]
@@ -1,9 +1,40 @@
 """
 Quick test script for DSA structures
 """
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
 from dsa.queue import Queue
 from dsa.priority_queue import PriorityQueue
 from dsa.linked_list import LinkedList
+from dsa.patient_registry import PatientRegistry, RegistryNode
+from dsa.scheduler import Scheduler, specialization_for
+from dsa.search_index import TrigramIndex
+from dsa.prefix_index import PrefixIndex
+from dsa.stats import RollingCounter
+from dsa.doctor_directory import DoctorDirectory
+from dsa.concurrent_queue import QueueEngine
+from events import EventBroker
+from persistence import WriteBehindWriter, SupabasePersistence
+from sqlite_database import SQLiteDatabase
+from shared_state import SQLiteStateStore, SharedQueueEngine, SharedEventBroker, RegistrySync, SharedWaitingRows
+from database import CachedDatabase
+from auth.session_store import SessionStore
+from auth.tokens import TokenSigner, PUBLIC_SECRETS
+from dsa.columnar import QueueEntryLog
+from models.patient import Patient
+from dsa import analytics as analytics_module
+from dsa.analytics import QueueAnalytics
+from dsa.eta import FenwickTree, ETAEngine
+from bulk import read_rows, patient_from_row, queue_entry_from_row
+from admission import AdmissionPool, RateLimiter, Rejected, PRIORITY_EMERGENCY, PRIORITY_READ
+import app as server
 
 # Test Queue
 q = Queue()
@@ -11,17 +42,600 @@ q.enqueue('Patient1')
 q.enqueue('Patient2')
 print(f'[SUCCESS] Queue: size={q.size()}, front={q.peek()}, dequeue={q.dequeue()}')
 
+# Test Queue batch operations
+q = Queue()
+q.enqueue_many(['P1', 'P2', 'P3', 'P4'])
+window = list(q.slice(1, 3))
+batch = q.dequeue_many(3)
+assert window == ['P2', 'P3'] and batch == ['P1', 'P2', 'P3'] and q.display() == ['P4']
+print(f'[SUCCESS] Queue batch: window={window}, dequeued={batch}, remaining={q.size()}')
+
+# Test version counters
+version = q.version
+q.dequeue_many(0)
+unchanged = q.version == version
+q.enqueue('P5')
+assert unchanged and q.version == version + 1
+print(f'[SUCCESS] Queue version: {version} -> {q.version}')
+
 # Test Priority Queue
 pq = PriorityQueue()
 pq.enqueue('Emergency1', 1)
 pq.enqueue('Emergency2', 2)
 print(f'[SUCCESS] Priority Queue: size={pq.size()}, next={pq.peek()}')
 
+# Test Priority Queue FIFO tie-breaking
+pq = PriorityQueue()
+for name, priority in [('A', 2), ('B', 1), ('C', 2), ('D', 1)]:
+    pq.enqueue(name, priority)
+order = [pq.dequeue() for _ in range(4)]
+assert order == ['B', 'D', 'A', 'C'], order
+print(f'[SUCCESS] Priority Queue ties: order={order}')
+
 # Test Linked List
 ll = LinkedList()
 ll.append({'id': 'P001', 'name': 'Test Patient'})
 found = ll.find('P001')
 print(f'[SUCCESS] Linked List: size={ll.get_size()}, found={found is not None}')
 
+# Test Patient Registry
+reg = PatientRegistry([{'id': 'P001'}, {'id': 'P002'}, {'id': 'P003'}])
+reg.remove('P003')
+reg.append({'id': 'P004'})
+reg.remove('P001')
+ids = [p['id'] for p in reg.display()]
+assert ids == ['P002', 'P004'] and reg.find('P004') is not None and reg.find('P001') is None
+print(f'[SUCCESS] Patient Registry: size={reg.get_size()}, order={ids}')
+
+# Test Patient Registry cursor pages
+pages = PatientRegistry([{'id': f'P{i}'} for i in range(5)])
+first, cursor = pages.page(2)
+pages.append({'id': 'P5'})
+second, cursor = pages.page(2, after=cursor)
+rest, end = pages.page(10, after=cursor)
+assert [p['id'] for p in first + second + rest] == [f'P{i}' for i in range(6)] and end is None
+try:
+    pages.page(2, after=cursor[:4] + '""' + cursor[4:])  # junk inside a valid cursor
+    assert False, 'corrupted cursor accepted'
+except ValueError:
+    pass
+print(f'[SUCCESS] Patient Registry pages: {[len(first), len(second), len(rest)]}')
+
+# Test Trigram search index attached to the registry
+reg = PatientRegistry([{'id': 'P001', 'name': 'Naol Mulisa'}, {'id': 'P002', 'name': 'Semere Hailu'}])
+index = TrigramIndex(field='name')
+reg.attach_index(index)
+reg.append({'id': 'P003', 'name': 'Nahom Ali'})
+hits = [p['id'] for p in index.search('na')]
+reg.remove('P001')
+after = [p['id'] for p in index.search('NA')]
+assert hits == ['P001', 'P003'] and after == ['P003'] and index.search('hailu')[0]['id'] == 'P002'
+print(f'[SUCCESS] Trigram Index: before remove={hits}, after remove={after}')
+
+# Test Prefix index autocomplete
+names = PrefixIndex(field='name', kind='patient')
+names.add('Kena Fayera', 'doctor', 'D1', 'doctor:Kena Fayera')
+reg.attach_index(names)
+reg.append({'id': 'P005', 'name': 'Kenenisa Bekele'})
+suggestions = [s if isinstance(s, str) else s['name'] for s in names.complete('ken')]
+reg.remove('P005')
+assert suggestions == ['doctor:Kena Fayera', 'Kenenisa Bekele'] and len(names.complete('ken')) == 1
+assert [s['id'] for s in names.complete('ali')] == ['P003']
+print(f'[SUCCESS] Prefix Index: suggestions={suggestions}')
+
+# Test rolling per-minute counter with a fake clock
+now = [0.0]
+counter = RollingCounter(window=60, buckets=60, clock=lambda: now[0])
+counter.record(3)
+now[0] = 30.5
+counter.record()
+in_window = counter.total()
+now[0] = 65.0
+assert in_window == 4 and counter.total() == 1
+print(f'[SUCCESS] Rolling Counter: in window={in_window}, after 65s={counter.total()}')
+
+# Test specialization-aware Scheduler
+doctors = [
+    {'id': 'GM', 'specialization': 'General Medicine', 'available': True},
+    {'id': 'PED', 'specialization': 'Pediatrics', 'available': True},
+    {'id': 'CAR', 'specialization': 'Cardiology', 'available': True},
+    {'id': 'ORT', 'specialization': 'Orthopedics', 'available': False},
+]
+scheduler = Scheduler(doctors, by_specialization=True)
+scheduler.add_patient({'id': 'E1', 'condition': 'Chest Pain', 'age': 40}, is_emergency=True, priority=1)
+scheduler.add_patient({'id': 'R1', 'condition': 'Broken Arm', 'age': 30})
+scheduler.add_patient({'id': 'R2', 'condition': 'Rash', 'age': 6})
+routed = {doc: [p['id'] for p in pts] for doc, pts in scheduler.assign_patients().items()}
+assert routed == {'CAR': ['E1'], 'GM': ['R1'], 'PED': ['R2']}, routed
+assert specialization_for({'condition': 'Common cold'}) == 'General Medicine'
+assert specialization_for({'condition': 'Heartburn'}) is None and specialization_for({'condition': 'Scold'}) is None
+assert specialization_for({'condition': 'Rash', 'age': '6'}) == 'Pediatrics'
+assert specialization_for({'condition': 'Rash', 'age': 'six'}) is None
+print(f'[SUCCESS] Scheduler by specialization: {routed}')
+
+# Test Doctor directory lookups and cached encodings
+directory = DoctorDirectory(doctors)
+cached = directory.list_json()
+assert directory.list_json() is cached and directory.get('PED')['id'] == 'PED'
+directory.set_available('ORT', True)
+assert directory.list_json() is not cached and b'"ORT"' in directory.doctor_json('ORT')
+assert [d['id'] for d in directory.by_specialization('Cardiology')] == ['CAR']
+assert directory.doctor_json('NOPE') is None and directory.set_available('NOPE', True) is None
+print(f'[SUCCESS] Doctor Directory: size={len(directory)}, version={directory.version}')
+
+# Test thread-safe queue engine: every patient served exactly once
+changes = []
+engine = QueueEngine(on_change=lambda action, queue_type, item, priority: changes.append(action))
+workers = [threading.Thread(target=lambda k=k: [engine.enqueue(f'{k}-{i}', is_emergency=i % 4 == 0, priority=i % 5)
+                                                for i in range(500)]) for k in range(4)]
+for worker in workers:
+    worker.start()
+for worker in workers:
+    worker.join()
+before = engine.snapshot()
+served = []
+def serve():
+    while True:
+        queue_type, item = engine.dequeue_next()
+        if queue_type is None:
+            return
+        served.append((queue_type, item))
+workers = [threading.Thread(target=serve) for _ in range(4)]
+for worker in workers:
+    worker.start()
+for worker in workers:
+    worker.join()
+assert len(before.emergency) == 500 and len(before.regular) == 1500
+assert len(served) == 2000 and len({item for _, item in served}) == 2000
+assert engine.snapshot() is engine.snapshot() and changes.count('dequeue') == 2000
+checked = QueueEngine(on_change=lambda action, queue_type, item, priority: changes.append(action),
+                      priorities=range(1, 6))
+for bad in (200, 1.5, True):
+    try:
+        checked.enqueue('P1', is_emergency=True, priority=bad)
+        assert False, f'priority {bad!r} accepted'
+    except ValueError:
+        pass
+assert checked.enqueue('P1', priority=200) == 'regular' and checked.snapshot().emergency == ()
+print(f'[SUCCESS] Queue Engine: served={len(served)}, version={engine.version}')
+
+# Test the event log: resume after an id, resync when evicted, wake waiting readers
+broker = EventBroker(history=3)
+assert broker.since(0) == [] and broker.wait(0, timeout=0.01) == []
+for i in range(4):
+    broker.publish('enqueue', {'n': i})
+assert [event_id for event_id, _ in broker.since(2)] == [3, 4] and broker.since(4) == []
+assert broker.since(0) is None and broker.since(99) is None  # evicted / unknown: resync
+assert broker.since(3)[0][1] == 'id: 4\nevent: enqueue\ndata: {"n":3}\n\n'
+timer = threading.Timer(0.05, broker.publish, ('dequeue', {'n': 4}))
+timer.start()
+assert [event_id for event_id, _ in broker.wait(4, timeout=5)] == [5]
+timer.join()
+assert broker.snapshot(lambda: {'size': 0}) == (5, 'id: 5\nevent: snapshot\ndata: {"size":0}\n\n')
+print(f'[SUCCESS] Event Broker: last id={broker.last_id}, resume/resync/wait/snapshot')
+
+# Test the SQLite backend's Supabase-style query builder on a temp file
+scratch = tempfile.mkdtemp()
+sqlite_db = SQLiteDatabase(os.path.join(scratch, 'hospital.db'))
+tables = sqlite_db.get_client()
+assert sqlite_db.test_connection() and len(tables.table('doctors').select('id').execute().data) == 6  # seed rows
+tables.table('patients').insert([{'id': 'S1', 'name': 'Kena', 'age': 30}, {'id': 'S2', 'name': 'Abel', 'age': 50}]).execute()
+tables.table('patients').upsert([{'id': 'S1', 'name': 'Kena F', 'is_emergency': True},
+                                 {'id': 'S3', 'name': 'Leul', 'is_emergency': False}]).execute()
+rows = {row['id']: row for row in tables.table('patients').select('id, name, age, is_emergency')
+        .in_('id', ['S1', 'S2', 'S3']).execute().data}
+assert rows['S1'] == {'id': 'S1', 'name': 'Kena F', 'age': 30, 'is_emergency': True}  # age kept
+assert rows['S2']['name'] == 'Abel' and rows['S3']['is_emergency'] is False
+assert tables.table('patients').select('id').in_('id', []).execute().data == []
+tables.table('patients').delete().in_('id', []).execute()  # deletes nothing
+tables.table('patients').update({'age': 41}).eq('id', 'S3').execute()
+ordered = tables.table('patients').select('id').in_('id', ['S1', 'S2', 'S3']).order('age', desc=True).limit(2).execute()
+assert [row['id'] for row in ordered.data] == ['S2', 'S3']
+tables.table('patients').delete().eq('id', 'S3').execute()
+assert tables.table('patients').select('id').eq('id', 'S3').execute().data == []
+for bad_query in (lambda: tables.table('patients').select('id, password'), lambda: tables.table('nope')):
+    try:
+        bad_query()
+        assert False, 'unknown column or table accepted'
+    except ValueError:
+        pass
+print(f"[SUCCESS] SQLite Backend: upsert/in_/order/limit on {len(tables.columns('patients'))}-column patients table")
+
+# Test write-behind persistence against a stand-in Supabase client
+class FakeTable:
+    def __init__(self, client, name):
+        self.client, self.name, self.op = client, name, None
+    def upsert(self, rows):
+        self.op = ('upsert', rows)
+        return self
+    def execute(self):
+        if self.client.fail:
+            raise ConnectionError('offline')
+        self.client.requests.append((self.name,) + self.op)
+class FakeClient:
+    def __init__(self):
+        self.requests, self.fail = [], True
+    def table(self, name):
+        return FakeTable(self, name)
+client = FakeClient()
+writer = WriteBehindWriter(client, batch_size=100, flush_interval=60)
+persistence = SupabasePersistence(writer)
+persistence.add_record({'id': 'P1', 'name': 'Kena'})
+persistence.queue_changed('enqueue', 'regular', {'id': 'P1'})
+persistence.queue_changed('dequeue', 'regular', {'id': 'P1'})
+assert writer.flush() is False and writer.pending() == 2  # kept for retry
+client.fail = False
+writer.close()
+assert [(table, len(rows)) for table, _, rows in client.requests] == [('patients', 1), ('queue', 1)]
+assert client.requests[1][2][0]['status'] == 'served' and writer.stats['errors'] == 2
+# Hooks never wait for room: a full buffer keeps the change and counts an overflow
+client = FakeClient()
+writer = WriteBehindWriter(client, batch_size=100, flush_interval=60, max_pending=1, block_timeout=30)
+persistence = SupabasePersistence(writer)
+persistence.add_records([{'id': 'P1', 'name': 'Kena'}, {'id': 'P2', 'name': 'Abel'}])
+assert writer.pending() == 2 and writer.stats['overflows'] == 1
+writer.close()
+# A row the database rejects is isolated and dead-lettered; its chunk neighbours are written
+writer = WriteBehindWriter(sqlite_db.get_client(), batch_size=8, flush_interval=60, max_attempts=2)
+for i in range(20):
+    writer.upsert('patients', {'id': f'W{i}', 'name': None if i == 5 else f'Patient {i}'})
+assert writer.flush() is False and writer.pending() == 1  # W5 (name is NOT NULL) retried once
+assert writer.flush() is True and writer.pending() == 0
+assert writer.stats['dead_letters'] == 1 and writer.dead_letters[0]['key'] == 'W5'
+assert len(sqlite_db.get_client().table('patients').select('id').in_('id', [f'W{i}' for i in range(20)]).execute().data) == 19
+writer.delete('patients', 'W0')
+assert writer.flush() and tables.table('patients').select('id').eq('id', 'W0').execute().data == []
+writer.close()
+# Waiting rows in the shared store: enqueued on one worker, served on another
+worker_a = SupabasePersistence(writer, SharedWaitingRows(SQLiteStateStore(os.path.join(scratch, 'state.db'))))
+worker_b = SupabasePersistence(writer, SharedWaitingRows(SQLiteStateStore(os.path.join(scratch, 'state.db'))))
+worker_a.queue_changed('enqueue', 'emergency', {'id': 'P1'}, priority=3)
+worker_a.queue_changed('enqueue', 'emergency', {'id': 'P1'}, priority=1)
+served = worker_b.waiting.take('emergency_queue', 'P1')
+assert served['priority'] == 1 and worker_b.waiting.take('emergency_queue', 'P1')['priority'] == 3
+assert worker_b.waiting.take('emergency_queue', 'P1') is None
+print(f"[SUCCESS] Write-behind: rows written={writer.stats['rows_written']}, "
+      f"dead letters={writer.stats['dead_letters']}, shared waiting rows served across workers")
+
+# Test shared state: two workers' engines, brokers and registries on one database file
+state_path = os.path.join(scratch, 'workers.db')
+workers = [SQLiteStateStore(state_path) for _ in range(2)]
+engines = [SharedQueueEngine(store) for store in workers]
+brokers = [SharedEventBroker(store, poll_interval=0.01) for store in workers]
+engines[0].on_change = lambda action, queue_type, item, priority: brokers[0].publish(action, {'id': item['id']})
+engines[0].enqueue({'id': 'P1'})
+engines[0].enqueue({'id': 'P2'}, is_emergency=True, priority=2)
+assert engines[1].snapshot().version == engines[0].version and len(engines[1].snapshot().regular) == 1
+assert engines[1].dequeue_next() == ('emergency', {'id': 'P2'})
+assert engines[0].dequeue_next() == ('regular', {'id': 'P1'}) and engines[1].dequeue_next() == (None, None)
+assert [event_id for event_id, _ in brokers[1].since(0)] == [1, 2, 3] and brokers[1].wait(3, timeout=0.05) == []
+registries = [PatientRegistry(), PatientRegistry()]
+syncs = [RegistrySync(store, registry) for store, registry in zip(workers, registries)]
+syncs[0].add({'id': 'P1', 'name': 'Kena'})
+try:
+    syncs[1].add({'id': 'P1', 'name': 'Abel'})
+    assert False, 'duplicate id accepted across workers'
+except ValueError:
+    pass
+assert syncs[1].pull() == 1 and registries[1].find('P1')['name'] == 'Kena' and syncs[1].pull() == 0
+assert syncs[1].add_many([{'id': 'P1', 'name': 'Abel'}, {'id': 'P2', 'name': 'Sara'}]) == [{'id': 'P1', 'name': 'Abel'}]
+assert syncs[0].pull() == 1 and registries[0].find('P2')['name'] == 'Sara' and registries[1].find('P1')['name'] == 'Kena'
+workers[0].put_value('latest_assignments', {'DOC1': [{'id': 'P1'}]})
+assert workers[1].get_value('latest_assignments') == {'DOC1': [{'id': 'P1'}]} and workers[1].get_value('x', {}) == {}
+print(f'[SUCCESS] Shared State: queues, events, registry and values shared by {len(workers)} workers')
+
+# Test read-through cache with TTL, LRU bound and invalidation
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client, self.table, self.filters = client, table, {}
+    def select(self, columns):
+        return self
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+    def order(self, column):
+        return self
+    def limit(self, count):
+        return self
+    def execute(self):
+        self.client.reads += 1
+        self.client.on_read()
+        rows = [row for row in self.client.rows[self.table]
+                if all(row.get(c) == v for c, v in self.filters.items())]
+        return type('Result', (), {'data': rows})
+class FakeReadClient:
+    def __init__(self):
+        self.reads = 0
+        self.rows = {'patients': [{'id': 'P1'}, {'id': 'P2'}]}
+        self.on_read = lambda: None
+    def table(self, name):
+        return FakeQuery(self, name)
+now = [0.0]
+cache = CachedDatabase(type('FakeDb', (), {'get_client': lambda self: fake})(), max_entries=2,
+                       ttls={'patients': 10}, clock=lambda: now[0])
+fake = FakeReadClient()
+cache.get_patient('P1'), cache.get_patient('P1'), cache.get_patient('P2'), cache.get_patient('P404')
+assert fake.reads == 3 and cache.stats == {'hits': 1, 'misses': 3, 'evictions': 1}
+fake.rows['patients'][1]['name'] = 'Changed'
+cache.invalidate('patients', ['P2'])
+assert cache.get_patient('P2')['name'] == 'Changed' and cache.get_patient('P404') is None
+now[0] = 11.0
+cache.get_patient('P2')
+assert fake.reads == 5
+# A write stored while a miss is loading: the loaded row may be stale, so it is not cached
+fake.on_read = lambda: cache.invalidate('patients', ['P1'])
+cache.get_patient('P1')
+fake.on_read = lambda: None
+cache.get_patient('P1')
+assert fake.reads == 7
+print(f'[SUCCESS] Cached Database: reads={fake.reads}, stats={cache.stats}')
+
+# Test bounded, self-expiring session store
+now = [0.0]
+sessions = SessionStore(max_size=3, ttl=100, clock=lambda: now[0])
+for token in ('t1', 't2', 't3'):
+    sessions.add(token, {'email': token})
+sessions.get('t1')                 # t1 is now most recently used
+sessions.add('t4', {'email': 't4'})  # evicts t2
+assert 't2' not in sessions and sessions.get('t1')['email'] == 't1' and len(sessions) == 3
+now[0] = 150.0
+sessions.add('t5', {'email': 't5'})  # sweeps everything issued at time 0
+assert len(sessions) == 1 and sessions.get('t1') is None and sessions.evictions == 1
+print(f'[SUCCESS] Session Store: live={len(sessions)}, evictions={sessions.evictions}')
+
+# Test stateless signed tokens: any signer with the key validates them
+now = [1000.0]
+worker_a = TokenSigner('shared-signing-key', ttl=60, clock=lambda: now[0])
+worker_b = TokenSigner('shared-signing-key', ttl=60, clock=lambda: now[0])
+token = worker_a.issue('U1', 'a@example.com', is_admin=True)
+claims = worker_b.verify(token)
+assert claims['sub'] == 'U1' and claims['adm'] is True
+payload, signature = token.split('.')
+forged = payload[:-2] + ('AA' if payload[-2:] != 'AA' else 'BB') + '.' + signature
+assert TokenSigner('another-signing-key', clock=lambda: now[0]).verify(token) is None and worker_b.verify(forged) is None
+assert worker_b.revoke(token) and worker_b.verify(token) is None and worker_a.verify(token) is not None
+now[0] += 61
+assert worker_a.verify(token) is None and worker_b.revoked.purge() == 1
+for weak_key in ('short', *PUBLIC_SECRETS):
+    try:
+        TokenSigner(weak_key)
+        assert False, 'weak signing key accepted'
+    except ValueError:
+        pass
+# The app refuses stateless tokens without a private SECRET_KEY (its fallback key is public)
+env = {key: value for key, value in os.environ.items() if key != 'SECRET_KEY'}
+startup = subprocess.run([sys.executable, '-c', 'import app'], env={**env, 'STATELESS_TOKENS': '1'},
+                         cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+assert startup.returncode != 0 and 'STATELESS_TOKENS=1 requires SECRET_KEY' in startup.stderr
+print(f'[SUCCESS] Signed Tokens: {len(token)}-char token verified across signers, revoked and expired')
+
+# Test admission control: slot hand-off by priority, shedding, token buckets
+pool = AdmissionPool('intake', limit=1, max_waiting=2, max_wait=5.0)
+pool.acquire(PRIORITY_READ)
+order = []
+def admitted(priority):
+    pool.acquire(priority)
+    order.append(priority)
+    pool.release()
+waiters = [threading.Thread(target=admitted, args=(PRIORITY_READ,))]
+waiters[0].start()
+while pool.stats()['waiting'] < 1:
+    time.sleep(0.001)
+waiters.append(threading.Thread(target=admitted, args=(PRIORITY_EMERGENCY,)))
+waiters[1].start()
+while pool.stats()['waiting'] < 2:
+    time.sleep(0.001)
+try:
+    pool.acquire(PRIORITY_READ)  # wait list full
+    assert False, 'expected a 503'
+except Rejected as e:
+    assert e.status == 503
+pool.release()
+for waiter in waiters:
+    waiter.join()
+assert order == [PRIORITY_EMERGENCY, PRIORITY_READ] and pool.active == 0
+now = [0.0]
+limiter = RateLimiter(rate=1.0, burst=2, clock=lambda: now[0])
+assert [limiter.allow('kiosk') for _ in range(3)] == [0, 0, 1.0] and limiter.allow('other') == 0
+now[0] = 1.0
+assert limiter.allow('kiosk') == 0
+print(f"[SUCCESS] Admission Control: emergency admitted first, shed={pool.shed}")
+
+# Test bulk import parsing and batch enqueue
+rows = list(read_rows(io.BytesIO(b'name,age,is_emergency,priority\nAlice,30,yes,1\nBob,,,\n'), 'text/csv'))
+alice, bob = patient_from_row(rows[0]), patient_from_row(rows[1])
+assert (alice['age'], alice['is_emergency'], alice['priority']) == (30, True, 1)
+assert (bob['age'], bob['is_emergency'], bob['priority']) == (None, False, 5) and bob['id'] != alice['id']
+for bad in ({'name': ''}, {'name': 'X', 'age': 'old'}, {'name': 'X', 'priority': 9}, ['not', 'a', 'row']):
+    try:
+        patient_from_row(bad)
+        assert False, f'expected a ValueError for {bad}'
+    except ValueError:
+        pass
+assert queue_entry_from_row({'patient_id': 'P1', 'is_emergency': 'true', 'priority': '2'}) == ('P1', True, 2)
+engine = QueueEngine()
+counts = engine.enqueue_many([(alice, True, 1), (bob, False, 5)])
+assert counts == {'regular': 1, 'emergency': 1} and engine.dequeue_next() == ('emergency', alice)
+print(f'[SUCCESS] Bulk Import: parsed {len(rows)} CSV rows, enqueued {counts}')
+
+# Test compact storage: slotted objects and the columnar queue-entry log
+record = {'id': 'P1', 'name': 'Abebe', 'age': None, 'phone': None, 'email': None,
+          'condition': 'Fever', 'is_emergency': True, 'priority': 2}
+assert not hasattr(Patient.from_dict(record), '__dict__')
+assert not hasattr(RegistryNode(record), '__dict__')
+entries = QueueEntryLog()
+entries.append('P1', 2, 1000.5, is_emergency=True)
+assert entries.entry(0) == {'patient_id': 'P1', 'priority': 2, 'is_emergency': True,
+                           'enqueued_at': 1000.5, 'dequeued_at': None}
+print(f'[SUCCESS] Columnar Storage: queue entries={len(entries)}')
+
+# Test queue analytics (with NumPy if installed, and the plain Python fallback)
+history = QueueAnalytics(clock=lambda: 0.0)
+for i in range(10):
+    history.on_enqueue(f'P{i}', is_emergency=i < 2, priority=1 if i < 2 else 5, at=3600.0 * i)
+for i in range(9):
+    history.on_dequeue(f'P{i}', is_emergency=i < 2, at=3600.0 * i + 60 * (i + 1))
+history.on_assign('DOC1', 3, at=0.0)
+history.on_assign('DOC2', 1, at=7200.0)
+summaries = [history.summary()]
+numpy_module, analytics_module.np = analytics_module.np, None
+summaries.append(history.summary())
+analytics_module.np = numpy_module
+for summary in summaries:
+    assert summary['wait_seconds']['all']['count'] == 9 and summary['wait_seconds']['all']['p50'] == 300.0
+    assert summary['wait_seconds']['emergency']['max'] == 120.0 and summary['waiting'] == 1
+    assert sum(summary['arrivals_by_hour']) == 10 and summary['events'] == 14
+    assert summary['doctors'] == [{'doctor_id': 'DOC1', 'assigned': 3, 'per_hour': 1.5},
+                                  {'doctor_id': 'DOC2', 'assigned': 1, 'per_hour': 0.5}]
+print(f"[SUCCESS] Queue Analytics: p95 wait={summaries[0]['wait_seconds']['all']['p95']}s, "
+      f"numpy={'yes' if numpy_module is not None else 'no'}")
+
+# Test wait-time estimates (positions must match the queue engine's service order)
+tree = FenwickTree([3, 1, 4])
+tree.append(1)
+tree.add(0, -3)
+assert [tree.prefix(k) for k in range(5)] == [0, 0, 1, 5, 6]
+now = [0.0]
+eta = ETAEngine(default_service={'regular': 600.0, 'emergency': 900.0}, clock=lambda: now[0])
+engine = QueueEngine(on_change=lambda action, queue_type, item, priority: (
+    eta.on_enqueue(item['id'], queue_type, priority) if action == 'enqueue'
+    else eta.on_dequeue(item['id'], queue_type)))
+for i in range(300):
+    engine.enqueue({'id': f'P{i % 120}'}, is_emergency=i % 4 == 0, priority=1 + i % 5)
+    if i % 3 == 0:
+        engine.dequeue_next()
+snapshot = engine.snapshot()
+order = [entry['item']['id'] for entry in snapshot.emergency] + [item['id'] for item in snapshot.regular]
+for patient_id in set(order):
+    assert eta.estimate(patient_id)['position'] == order.index(patient_id) + 1
+assert eta.estimate('P-missing') is None
+eta.set_servers(['DOC1', 'DOC2'])
+for at in (0.0, 300.0, 600.0):
+    eta.record_call('DOC1', 'regular', at=at)
+estimate = eta.estimate_for('P1', 'regular', 1, 2)
+# DOC1 takes 300s against an overall 588s average: capacity 588/300 + 1 (DOC2, not measured yet)
+assert eta.service['regular'] == 492.0 and estimate['capacity'] == 2.96
+assert estimate['eta_seconds'] == round((900 + 2 * 492) / 2.96) and estimate['position'] == 4
+# Front-desk calls (no doctor) every 120s with 5 doctors at 600s each: 9 ahead wait ~1080s
+desk = ETAEngine(clock=lambda: 0.0)
+desk.set_servers([f'DOC{i}' for i in range(5)])
+for i in range(12):
+    desk.record_call(None, 'regular', at=120.0 * i)
+assert desk.estimate_for('P1', 'regular', 0, 9)['eta_seconds'] == 1080
+assert desk.service == {'regular': 600.0, 'emergency': 900.0} and desk.overall_service == 750.0
+print(f"[SUCCESS] Wait-Time Estimates: {len(order)} queued, last in line waits "
+      f"{eta.estimate(order[-1])['eta_seconds']}s")
+
+# API checks through Flask's test client
+api = server.app.test_client()
+login = api.post('/api/auth/login', json={'email': 'fayerakena@gmail.com', 'password': 'x'}).get_json()
+auth = {'Authorization': f"Bearer {login['token']}"}
+
+# Live streams are capped per worker; past the cap displays get a 503 (and poll instead)
+streams = [api.get(f"/api/queue/stream?token={login['token']}", buffered=False)
+           for _ in range(server.SSE_MAX_STREAMS)]
+assert all(stream.status_code == 200 for stream in streams)
+assert next(streams[0].response).startswith(b'retry:')
+refused = api.get(f"/api/queue/stream?token={login['token']}")
+assert refused.status_code == 503 and refused.headers['Retry-After']
+streams.pop().close()  # a display leaves: its slot is free again
+extra = api.get(f"/api/queue/stream?token={login['token']}", buffered=False)
+assert extra.status_code == 200
+for stream in streams + [extra]:
+    stream.close()
+assert server.stream_slots.active == 0
+print(f'[SUCCESS] Queue Stream: {server.SSE_MAX_STREAMS} live streams, then 503 until one closes')
+
+# Page tags come from a digest of the cursor, so any cursor text is safe in an ETag
+page = api.get('/api/patients?limit=2', headers=auth)
+cursor = page.get_json()['next_cursor']
+assert page.status_code == 200 and api.get(f'/api/patients?limit=2&after={cursor}', headers=auth).headers['ETag']
+assert api.get(f'/api/patients?limit=2&after={cursor[:4]}""{cursor[4:]}', headers=auth).status_code == 400
+print(f"[SUCCESS] Patient Pages API: cursor {cursor[:8]}..., corrupted cursor rejected with 400")
+
+# Rate limits key on the validated user or the forwarded client address, not raw headers
+limiter, server.admission.rate_limiter = server.admission.rate_limiter, RateLimiter(rate=0.001, burst=2)
+anonymous = server.app.test_client()  # no session cookie
+made_up = [anonymous.get('/api/doctors', headers={'Authorization': f'Bearer forged-{i}',
+                                                  'X-Forwarded-For': '203.0.113.7'}).status_code for i in range(3)]
+other_client = anonymous.get('/api/doctors', headers={'X-Forwarded-For': '198.51.100.9'}).status_code
+signed_in = [api.get('/api/doctors', headers=auth).status_code for _ in range(3)]
+server.admission.rate_limiter = limiter
+assert made_up == [200, 200, 429] and other_client == 200 and signed_in == [200, 200, 429]
+# An export holds its 'reads' slot until the stream has been sent
+export = api.get('/api/export/patients.ndjson', headers=auth, buffered=False)
+assert server.admission.pools['reads'].active == 1
+lines = b''.join(export.response).decode().splitlines()
+export.close()
+assert server.admission.pools['reads'].active == 0 and len(lines) == server.patient_list.get_size()
+print(f"[SUCCESS] Admission API: rate limited per user/address, export held its slot for {len(lines)} rows")
+
+# A priority the queue cannot hold is refused before anything is queued or counted
+waiting = server.dashboard_stats.snapshot()
+patient_id = next(iter(server.patient_list))['id']
+for bad in (200, 1.5):
+    response = api.post('/api/queue/add', headers=auth, json={'patient_id': patient_id, 'is_emergency': True,
+                                                              'priority': bad})
+    assert response.status_code == 400 and 'priority' in response.get_json()['error']
+assert server.queue_engine.snapshot().emergency == () and server.dashboard_stats.snapshot() == waiting
+print('[SUCCESS] Queue Add API: out-of-range and fractional priorities rejected with 400')
+
+# While the database is unreachable and the write-behind buffer is full, intake is refused
+persistence_before, client.fail = server.persistence, True
+server.persistence = SupabasePersistence(WriteBehindWriter(client, batch_size=100, flush_interval=60, max_pending=2))
+intake = [api.post('/api/queue/add', headers=auth, json={'patient_id': patient_id}) for _ in range(3)]
+refused = api.post('/api/patients', headers=auth, json={'name': 'Late Arrival'})
+assert [response.status_code for response in intake] == [200, 200, 503] and intake[2].headers['Retry-After']
+assert refused.status_code == 503 and refused.get_json()['reason'] == 'write_backlog'
+assert api.get('/api/queue', headers=auth).status_code == 200 and server.persistence.writer.pending() == 2
+client.fail = False
+server.persistence.writer.close()
+server.persistence = persistence_before
+while api.post('/api/queue/next', headers=auth).get_json().get('patient'):
+    pass
+print(f"[SUCCESS] Write Backlog: intake shed with 503 once {len(intake) - 1} rows were waiting")
+
+# With every doctor unavailable, specialization-mode assignment answers 409 instead of failing
+patient_id = next(iter(server.patient_list))['id']
+api.post('/api/queue/add', headers=auth, json={'patient_id': patient_id})
+available = [doctor['id'] for doctor in server.doctor_directory.all() if doctor['available']]
+for doctor_id in available:
+    api.post(f'/api/doctors/{doctor_id}/availability', headers=auth, json={'available': False})
+no_doctors = api.post('/api/scheduler/assign', headers=auth, json={'mode': 'specialization'})
+for doctor_id in available:
+    api.post(f'/api/doctors/{doctor_id}/availability', headers=auth, json={'available': True})
+assert no_doctors.status_code == 409 and 'No doctors available' in no_doctors.get_json()['error']
+assert len(server.queue_engine.snapshot().regular) == 1
+assert api.post('/api/queue/next', headers=auth).get_json()['patient']['id'] == patient_id
+print(f"[SUCCESS] Scheduler API: 409 with all {len(available)} doctors unavailable")
+
+# Exports stream one JSON document per line, sent in chunks of up to chunk_size lines
+with server.app.test_request_context():
+    for count, sizes in ((0, []), (1, [1]), (4, [2, 2]), (5, [2, 2, 1])):
+        chunks = list(server.ndjson_response(({'n': n} for n in range(count)), chunk_size=2).response)
+        assert [len(chunk.splitlines()) for chunk in chunks] == sizes and all(chunk.endswith('\n') for chunk in chunks)
+        assert [json.loads(line)['n'] for line in ''.join(chunks).splitlines()] == list(range(count))
+
+def export_rows(name):
+    response = api.get(f'/api/export/{name}.ndjson', headers=auth)
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+exported = export_rows('patients')
+assert [row['id'] for row in exported] == [patient['id'] for patient in server.patient_list]
+queued = [patient['id'] for patient in exported[:3]]
+api.post('/api/queue/add/bulk', headers=auth, json=[{'patient_id': queued[0]}, {'patient_id': queued[1]},
+                                                    {'patient_id': queued[2], 'is_emergency': True, 'priority': 1}])
+queue_rows = export_rows('queue')
+assert [(row['queue_type'], row['patient']['id']) for row in queue_rows] == [
+    ('emergency', queued[2]), ('regular', queued[0]), ('regular', queued[1])]
+assigned = api.post('/api/scheduler/assign', headers=auth).get_json()['assignments']
+assignment_rows = export_rows('assignments')
+assert len(assignment_rows) == sum(len(patients) for patients in assigned.values()) == 3
+while api.post('/api/queue/next', headers=auth).get_json().get('patient'):
+    pass
+print(f"[SUCCESS] NDJSON Exports: {len(exported)} patients, {len(queue_rows)} queue entries, "
+      f"{len(assignment_rows)} assignments")
+
 print('[SUCCESS] All DSA structures working correctly!')
 
@@ -24,6 +24,14 @@ const api = {
         return response.json();
     },
 
+    getPatientsPage: async (limit = 100, after = null) => {
+        const cursor = after ? `&after=${encodeURIComponent(after)}` : '';
+        const response = await fetch(`${API_BASE_URL}/patients?limit=${limit}${cursor}`, {
+            headers: getAuthHeaders()
+        });
+        return response.json();
+    },
+
     createPatient: async (patientData) => {
         const response = await fetch(`${API_BASE_URL}/patients`, {
             method: 'POST',
@@ -47,6 +55,13 @@ const api = {
         return response.json();
     },
 
+    autocompleteNames: async (prefix, limit = 10) => {
+        const response = await fetch(`${API_BASE_URL}/patients/autocomplete?q=${encodeURIComponent(prefix)}&limit=${limit}`, {
+            headers: getAuthHeaders()
+        });
+        return response.json();
+    },
+
     // Doctors
     getDoctors: async () => {
         const response = await fetch(`${API_BASE_URL}/doctors`);
@@ -66,6 +81,12 @@ const api = {
         return response.json();
     },
 
+    queueStreamUrl: () => {
+        // EventSource can't send headers, so the token goes in the query string
+        const token = window.auth?.getToken();
+        return `${API_BASE_URL}/queue/stream${token ? `?token=${encodeURIComponent(token)}` : ''}`;
+    },
+
     addToQueue: async (patientId, isEmergency = false, priority = 5) => {
         const response = await fetch(`${API_BASE_URL}/queue/add`, {
             method: 'POST',
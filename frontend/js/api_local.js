@@ -25,6 +25,14 @@ const api = {
         return response.json();
     },
 
+    getPatientsPage: async (limit = 100, after = null) => {
+        const cursor = after ? `&after=${encodeURIComponent(after)}` : '';
+        const response = await fetch(`${API_BASE_URL}/patients?limit=${limit}${cursor}`, {
+            headers: getAuthHeaders()
+        });
+        return response.json();
+    },
+
     createPatient: async (patientData) => {
         const response = await fetch(`${API_BASE_URL}/patients`, {
             method: 'POST',
@@ -48,6 +56,13 @@ const api = {
         return response.json();
     },
 
+    autocompleteNames: async (prefix, limit = 10) => {
+        const response = await fetch(`${API_BASE_URL}/patients/autocomplete?q=${encodeURIComponent(prefix)}&limit=${limit}`, {
+            headers: getAuthHeaders()
+        });
+        return response.json();
+    },
+
     // Doctors
     getDoctors: async () => {
         const response = await fetch(`${API_BASE_URL}/doctors`);
@@ -67,6 +82,12 @@ const api = {
         return response.json();
     },
 
+    queueStreamUrl: () => {
+        // EventSource can't send headers, so the token goes in the query string
+        const token = window.auth?.getToken();
+        return `${API_BASE_URL}/queue/stream${token ? `?token=${encodeURIComponent(token)}` : ''}`;
+    },
+
     addToQueue: async (patientId, isEmergency = false, priority = 5) => {
         const response = await fetch(`${API_BASE_URL}/queue/add`, {
             method: 'POST',